@@ -1,22 +1,118 @@
-from flask import Flask
+import time
+from flask import Flask, g, request
 from routes.web import web
 from routes.api import api
+from routes.metrics import metrics
 from utils.config import Config
-from services.statistics import get_cluster_stats
+from services.statistics import get_current_stats, get_stats_history
+from services.clients import current_context, known_context, use_context
+from services.kubernetes import get_cluster_cache
+from services.shared import uses_cache_server
+from services.snapshots import restore_snapshot
+from utils.encoding import FastJSONProvider, compress_response
+from utils.metrics import REQUEST_DURATION, REQUESTS_IN_FLIGHT
+from utils.profiling import RequestProfile, requested_mode
 
-app = Flask(__name__)
-app.register_blueprint(web)
-app.register_blueprint(api, url_prefix='/api')
+def create_app():
+    """Build the Flask app; under gunicorn each worker calls this after use_cache_server()"""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.register_blueprint(web)
+    app.register_blueprint(api, url_prefix='/api')
+    # Workers of a cache server leave snapshots to the server
+    snapshots = not uses_cache_server()
 
-@app.context_processor
-def inject_stats():
-    """Inject cluster statistics into all templates"""
-    stats = get_cluster_stats()
-    return stats
+    if Config.METRICS_ENABLED:
+        app.register_blueprint(metrics)
+
+        # Registered first so the timing covers the other hooks, and compression
+        @app.before_request
+        def start_timer():
+            g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+            g.metrics_start = time.perf_counter()
+            REQUESTS_IN_FLIGHT.inc(g.metrics_route)
+
+        @app.after_request
+        def record_duration(response):
+            if 'metrics_start' in g:
+                elapsed = time.perf_counter() - g.metrics_start
+                REQUEST_DURATION.observe(elapsed, request.method, g.metrics_route, response.status_code)
+            return response
+
+        @app.teardown_request
+        def end_request(error=None):
+            # Streamed responses end here, after their last chunk
+            if 'metrics_route' in g:
+                REQUESTS_IN_FLIGHT.dec(g.metrics_route)
+
+    if Config.PROFILING_ENABLED:
+        @app.before_request
+        def start_profile():
+            """Profile this request if it asked to and may"""
+            mode = requested_mode(request.headers, request.args, request.remote_addr)
+            if mode:
+                g.profile = RequestProfile(mode, f"{request.method} {request.full_path}").start()
+
+        @app.after_request
+        def finish_profile(response):
+            """Write the profile and point to it from the response"""
+            profile = g.pop('profile', None)
+            if profile is not None:
+                profile.stop()
+                response.headers['Server-Timing'] = profile.server_timing()
+                response.headers['X-Pyk-Profile'] = profile.write(Config.PROFILE_DIR)
+            return response
+
+        @app.teardown_request
+        def stop_profile(error=None):
+            # A failing after_request hook must not leave the thread profiled
+            profile = g.pop('profile', None)
+            if profile is not None:
+                profile.stop()
+
+    @app.before_request
+    def select_context():
+        """Bind the request to its kube context and start that context's watch cache and sampler lazily"""
+        cookie = request.cookies.get('kube_context')
+        if cookie and not known_context(cookie):
+            # The kubeconfig no longer has this context; forget it instead of failing every request
+            g.forget_context = True
+            cookie = None
+        context_name = request.args.get('context')
+        if context_name and not known_context(context_name):
+            context_name = None
+        use_context(context_name or cookie)
+        if current_context() is None:
+            # Without a kubeconfig there is nothing to watch; API calls report the error
+            return
+        # A snapshot still loading in the background starts the informers itself, so they resume from it
+        if not (snapshots and restore_snapshot()):
+            get_cluster_cache().start()
+        get_stats_history().start()
+
+    @app.after_request
+    def clear_context_cookie(response):
+        if g.pop('forget_context', False):
+            response.delete_cookie('kube_context', samesite='Lax')
+        return response
+
+    @app.after_request
+    def compress(response):
+        """gzip or brotli large responses for clients that accept it"""
+        return compress_response(response, request.accept_encodings)
+
+    @app.context_processor
+    def inject_stats():
+        """Inject cluster statistics into all templates"""
+        stats = get_current_stats()
+        return stats
+
+    return app
 
 if __name__ == '__main__':
-    app.run(
+    # Development server; see gunicorn.conf.py for production serving
+    create_app().run(
         host=Config.HOST,
         port=Config.PORT,
         debug=Config.DEBUG
-    )
\ No newline at end of file
+    )
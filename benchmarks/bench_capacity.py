@@ -0,0 +1,89 @@
+"""Compare per-namespace/per-node request sums in Python loops with the columnar snapshot
+
+    python -m benchmarks.bench_capacity --pods 50000 --namespaces 50
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+from benchmarks.synthetic import make_pod
+from services.capacity import CapacitySnapshot
+from utils.quantity import parse_cpu, parse_memory
+
+
+def as_model(pod):
+    """The attributes of a V1Pod that capacity reports read, without client deserialization"""
+    return SimpleNamespace(
+        metadata=SimpleNamespace(namespace=pod['metadata']['namespace'], name=pod['metadata']['name']),
+        spec=SimpleNamespace(
+            node_name=pod['spec']['nodeName'],
+            containers=[
+                SimpleNamespace(resources=SimpleNamespace(**container['resources']))
+                for container in pod['spec']['containers']
+            ]
+        ),
+        status=SimpleNamespace(phase=pod['status']['phase'], qos_class=pod['status']['qosClass'])
+    )
+
+def make_nodes(count):
+    return [
+        SimpleNamespace(
+            metadata=SimpleNamespace(name=f"node-{index}"),
+            status=SimpleNamespace(allocatable={'cpu': '16', 'memory': '64Gi'})
+        )
+        for index in range(count)
+    ]
+
+def loop_reports(pods):
+    """What the reports would cost computed with nested loops, as get_cluster_stats does"""
+    by_namespace = {}
+    by_node = {}
+    for pod in pods:
+        if pod.status.phase not in ('Pending', 'Running', 'Unknown'):
+            continue
+        for container in pod.spec.containers:
+            requests = container.resources.requests or {}
+            cpu = parse_cpu(requests.get('cpu', '0'))
+            memory = parse_memory(requests.get('memory', '0'))
+            for totals, key in ((by_namespace, pod.metadata.namespace), (by_node, pod.spec.node_name)):
+                entry = totals.setdefault(key, [0, 0])
+                entry[0] += cpu
+                entry[1] += memory
+    return by_namespace, by_node
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, default=50000)
+    parser.add_argument('--namespaces', type=int, default=50)
+    parser.add_argument('--containers', type=int, default=2)
+    args = parser.parse_args()
+
+    per_namespace = args.pods // args.namespaces
+    pods = [
+        as_model(make_pod(f"ns-{n}", i, args.containers))
+        for n in range(args.namespaces)
+        for i in range(per_namespace)
+    ]
+    nodes = make_nodes(16)
+    print(f"{len(pods)} pods x {args.containers} containers over {args.namespaces} namespaces and {len(nodes)} nodes")
+
+    loop_seconds, (by_namespace, by_node) = timed(lambda: loop_reports(pods))
+    build_seconds, snapshot = timed(lambda: CapacitySnapshot(pods, nodes))
+    report_seconds, (namespaces, node_rows, _) = timed(lambda: (
+        snapshot.namespace_report(), snapshot.node_report(), snapshot.summary()
+    ))
+
+    print(f"  python loops, two group-bys: {loop_seconds * 1000:8.1f} ms")
+    print(f"  build columnar snapshot:     {build_seconds * 1000:8.1f} ms (reused for CAPACITY_SNAPSHOT_TTL)")
+    print(f"  all reports from snapshot:   {report_seconds * 1000:8.1f} ms")
+
+    assert all(by_namespace[row['namespace']][0] == row['cpu']['requests'] for row in namespaces)
+    assert all(by_node[row['name']][1] == row['memory']['requests'] for row in node_rows if row['pods'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compare /api/debug latency with upstream calls awaited together and one at a time
+
+Serves a namespace from a local fake apiserver that delays every response,
+with the watch cache off so each request makes its reads upstream.
+
+    python -m benchmarks.bench_debug --latency 50 --paths 8
+"""
+
+import argparse
+import os
+import statistics
+import time
+from benchmarks.fake_apiserver import APPS, FakeApiServer, make_cluster, make_ingress, write_kubeconfig
+
+NAMESPACE = 'ns-0'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=50, help='milliseconds added to every upstream response')
+    parser.add_argument('--paths', type=int, default=8, help='backend paths of the ingress')
+    parser.add_argument('--services', type=int, default=4, help=f'distinct services behind those paths (at most {APPS})')
+    parser.add_argument('--pods', type=int, default=20, help='pods in the namespace (their LIST is CPU-bound to decode)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cluster = make_cluster(namespaces=1, pods=args.pods)
+    services = [f"app-{i}" for i in range(min(args.services, APPS))]
+    cluster['ingresses'][NAMESPACE] = [make_ingress(NAMESPACE, 0, [services[i % len(services)] for i in range(args.paths)])]
+    server = FakeApiServer(cluster, latency=args.latency / 1000).start()
+    # The kubeconfig location is read when the kubernetes package is imported
+    os.environ['KUBECONFIG'] = kubeconfig = write_kubeconfig({'bench': server.url})
+    from app import create_app
+    from services.kubernetes import response_cache
+    from utils.config import Config
+    Config.WATCH_CACHE_ENABLED = False
+    Config.SNAPSHOT_ENABLED = False
+    client = create_app().test_client()
+
+    print(f"{args.latency:g} ms per upstream call, ingress with {args.paths} paths to {args.services} services")
+    print(f"  {'resource':10} {'mode':11} {'p50 ms':>8} {'max ms':>8} {'calls':>6}")
+    for url in (f"/api/debug/ingress/{NAMESPACE}/ing-0", f"/api/debug/service/{NAMESPACE}/app-0",
+                f"/api/debug/configmap/{NAMESPACE}/app-0-config"):
+        for concurrent in (False, True):
+            Config.CONCURRENT_UPSTREAM = concurrent
+            timings = []
+            for _ in range(args.repeat):
+                response_cache.invalidate()
+                calls_before = server.call_count()
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+                calls = server.call_count() - calls_before
+                assert response.status_code == 200, response.get_data(as_text=True)
+            mode = 'concurrent' if concurrent else 'sequential'
+            print(f"  {url.split('/')[3]:10} {mode:11} {statistics.median(timings):8.1f} {max(timings):8.1f} {calls:6}")
+    server.stop()
+    os.unlink(kubeconfig)
+
+if __name__ == '__main__':
+    main()
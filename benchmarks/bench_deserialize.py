@@ -0,0 +1,55 @@
+"""Compare client model deserialization with the raw-JSON fast path
+
+Both paths start from the same PodList payload and end with the rows
+/api/health/<namespace> returns.
+
+    python -m benchmarks.bench_deserialize --pods 5000 --containers 2
+"""
+
+import argparse
+import json
+import time
+from types import SimpleNamespace
+from kubernetes import client
+from benchmarks.synthetic import make_pod_list
+from routes.api import build_health_rows, build_health_rows_raw
+from services import raw
+
+
+def model_path(payload, api_client):
+    pods = api_client.deserialize(SimpleNamespace(data=payload), 'V1PodList').items
+    return build_health_rows(pods)
+
+def raw_path(payload, api_client):
+    return build_health_rows_raw(raw.loads(payload)['items'])
+
+def measure(func, payload, api_client, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = func(payload, api_client)
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, default=2000)
+    parser.add_argument('--containers', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payload = json.dumps(make_pod_list(1, args.pods, args.containers))
+    api_client = client.ApiClient()
+    print(f"payload: {args.pods} pods x {args.containers} containers, {len(payload) / 1e6:.1f} MB, "
+          f"decoder: {raw.loads.__module__}")
+
+    results = {}
+    for name, func in (('model', model_path), ('raw', raw_path)):
+        seconds, rows = measure(func, payload, api_client, args.repeat)
+        results[name] = rows
+        print(f"{name:>6}: {seconds * 1000:8.1f} ms  {args.pods / seconds:10.0f} pods/s")
+
+    assert results['model'] == results['raw'], 'fast path rows differ from model path rows'
+
+if __name__ == '__main__':
+    main()
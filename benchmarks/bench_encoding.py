@@ -0,0 +1,67 @@
+"""Compare response encodings: encode time and bytes on the wire for each JSON encoder, layout and compression
+
+    python -m benchmarks.bench_encoding --namespaces 40 --pods 500
+"""
+
+import argparse
+import gzip
+import json
+import time
+from benchmarks.synthetic import make_pod_list
+from routes.api import build_all_image_rows_raw, build_health_rows_raw
+from utils import encoding
+from utils.config import Config
+
+
+def timed(func, repeat=3):
+    """Best of repeat runs, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def encoders():
+    yield 'json', lambda obj: json.dumps(obj, separators=(',', ':')).encode()
+    # What Flask's default provider did: sorted keys
+    yield 'json sorted', lambda obj: json.dumps(obj, separators=(',', ':'), sort_keys=True).encode()
+    if encoding.orjson is not None:
+        yield 'orjson', lambda obj: encoding.orjson.dumps(obj)
+
+def compressors():
+    yield 'identity', lambda data: data
+    yield f'gzip-{Config.GZIP_LEVEL}', lambda data: gzip.compress(data, compresslevel=Config.GZIP_LEVEL, mtime=0)
+    if encoding.brotli is not None:
+        yield f'br-{Config.BROTLI_QUALITY}', lambda data: encoding.brotli.compress(data, quality=Config.BROTLI_QUALITY)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--namespaces', type=int, default=40)
+    parser.add_argument('--pods', type=int, default=500, help='pods per namespace')
+    parser.add_argument('--containers', type=int, default=2)
+    args = parser.parse_args()
+
+    pods = make_pod_list(args.namespaces, args.pods, args.containers)['items']
+    listings = {
+        '/api/images': build_all_image_rows_raw(pods),
+        '/api/health': build_health_rows_raw(pods),
+    }
+    if encoding.brotli is None:
+        print("brotli is not installed; br rows are skipped")
+
+    for name, rows in listings.items():
+        print(f"{name}: {len(rows)} rows")
+        print(f"  {'encoder':12} {'layout':7} {'compression':11} {'encode ms':>10} {'compress ms':>12} {'bytes':>12}")
+        layouts = {'objects': rows, 'table': encoding.as_table(rows)}
+        for encoder_name, encode in encoders():
+            for layout, payload in layouts.items():
+                encode_ms, data = timed(lambda: encode(payload))
+                for compressor_name, compress in compressors():
+                    compress_ms, body = timed(lambda: compress(data))
+                    print(f"  {encoder_name:12} {layout:7} {compressor_name:11} "
+                          f"{encode_ms:10.1f} {compress_ms:12.1f} {len(body):12,}")
+
+if __name__ == '__main__':
+    main()
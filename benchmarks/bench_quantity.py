@@ -0,0 +1,90 @@
+"""Benchmark resource quantity parsing over a large container list
+
+Compares the previous float parsers (which only understood m/Ki/Mi/Gi)
+with utils.quantity: unmemoized and memoized single-value parsing and the
+batch helpers, over requests drawn from a realistic mix of quantity strings.
+
+    python -m benchmarks.bench_quantity --containers 100000
+"""
+
+import argparse
+import math
+import random
+import time
+from utils import quantity
+
+CPU_VALUES = ['50m', '100m', '250m', '500m', '1', '2', '1.5', '250000n', '0.1', '4000m', '1e0']
+MEMORY_VALUES = ['64Mi', '128Mi', '256Mi', '512Mi', '1Gi', '1.5Gi', '2Gi', '500M', '1G', '4Gi', '1e9', '134217728']
+
+
+def legacy_cpu(cpu_str):
+    """The float parser this module replaced"""
+    if not cpu_str:
+        return 0
+    try:
+        if isinstance(cpu_str, str) and cpu_str.endswith('m'):
+            return float(cpu_str[:-1]) / 1000
+        return float(cpu_str)
+    except (ValueError, AttributeError):
+        return 0
+
+def legacy_memory(memory_str):
+    """The float parser this module replaced"""
+    if not memory_str:
+        return 0
+    try:
+        if memory_str.endswith('Ki'):
+            return int(memory_str[:-2]) / (1024 * 1024)
+        elif memory_str.endswith('Mi'):
+            return int(memory_str[:-2]) / 1024
+        elif memory_str.endswith('Gi'):
+            return int(memory_str[:-2])
+        else:
+            return int(memory_str) / (1024 * 1024 * 1024)
+    except (ValueError, AttributeError):
+        return 0
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--containers', type=int, default=100000)
+    parser.add_argument('--unique', type=int, default=200, help='extra distinct values mixed in')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cpu = [rng.choice(CPU_VALUES) for _ in range(args.containers)]
+    memory = [rng.choice(MEMORY_VALUES) for _ in range(args.containers)]
+    for i in range(args.unique):
+        cpu[rng.randrange(args.containers)] = f"{i + 1}m"
+        memory[rng.randrange(args.containers)] = f"{i + 1}Ki"
+    print(f"{args.containers} containers, {len(set(cpu))} distinct cpu and {len(set(memory))} distinct memory values")
+
+    results = [
+        ('legacy float', lambda: (sum(map(legacy_cpu, cpu)), sum(map(legacy_memory, memory)))),
+        ('exact, memoized', lambda: (sum(map(quantity.parse_cpu, cpu)), sum(map(quantity.parse_memory, memory)))),
+        ('exact, batch', lambda: (sum(quantity.parse_cpu_batch(cpu)), sum(quantity.parse_memory_batch(memory)))),
+    ]
+    # Unmemoized cost: every value parsed as if it were new
+    parse = quantity.parse_quantity.__wrapped__
+    seconds, _ = timed(lambda: [math.ceil(parse(value) * 1000) for value in cpu] +
+                               [math.ceil(parse(value)) for value in memory])
+    print(f"  {'exact, unmemoized':>16}: {seconds * 1000:8.1f} ms")
+    totals = {}
+    for name, func in results:
+        seconds, totals[name] = timed(func)
+        print(f"  {name:>16}: {seconds * 1000:8.1f} ms")
+
+    legacy_cpu_total, legacy_memory_total = totals['legacy float']
+    exact_cpu_total, exact_memory_total = totals['exact, batch']
+    print(f"cpu total:    legacy {legacy_cpu_total:.1f} cores, exact {exact_cpu_total / 1000:.1f} cores")
+    print(f"memory total: legacy {legacy_memory_total:.1f} GiB, exact {exact_memory_total / 1024 ** 3:.1f} GiB")
+    zeroed = sum(1 for value in cpu if legacy_cpu(value) == 0) + sum(1 for value in memory if legacy_memory(value) == 0)
+    print(f"values the legacy parsers turned into 0: {zeroed}")
+    assert totals['exact, memoized'] == totals['exact, batch']
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Drive every route of the app against a fake apiserver and record latency, throughput, upstream calls and memory
+
+    python -m benchmarks.bench_routes --namespaces 20 --pods 200 --latency 10
+    python -m benchmarks.bench_routes --compare .pyk/benchmarks/routes-abc1234-warm.json
+
+Each route is requested once (the cold first request) and then --requests
+times from --concurrency threads. Results go to a JSON file named after the
+current commit, so runs on two commits can be compared with --compare.
+With --watch-cache warm (the default) requests are measured once the
+informers have synced; cold measures the apiserver fallbacks.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from benchmarks.fake_apiserver import add_cluster_arguments, server_from_arguments, write_kubeconfig
+
+# Values for URL variables; the app-* names exist in every synthetic namespace
+URL_VALUES = {
+    'namespace': 'ns-0',
+    'pod_name': 'app-0-00000',
+    'resource_type': 'service',
+    'name': 'app-0',
+    'context_name': 'bench',
+}
+# Further requests for routes whose query parameters or variables change what they do
+VARIANTS = {
+    '/api/debug/<resource_type>/<namespace>/<name>': [
+        '/api/debug/ingress/ns-0/ing-0', '/api/debug/configmap/ns-0/app-0-config', '/api/debug/secret/ns-0/app-0-tls',
+    ],
+    '/api/image-search': ['/api/image-search?q=app-3'],
+    '/api/pods/<namespace>': ['/api/pods/ns-0?limit=50'],
+    '/api/images': ['/api/images?format=table'],
+    '/api/selectors/<namespace>': ['/api/selectors/ns-0?selector=app%3Dapp-1'],
+    '/api/stats/history': ['/api/stats/history?range=1h'],
+}
+# Server-Sent Event streams never finish, so they cannot be timed per request
+SKIPPED = {'/api/stream', '/api/stream/<namespace>'}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def peak_rss_mb():
+    """High-water resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}-dirty" if dirty else commit
+
+def route_requests(app):
+    """(rule, method, url) for every route, with its variants; SSE streams excluded"""
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint == 'static' or rule.rule in SKIPPED:
+            continue
+        method = 'POST' if 'POST' in rule.methods else 'GET'
+        url = rule.rule
+        for variable in rule.arguments:
+            url = url.replace(f"<{variable}>", URL_VALUES[variable])
+        yield rule.rule, method, url
+        for variant in VARIANTS.get(rule.rule, []):
+            yield rule.rule, method, variant
+
+def measure(app, server, method, url, requests, concurrency):
+    """Time one cold request and then `requests` more from `concurrency` threads"""
+    clients = threading.local()
+
+    def send():
+        if not hasattr(clients, 'client'):
+            clients.client = app.test_client()
+        start = time.perf_counter()
+        response = clients.client.open(url, method=method)
+        response.get_data()
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    calls_before = server.call_count()
+    first_ms, status = send()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(lambda _: send(), range(requests)))
+        elapsed = time.perf_counter() - start
+    timings = sorted(ms for ms, _ in results)
+    statuses = sorted({code for _, code in results} | {status})
+    return {
+        'url': url,
+        'method': method,
+        'status': statuses,
+        'requests': requests,
+        'first_ms': round(first_ms, 2),
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'mean_ms': round(sum(timings) / len(timings), 2),
+        'throughput_rps': round(requests / elapsed, 1),
+        'upstream_calls': server.call_count() - calls_before,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def compare(baseline_path, results, threshold):
+    """Print each request's p50/p99 against a baseline results file, flagging slowdowns beyond threshold"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(row['method'], row['url']): row for row in baseline['routes']}
+    print(f"\nAgainst {baseline['commit']} ({baseline_path}):")
+    print(f"  {'request':55} {'p50 ms':>17} {'p99 ms':>17} {'upstream':>11}")
+    for row in results['routes']:
+        old = before.get((row['method'], row['url']))
+        if old is None:
+            continue
+        slower = row['p50_ms'] > old['p50_ms'] * threshold or row['p99_ms'] > old['p99_ms'] * threshold
+        print(f"  {row['method'] + ' ' + row['url']:55} {old['p50_ms']:8.2f}>{row['p50_ms']:<8.2f} "
+              f"{old['p99_ms']:8.2f}>{row['p99_ms']:<8.2f} {old['upstream_calls']:5}>{row['upstream_calls']:<5}"
+              f"{'  SLOWER' if slower else ''}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_cluster_arguments(parser)
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per route, after the first')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--watch-cache', choices=('warm', 'cold'), default='warm')
+    parser.add_argument('--output', help='results file (default .pyk/benchmarks/routes-<commit>-<watch cache>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='results file of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio --compare flags')
+    args = parser.parse_args()
+
+    server = server_from_arguments(args).start()
+    # The kubeconfig location is read when the kubernetes package is imported
+    os.environ['KUBECONFIG'] = kubeconfig = write_kubeconfig({'bench': server.url})
+    from app import create_app
+    from services.kubernetes import get_cluster_cache
+    from utils.config import Config
+    Config.WATCH_CACHE_ENABLED = args.watch_cache == 'warm'
+    Config.SNAPSHOT_ENABLED = False
+    app = create_app()
+
+    rss_at_start = peak_rss_mb()
+    setup_start = time.perf_counter()
+    app.test_client().get('/api/cache/status')
+    if Config.WATCH_CACHE_ENABLED and not get_cluster_cache('bench').wait_for_sync(300):
+        parser.error("the watch cache did not sync within 300 seconds")
+    results = {
+        'commit': git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'arguments': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'threshold')},
+        'sync_seconds': round(time.perf_counter() - setup_start, 2),
+        'sync_upstream_calls': server.call_count(),
+        'rss_at_start_mb': rss_at_start,
+        'routes': [],
+        'skipped': sorted(SKIPPED),
+    }
+
+    print(f"{args.namespaces} namespaces x {args.pods} pods, {args.latency:g} ms upstream latency, "
+          f"watch cache {args.watch_cache}, synced in {results['sync_seconds']} s")
+    print(f"  {'request':55} {'first':>8} {'p50':>8} {'p99':>8} {'req/s':>8} {'calls':>6} {'rss MB':>7}")
+    for rule, method, url in route_requests(app):
+        row = dict(measure(app, server, method, url, args.requests, args.concurrency), route=rule)
+        results['routes'].append(row)
+        print(f"  {method + ' ' + url:55} {row['first_ms']:8.1f} {row['p50_ms']:8.1f} {row['p99_ms']:8.1f} "
+              f"{row['throughput_rps']:8.1f} {row['upstream_calls']:6} {row['peak_rss_mb']:7.1f}"
+              f"{'  status ' + ','.join(map(str, row['status'])) if row['status'][-1] >= 400 else ''}")
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    output = args.output or os.path.join('.pyk', 'benchmarks', f"routes-{results['commit']}-{args.watch_cache}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Peak RSS {results['peak_rss_mb']} MB; results written to {output}")
+    if args.compare:
+        compare(args.compare, results, args.threshold)
+    server.stop()
+    os.unlink(kubeconfig)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Compare a per-request label scan with the inverted label index
+
+Resolves every service in a namespace to its pods, once by checking each
+selector against every pod and once through LabelIndex.
+
+    python -m benchmarks.bench_selectors --pods 5000 --services 300
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+from benchmarks.synthetic import make_pod
+from services.labels import LabelIndex, selector_requirements
+
+
+def make_objects(pods, services):
+    namespace = 'ns-0'
+    pod_objects = []
+    for index in range(pods):
+        metadata = make_pod(namespace, index, containers=1)['metadata']
+        # Spread pods over more apps than the synthetic default so selectors stay selective
+        metadata['labels']['app'] = f"app-{index % services}"
+        pod_objects.append(SimpleNamespace(metadata=SimpleNamespace(
+            namespace=namespace, name=metadata['name'], labels=metadata['labels'])))
+    service_objects = [
+        SimpleNamespace(
+            metadata=SimpleNamespace(namespace=namespace, name=f"svc-{index}"),
+            spec=SimpleNamespace(selector={'app': f"app-{index}", 'tier': 'backend' if index % 2 else 'frontend'})
+        )
+        for index in range(services)
+    ]
+    return pod_objects, service_objects
+
+def scan(pods, services):
+    return {
+        service.metadata.name: sorted(
+            pod.metadata.name for pod in pods
+            if all((pod.metadata.labels or {}).get(k) == v for k, v in service.spec.selector.items())
+        )
+        for service in services
+    }
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, default=5000)
+    parser.add_argument('--services', type=int, default=300)
+    args = parser.parse_args()
+
+    pods, services = make_objects(args.pods, args.services)
+    print(f"namespace: {args.pods} pods, {args.services} services")
+
+    scan_seconds, scanned = timed(lambda: scan(pods, services))
+
+    index = LabelIndex()
+    def build():
+        for pod in pods:
+            index.on_pod('ADDED', None, pod)
+        for service in services:
+            index.on_service('ADDED', None, service)
+    build_seconds, _ = timed(build)
+    lookup_seconds, indexed = timed(lambda: index.service_pods('ns-0'))
+    select_seconds, _ = timed(lambda: [
+        index.select('ns-0', selector_requirements(service.spec.selector)) for service in services
+    ])
+    update_seconds, _ = timed(lambda: index.on_pod('MODIFIED', pods[0], pods[0]))
+
+    print(f"  scan all services: {scan_seconds * 1000:8.1f} ms")
+    print(f"  build index:       {build_seconds * 1000:8.1f} ms (once, then incremental)")
+    print(f"  service->pods map: {lookup_seconds * 1000:8.2f} ms")
+    print(f"  select per service:{select_seconds * 1000:8.2f} ms")
+    print(f"  one pod update:    {update_seconds * 1000:8.3f} ms")
+
+    assert scanned == indexed, 'index results differ from the scan'
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Compare a cold start (deserializing a pod LIST) with loading a saved snapshot
+
+    python -m benchmarks.bench_snapshot --pods 50000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from kubernetes import client
+from benchmarks.synthetic import make_pod_list
+from services.snapshots import SnapshotStore, dumps, loads
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, default=50000)
+    parser.add_argument('--containers', type=int, default=2)
+    args = parser.parse_args()
+
+    payload = json.dumps(make_pod_list(1, args.pods, args.containers))
+    api_client = client.ApiClient()
+    deserialize_seconds, pods = timed(
+        lambda: api_client.deserialize(SimpleNamespace(data=payload), 'V1PodList').items
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SnapshotStore(os.path.join(directory, 'snapshots.db'))
+        dump_seconds, body = timed(lambda: dumps(pods))
+        store.save('bench', 'pods', '1', body)
+        store.save('bench', 'pods', '2', body)
+        compact_seconds, removed = timed(store.compact)
+        read_seconds, row = timed(lambda: store.load('bench', 'pods'))
+        load_seconds, restored = timed(lambda: loads(row[2]))
+
+    print(f"{args.pods} pods x {args.containers} containers, snapshot {len(body) / 1e6:.1f} MB")
+    print(f"  cold: deserialize LIST   {deserialize_seconds * 1000:8.1f} ms (plus the LIST itself)")
+    print(f"  save: pickle             {dump_seconds * 1000:8.1f} ms (background)")
+    print(f"  compact ({removed} superseded) {compact_seconds * 1000:8.1f} ms")
+    print(f"  warm: read blob (mmap)   {read_seconds * 1000:8.1f} ms")
+    print(f"  warm: unpickle           {load_seconds * 1000:8.1f} ms")
+
+    assert [pod.metadata.name for pod in restored] == [pod.metadata.name for pod in pods]
+    assert restored[-1].spec.containers[0].resources.requests == pods[-1].spec.containers[0].resources.requests
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+"""Local stand-in for the Kubernetes API server, serving a synthetic cluster
+
+    python -m benchmarks.fake_apiserver --port 18080 --namespaces 20 --pods 200 --latency 20
+
+Answers the LIST (chunked with limit/continue), GET and WATCH calls the app
+makes for every kind it reads, delaying each response by --latency
+milliseconds (plus up to --jitter). Watches send no events and end after
+--watch-hold seconds. Calls are counted by verb and kind; GET /_calls
+returns the counts.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from benchmarks.synthetic import TIMESTAMP, make_pod
+
+PATH_RE = re.compile(
+    r'^/(?:api/v1|apis/networking\.k8s\.io/v1)(?:/namespaces/(?P<namespace>[^/]+))?'
+    r'/(?P<kind>pods|nodes|namespaces|services|ingresses|configmaps|secrets|events|resourcequotas)'
+    r'(?:/(?P<name>[^/]+))?$'
+)
+RESOURCE_VERSION = '1000'
+APPS = 7  # distinct app labels synthetic pods carry
+
+
+def metadata(name, namespace=None, **fields):
+    meta = {'name': name, 'uid': f"{namespace or ''}/{name}", 'resourceVersion': RESOURCE_VERSION, 'creationTimestamp': TIMESTAMP}
+    if namespace:
+        meta['namespace'] = namespace
+    meta.update(fields)
+    return meta
+
+def make_namespace(name):
+    return {'metadata': metadata(name), 'status': {'phase': 'Active'}}
+
+def make_service(namespace, app):
+    return {
+        'metadata': metadata(app, namespace, labels={'app': app}),
+        'spec': {
+            'type': 'ClusterIP', 'clusterIP': '10.96.0.10', 'selector': {'app': app},
+            'ports': [{'port': 80, 'targetPort': 8080, 'protocol': 'TCP'}],
+        },
+        'status': {'loadBalancer': {}},
+    }
+
+def make_ingress(namespace, index, services):
+    host = f"ing-{index}.{namespace}.example.com"
+    return {
+        'metadata': metadata(f"ing-{index}", namespace),
+        'spec': {
+            'ingressClassName': 'nginx',
+            'rules': [{'host': host, 'http': {'paths': [
+                {'path': f"/{service}", 'pathType': 'Prefix',
+                 'backend': {'service': {'name': service, 'port': {'number': 80}}}}
+                for service in services
+            ]}}],
+            'tls': [{'hosts': [host], 'secretName': f"{services[0]}-tls"}] if services else [],
+        },
+        'status': {'loadBalancer': {}},
+    }
+
+def make_event(namespace, index, pod):
+    return {
+        'metadata': metadata(f"{pod}.{index:x}", namespace),
+        'type': 'Warning' if index % 5 == 0 else 'Normal',
+        'reason': 'BackOff' if index % 5 == 0 else 'Pulled',
+        'message': f"Event {index} for pod {pod}",
+        'count': 1 + index % 3,
+        'firstTimestamp': TIMESTAMP,
+        'lastTimestamp': TIMESTAMP,
+        'involvedObject': {'kind': 'Pod', 'name': pod, 'namespace': namespace},
+    }
+
+def make_node(index):
+    return {
+        'metadata': metadata(f"node-{index}", labels={'kubernetes.io/hostname': f"node-{index}"}),
+        'status': {
+            'capacity': {'cpu': '16', 'memory': '64Gi', 'pods': '110'},
+            'allocatable': {'cpu': '15500m', 'memory': '62Gi', 'pods': '110'},
+            'conditions': [{'type': 'Ready', 'status': 'True', 'lastTransitionTime': TIMESTAMP}],
+        },
+    }
+
+def make_cluster(namespaces=10, pods=100, containers=2, events=20, services=APPS, ingresses=1, nodes=16):
+    """Every object of a synthetic cluster: kind -> namespace ('' when cluster-scoped) -> [object]"""
+    cluster = {
+        'namespaces': {'': [make_namespace(f"ns-{n}") for n in range(namespaces)]},
+        'nodes': {'': [make_node(i) for i in range(nodes)]},
+    }
+    for kind in ('pods', 'services', 'ingresses', 'configmaps', 'secrets', 'events', 'resourcequotas'):
+        cluster[kind] = {}
+    apps = [f"app-{i}" for i in range(APPS)]
+    for n in range(namespaces):
+        ns = f"ns-{n}"
+        ns_pods = [make_pod(ns, i, containers) for i in range(pods)]
+        service_names = apps[:services]
+        cluster['pods'][ns] = ns_pods
+        cluster['services'][ns] = [make_service(ns, app) for app in service_names]
+        cluster['ingresses'][ns] = [make_ingress(ns, i, service_names[i::ingresses] if ingresses else []) for i in range(ingresses)]
+        cluster['configmaps'][ns] = [
+            {'metadata': metadata(name, ns), 'data': {'features': 'a,b'}}
+            for name in ['shared-config'] + [f"{app}-config" for app in apps]
+        ]
+        cluster['secrets'][ns] = [
+            {'metadata': metadata(name, ns), 'type': 'Opaque', 'data': {'password': 'c2VjcmV0'}}
+            for app in apps for name in (f"{app}-db", f"{app}-tls")
+        ]
+        cluster['events'][ns] = [make_event(ns, i, ns_pods[i % len(ns_pods)]['metadata']['name']) for i in range(events if ns_pods else 0)]
+        cluster['resourcequotas'][ns] = [{
+            'metadata': metadata('quota', ns),
+            'spec': {'hard': {'pods': str(pods * 2), 'requests.cpu': '100'}},
+            'status': {'hard': {'pods': str(pods * 2), 'requests.cpu': '100'}, 'used': {'pods': str(pods), 'requests.cpu': '10'}},
+        }]
+    return cluster
+
+def matches_fields(obj, field_selector):
+    """Whether obj matches a fieldSelector of dotted-path=value terms"""
+    for term in filter(None, field_selector.split(',')):
+        path, _, expected = term.partition('=')
+        value = obj
+        for key in path.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        if value != expected:
+            return False
+    return True
+
+
+class FakeApiServer:
+    """A synthetic cluster served over HTTP on a background thread"""
+
+    def __init__(self, cluster, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, watch_hold=30.0):
+        self.cluster = cluster
+        self.latency = latency
+        self.jitter = jitter
+        self.watch_hold = watch_hold
+        self.calls = Counter()  # (verb, kind) -> count
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-apiserver', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def wait(self):
+        """Block until the server stops"""
+        self._thread.join()
+
+    def call_count(self, watches=False):
+        """Calls served so far; watches, which the informers hold open, only when asked"""
+        with self._lock:
+            return sum(count for (verb, kind), count in self.calls.items() if watches or verb != 'watch')
+
+    def _count(self, verb, kind):
+        with self._lock:
+            self.calls[(verb, kind)] += 1
+
+    def _objects(self, kind, namespace):
+        by_namespace = self.cluster.get(kind, {})
+        if namespace is not None:
+            return by_namespace.get(namespace, [])
+        return [obj for ns in sorted(by_namespace) for obj in by_namespace[ns]]
+
+    def _delay(self):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # The body follows the headers in a second small write; with Nagle on, a
+            # keep-alive client's delayed ACK holds it back ~40 ms per response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, body, status=200):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def not_found(self, name):
+                self.send_json({'kind': 'Status', 'apiVersion': 'v1', 'status': 'Failure',
+                                'message': f"{name} not found", 'reason': 'NotFound', 'code': 404}, 404)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path == '/_calls':
+                    with server._lock:
+                        counts = {f"{verb} {kind}": count for (verb, kind), count in server.calls.items()}
+                    return self.send_json({'calls': sum(counts.values()), 'by_call': counts})
+                match = PATH_RE.match(url.path)
+                if not match:
+                    server._count('get', 'unknown')
+                    return self.not_found(url.path)
+                namespace, kind, name = match.group('namespace', 'kind', 'name')
+
+                if query.get('watch', '').lower() in ('true', '1'):
+                    server._count('watch', kind)
+                    return self.watch(float(query.get('timeoutSeconds', server.watch_hold)))
+                server._count('get' if name else 'list', kind)
+                server._delay()
+                objects = server._objects(kind, namespace)
+                if name:
+                    for obj in objects:
+                        if obj['metadata']['name'] == name:
+                            return self.send_json(obj)
+                    return self.not_found(name)
+                if query.get('fieldSelector'):
+                    objects = [obj for obj in objects if matches_fields(obj, query['fieldSelector'])]
+                self.send_list(objects, int(query.get('limit') or 0), int(query.get('continue') or 0))
+
+            def send_list(self, objects, limit, start):
+                list_metadata = {'resourceVersion': RESOURCE_VERSION}
+                if limit:
+                    if start + limit < len(objects):
+                        list_metadata['continue'] = str(start + limit)
+                    objects = objects[start:start + limit]
+                self.send_json({'kind': 'List', 'apiVersion': 'v1', 'metadata': list_metadata, 'items': objects})
+
+            def watch(self, timeout):
+                """An event stream with no changes, closed after the timeout"""
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                self.wfile.flush()
+                server._stopping.wait(min(timeout, server.watch_hold))
+                try:
+                    self.wfile.write(b'0\r\n\r\n')
+                except OSError:
+                    pass
+
+        return Handler
+
+
+def write_kubeconfig(servers):
+    """A kubeconfig file with one context per {context name: server URL}; returns its path
+
+    The first context is the current one.
+    """
+    names = list(servers)
+    kubeconfig = {
+        'apiVersion': 'v1', 'kind': 'Config', 'current-context': names[0],
+        'clusters': [{'name': name, 'cluster': {'server': url}} for name, url in servers.items()],
+        'users': [{'name': 'bench', 'user': {'token': 'bench'}}],
+        'contexts': [{'name': name, 'context': {'cluster': name, 'user': 'bench'}} for name in names],
+    }
+    handle, path = tempfile.mkstemp(suffix='.kubeconfig')
+    with os.fdopen(handle, 'w') as f:
+        json.dump(kubeconfig, f)
+    return path
+
+def add_cluster_arguments(parser):
+    """Cluster size and latency options shared by the benchmarks that start a fake apiserver"""
+    parser.add_argument('--namespaces', type=int, default=10)
+    parser.add_argument('--pods', type=int, default=100, help='pods per namespace')
+    parser.add_argument('--containers', type=int, default=2, help='containers per pod')
+    parser.add_argument('--events', type=int, default=20, help='events per namespace')
+    parser.add_argument('--services', type=int, default=APPS, help=f'services per namespace (at most {APPS})')
+    parser.add_argument('--ingresses', type=int, default=1, help='ingresses per namespace')
+    parser.add_argument('--nodes', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds added to every non-watch response')
+    parser.add_argument('--jitter', type=float, default=0, help='up to this many more milliseconds, at random')
+
+def server_from_arguments(args, port=0, watch_hold=30.0):
+    cluster = make_cluster(args.namespaces, args.pods, args.containers, args.events,
+                           min(args.services, APPS), args.ingresses, args.nodes)
+    return FakeApiServer(cluster, port=port, latency=args.latency / 1000, jitter=args.jitter / 1000, watch_hold=watch_hold)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--watch-hold', type=float, default=30, help='seconds a watch stays open')
+    parser.add_argument('--kubeconfig', action='store_true', help='write a kubeconfig for this server and print its path')
+    add_cluster_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_arguments(args, args.port, args.watch_hold).start()
+    print(f"Serving {args.namespaces} namespaces x {args.pods} pods on {server.url}")
+    if args.kubeconfig:
+        print(f"KUBECONFIG={write_kubeconfig({'fake': server.url})}")
+    try:
+        server.wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Synthetic Kubernetes objects shaped like real apiserver responses"""
+
+import random
+
+TIMESTAMP = '2024-01-01T00:00:00Z'
+
+
+def make_pod(namespace, index, containers=2, seed=None):
+    """A pod dict with the fields a typical Deployment-managed pod carries"""
+    rng = random.Random(seed if seed is not None else f"{namespace}/{index}")
+    app = f"app-{index % 7}"
+    running = rng.random() > 0.1
+    return {
+        'apiVersion': 'v1',
+        'kind': 'Pod',
+        'metadata': {
+            'name': f"{app}-{index:05d}",
+            'namespace': namespace,
+            'uid': f"{namespace}-{index}",
+            'resourceVersion': str(1000 + index),
+            'creationTimestamp': TIMESTAMP,
+            'labels': {'app': app, 'tier': 'backend' if index % 2 else 'frontend', 'pod-template-hash': '5d8f7c9b4'},
+            'annotations': {'kubectl.kubernetes.io/restartedAt': TIMESTAMP},
+            'ownerReferences': [{
+                'apiVersion': 'apps/v1', 'kind': 'ReplicaSet', 'name': f"{app}-5d8f7c9b4",
+                'uid': f"rs-{app}", 'controller': True, 'blockOwnerDeletion': True
+            }],
+        },
+        'spec': {
+            'nodeName': f"node-{index % 16}",
+            'serviceAccountName': 'default',
+            'containers': [
+                {
+                    'name': f"c{c}",
+                    'image': f"registry.example.com:5000/team/{app}-{c}:v1.{index % 5}",
+                    'ports': [{'containerPort': 8080 + c, 'protocol': 'TCP'}],
+                    'env': [
+                        {'name': 'LOG_LEVEL', 'value': 'info'},
+                        {'name': 'DB_PASSWORD', 'valueFrom': {'secretKeyRef': {'name': f"{app}-db", 'key': 'password'}}},
+                        {'name': 'FEATURES', 'valueFrom': {'configMapKeyRef': {'name': f"{app}-config", 'key': 'features'}}},
+                    ],
+                    'envFrom': [{'configMapRef': {'name': 'shared-config'}}],
+                    'resources': {
+                        'requests': {'cpu': f"{100 * (c + 1)}m", 'memory': f"{128 * (c + 1)}Mi"},
+                        'limits': {'cpu': '1', 'memory': '1Gi'},
+                    },
+                    'volumeMounts': [{'name': 'config', 'mountPath': '/etc/config'}],
+                }
+                for c in range(containers)
+            ],
+            'volumes': [
+                {'name': 'config', 'configMap': {'name': f"{app}-config"}},
+                {'name': 'token', 'projected': {'sources': [{'secret': {'name': f"{app}-tls"}}, {'serviceAccountToken': {'path': 'token'}}]}},
+            ],
+        },
+        'status': {
+            'phase': 'Running' if running else 'Pending',
+            'qosClass': 'Burstable',
+            'podIP': f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+            'hostIP': f"192.168.0.{index % 16}",
+            'startTime': TIMESTAMP,
+            'conditions': [
+                {'type': 'Ready', 'status': 'True' if running else 'False', 'lastTransitionTime': TIMESTAMP},
+                {'type': 'PodScheduled', 'status': 'True', 'lastTransitionTime': TIMESTAMP},
+            ],
+            'containerStatuses': [
+                {
+                    'name': f"c{c}",
+                    'ready': running,
+                    'restartCount': rng.randint(0, 3),
+                    'image': f"registry.example.com:5000/team/{app}-{c}:v1.{index % 5}",
+                    'imageID': f"registry.example.com:5000/team/{app}-{c}@sha256:{'0' * 64}",
+                    'state': {'running': {'startedAt': TIMESTAMP}} if running else {'waiting': {'reason': 'ContainerCreating'}},
+                }
+                for c in range(containers)
+            ],
+        },
+    }
+
+def make_pod_list(namespaces=1, pods_per_namespace=1000, containers=2):
+    """A PodList dict spanning the given number of namespaces"""
+    return {
+        'apiVersion': 'v1',
+        'kind': 'PodList',
+        'metadata': {'resourceVersion': '1000'},
+        'items': [
+            make_pod(f"ns-{n}", i, containers)
+            for n in range(namespaces)
+            for i in range(pods_per_namespace)
+        ],
+    }
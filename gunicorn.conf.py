@@ -0,0 +1,39 @@
+"""gunicorn settings for production serving
+
+    gunicorn -c gunicorn.conf.py
+
+Runs SERVER_WORKERS processes with SERVER_THREADS request threads each.
+With SHARED_CACHE_ENABLED the master first starts the cache server, which
+alone watches the apiserver; every worker mirrors its caches over
+SHARED_CACHE_SOCKET.
+
+Each open live update stream holds one of a worker's threads, so a
+worker accepts at most STREAM_MAX_CLIENTS of them (503 beyond that);
+keep SERVER_THREADS comfortably above it.
+"""
+
+from utils.config import Config
+
+wsgi_app = 'app:create_app()'
+bind = f"{Config.HOST}:{Config.PORT}"
+workers = Config.SERVER_WORKERS
+threads = Config.SERVER_THREADS
+worker_class = 'gthread'
+timeout = Config.SERVER_TIMEOUT
+
+
+def on_starting(server):
+    if Config.SHARED_CACHE_ENABLED:
+        from services.shared import start_cache_server
+        server.cache_process = start_cache_server()
+
+def post_fork(server, worker):
+    if Config.SHARED_CACHE_ENABLED:
+        from services.shared import use_cache_server
+        use_cache_server()
+
+def on_exit(server):
+    process = getattr(server, 'cache_process', None)
+    if process is not None:
+        process.terminate()
+        process.join(10)
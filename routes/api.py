@@ -1,24 +1,56 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, make_response, request, stream_with_context
 from functools import wraps
-from kubernetes import client, config
+import contextvars
+import hashlib
+import json
+import queue
+import threading
+import time
+from kubernetes import config
+from kubernetes.client.exceptions import ApiException
+from services.clients import client_pool, current_context, list_context_names, use_context
 from services.kubernetes import (
     get_pods_in_namespace, get_pod_health, get_pod_resources,
     get_pod_images, get_pod_restart_count, get_namespace_events,
     get_all_pods, get_namespaces, get_namespace_resource_quotas,
     get_namespace_configmaps, get_namespace_secrets, get_namespace_services,
-    get_namespace_ingresses
+    get_services_in_namespace, get_namespace_ingresses, get_cluster_cache, response_cache,
+    get_raw_pods, get_pods_page, get_namespace_events_page, get_namespaces_page,
+    get_event_data, get_stream_hub, token_offset, PageTokenError
 )
+from services import aio, raw
+from services.aio import upstream_executor
+from services.capacity import RESOURCES, get_capacity_snapshot
+from services.labels import (
+    get_label_index, label_index_synced, match_service_pods, parse_selector, selector_requirements
+)
+from services.references import get_reference_index
+from services.search import get_image_search_index
+from services.history import parse_duration
+from services.inventory import get_image_inventory
+from services.statistics import get_current_stats, get_stats_history
+from services.versions import resource_versions
+from utils.cache import TTLCache
+from utils.config import Config
+from utils.encoding import as_table, dumps
+from utils.images import short_image
+from utils.metrics import ERRORS
 
 api = Blueprint('api', __name__)
-v1 = client.CoreV1Api()
-networking_v1 = client.NetworkingV1Api()
+
+class InvalidArgument(ValueError):
+    """A query parameter the request cannot be served with"""
+
 
 def handle_kubernetes_errors(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
             return f(*args, **kwargs)
-        except client.rest.ApiException as e:
+        except (InvalidArgument, PageTokenError) as e:
+            return jsonify({'error': str(e)}), 400
+        except ApiException as e:
+            ERRORS.inc(request.url_rule.rule, type(e).__name__)
             if e.status == 403:
                 return jsonify({'error': 'Access forbidden. Check RBAC permissions.'}), 403
             elif e.status == 404:
@@ -26,14 +58,200 @@ def handle_kubernetes_errors(f):
             return jsonify({'error': f'Kubernetes API error: {str(e)}'}), e.status or 500
 
         except Exception as e:
+            ERRORS.inc(request.url_rule.rule, type(e).__name__)
             return jsonify({'error': str(e)}), 500
     return decorated_function
 
+# Rendered bodies of conditional responses, by ETag
+body_cache = TTLCache(maxsize=Config.ETAG_CACHE_ENTRIES)
+
+def version_etag(kinds, namespace, relative_times):
+    """ETag for this request from the resourceVersions of the kinds it reads, or None if they are unknown"""
+    if request.method != 'GET' or request.args.get('contexts') or wants_ndjson():
+        return None
+    versions = resource_versions(kinds, namespace)
+    if versions is None:
+        return None
+    parts = [current_context(), request.path, sorted(request.args.items(multi=True)), versions]
+    if relative_times:
+        parts.append(int(time.time() // Config.ETAG_AGE_BUCKET))
+    return hashlib.sha1(json.dumps(parts).encode()).hexdigest()
+
+def conditional(*kinds, relative_times=False):
+    """Answer repeat GETs of a view from the resourceVersions of the kinds it reads
+
+    While those kinds are served from the warm watch cache, a matching
+    If-None-Match gets a 304 and any other repeat request gets the body
+    cached for its ETag, both without running the view or calling the
+    apiserver. Views showing ages or "last seen" times pass relative_times
+    so their ETag also changes every ETAG_AGE_BUCKET seconds.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = version_etag(kinds, kwargs.get('namespace'), relative_times)
+            if etag is None:
+                return f(*args, **kwargs)
+            
+            matched = matched_etag(etag)
+            if matched:
+                return not_modified(matched)
+            
+            cached = body_cache.get(etag)
+            if cached is not None:
+                response = Response(cached[0], mimetype=cached[1])
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body_cache.set(etag, Config.ETAG_CACHE_TTL, (response.get_data(), response.mimetype))
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+def matched_etag(etag):
+    """The tag If-None-Match names for etag, as sent or with a content encoding appended, or None"""
+    for candidate in (etag, f"{etag}-gzip", f"{etag}-br"):
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+def not_modified(etag):
+    return Response(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+
+@api.after_request
+def add_etag(response):
+    """Give every other JSON response a strong ETag from its body and answer If-None-Match with 304"""
+    if (request.method == 'GET' and response.status_code == 200 and response.mimetype == 'application/json'
+            and not response.is_streamed and 'ETag' not in response.headers):
+        response.add_etag()
+        response.headers['Cache-Control'] = 'no-cache'
+        matched = matched_etag(response.get_etag()[0])
+        if matched:
+            return not_modified(matched)
+    return response
+
+def page_args():
+    """Return (limit, continue token) when the request asks for a page, else None; InvalidArgument if malformed"""
+    if 'limit' not in request.args and 'continue' not in request.args:
+        return None
+    try:
+        limit = int(request.args.get('limit') or Config.ITEMS_PER_PAGE)
+    except ValueError:
+        raise InvalidArgument(f"limit must be an integer, not {request.args['limit']!r}")
+    if limit < 1:
+        raise InvalidArgument("limit must be at least 1")
+    token = request.args.get('continue') or None
+    token_offset(token)  # raises PageTokenError for a malformed offset token
+    return min(limit, Config.MAX_PAGE_SIZE), token
+
+def listing(rows):
+    """Rows as sent: columns plus arrays with ?format=table, else a list of objects"""
+    return as_table(rows) if request.args.get('format') == 'table' else rows
+
+def page_response(items, token):
+    """Wrap one page of rows with the token for the next page"""
+    return jsonify({'items': listing(items), 'continue': token})
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_ndjson():
+    """Whether the client asked for newline-delimited JSON"""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def iter_pages(fetch_page):
+    """Walk every apiserver chunk of a LIST, yielding one page of items at a time"""
+    token = None
+    while True:
+        items, token = fetch_page(Config.STREAM_PAGE_SIZE, token)
+        yield items
+        if not token:
+            break
+
+def requested_contexts():
+    """Contexts named by ?contexts= (comma-separated or 'all'), or None for the current one"""
+    requested = request.args.get('contexts')
+    if not requested:
+        return None
+    if requested == 'all':
+        return list_context_names()
+    return [name.strip() for name in requested.split(',') if name.strip()]
+
+def fan_out(contexts, build):
+    """Run build() against every context in parallel and merge the rows, tagged with their cluster"""
+    def run_in(context_name):
+        use_context(context_name)
+        return build()
+    
+    futures = {
+        name: upstream_executor.submit(contextvars.copy_context().run, run_in, name)
+        for name in contexts
+    }
+    items = []
+    errors = {}
+    for name, future in futures.items():
+        try:
+            rows = future.result()
+        except Exception as e:
+            # One unreachable cluster should not hide the others
+            errors[name] = str(e)
+            continue
+        items.extend(dict(row, cluster=name) for row in rows)
+    return jsonify({'items': listing(items), 'errors': errors})
+
+def iter_cached(kind):
+    """Yield a warm watch-cache listing in STREAM_PAGE_SIZE slices"""
+    items = get_cluster_cache().list(kind)
+    for start in range(0, len(items), Config.STREAM_PAGE_SIZE):
+        yield items[start:start + Config.STREAM_PAGE_SIZE]
+
+def ndjson_response(pages, build):
+    """Stream build(page) rows one JSON document per line as pages arrive"""
+    def generate():
+        try:
+            for items in pages:
+                for row in build(items):
+                    yield dumps(row) + b'\n'
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield dumps({'error': str(e)}) + b'\n'
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def pod_pages_stream(build, build_raw):
+    """NDJSON rows for every pod in the cluster"""
+    if get_cluster_cache().has_synced('pods'):
+        return ndjson_response(iter_cached('pods'), build)
+    if use_raw_fast_path('pods'):
+        return ndjson_response(
+            iter_pages(lambda limit, token: get_pods_page(None, limit, token, raw_json=True)), build_raw
+        )
+    return ndjson_response(iter_pages(lambda limit, token: get_pods_page(None, limit, token)), build)
+
+def pod_rows_page(namespace, page, build, build_raw):
+    """Build rows for one apiserver chunk of pods"""
+    if use_raw_fast_path('pods'):
+        pods, token = get_pods_page(namespace, *page, raw_json=True)
+        return page_response(build_raw(pods), token)
+    pods, token = get_pods_page(namespace, *page)
+    return page_response(build(pods), token)
+
 @api.route('/pods/<namespace>')
 @handle_kubernetes_errors
+@conditional('pods', relative_times=True)
 def get_pod_data(namespace):
     """Get detailed pod information for a namespace"""
+    page = page_args()
+    if page:
+        return pod_rows_page(namespace, page, build_pod_rows, build_pod_rows_raw)
+    if use_raw_fast_path('pods'):
+        return jsonify(listing(build_pod_rows_raw(get_raw_pods(namespace))))
     pods = get_pods_in_namespace(namespace)
+    return jsonify(listing(build_pod_rows(pods)))
+
+def build_pod_rows(pods):
+    """Build the pod table rows"""
     pod_data = []
     
     for pod in pods:
@@ -54,13 +272,23 @@ def get_pod_data(namespace):
             'restarts': restart_count
         })
     
-    return jsonify(pod_data)
+    return pod_data
 
 @api.route('/health/<namespace>')
 @handle_kubernetes_errors
+@conditional('pods', relative_times=True)
 def get_health(namespace):
     """Get health status for pods in a namespace"""
+    page = page_args()
+    if page:
+        return pod_rows_page(namespace, page, build_health_rows, build_health_rows_raw)
+    if use_raw_fast_path('pods'):
+        return jsonify(listing(build_health_rows_raw(get_raw_pods(namespace))))
     pods = get_pods_in_namespace(namespace)
+    return jsonify(listing(build_health_rows(pods)))
+
+def build_health_rows(pods):
+    """Build the pod health table rows"""
     health_data = []
     
     for pod in pods:
@@ -96,13 +324,22 @@ def get_health(namespace):
             'age': age
         })
     
-    return jsonify(health_data)
+    return health_data
 
 @api.route('/events/<namespace>')
 @handle_kubernetes_errors
+@conditional('events', relative_times=True)
 def get_events(namespace):
     """Get events for a namespace"""
+    page = page_args()
+    if page:
+        events, token = get_namespace_events_page(namespace, *page)
+        return page_response(format_events(events), token)
     events = get_namespace_events(namespace)
+    return jsonify(listing(format_events(events)))
+
+def format_events(events):
+    """Build the events table rows with a relative last-seen time"""
     formatted_events = []
     
     for event in events:
@@ -138,13 +375,23 @@ def get_events(namespace):
             'last_seen': last_seen
         })
     
-    return jsonify(formatted_events)
+    return formatted_events
 
 @api.route('/images/<namespace>')
 @handle_kubernetes_errors
+@conditional('pods')
 def get_images(namespace):
     """Get container images for a namespace"""
+    page = page_args()
+    if page:
+        return pod_rows_page(namespace, page, build_image_rows, build_image_rows_raw)
+    if use_raw_fast_path('pods'):
+        return jsonify(listing(build_image_rows_raw(get_raw_pods(namespace))))
     pods = get_pods_in_namespace(namespace)
+    return jsonify(listing(build_image_rows(pods)))
+
+def build_image_rows(pods):
+    """Build the per-container image table rows for one namespace"""
     image_data = []
     
     for pod in pods:
@@ -155,13 +402,74 @@ def get_images(namespace):
                 'image': image
             })
     
-    return jsonify(image_data)
+    return image_data
 
 @api.route('/images')
 @handle_kubernetes_errors
+@conditional('pods')
 def list_all_images():
     """Get container images from all namespaces"""
-    pods = get_all_pods()
+    if wants_ndjson():
+        return pod_pages_stream(build_all_image_rows, build_all_image_rows_raw)
+    page = page_args()
+    if page:
+        return pod_rows_page(None, page, build_all_image_rows, build_all_image_rows_raw)
+    contexts = requested_contexts()
+    if contexts:
+        return fan_out(contexts, all_image_rows)
+    return jsonify(listing(all_image_rows()))
+
+@api.route('/image-search')
+@handle_kubernetes_errors
+@conditional('pods')
+def search_images():
+    """Search container images by namespace, pod name and image reference, best match first"""
+    query = request.args.get('q', '')
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = max(1, min(request.args.get('limit', Config.ITEMS_PER_PAGE, type=int), Config.MAX_PAGE_SIZE))
+    contexts = requested_contexts()
+    if not contexts:
+        result = get_image_search_index().search(query, offset, limit)
+        return jsonify(dict(result, items=listing(result['items']), offset=offset))
+
+    # Each cluster ranks its own top offset+limit rows; the merged page is cut from those
+    def run_in(context_name):
+        use_context(context_name)
+        return get_image_search_index().search(query, 0, offset + limit)
+
+    futures = {
+        name: upstream_executor.submit(contextvars.copy_context().run, run_in, name)
+        for name in contexts
+    }
+    total = 0
+    items = []
+    errors = {}
+    for name, future in futures.items():
+        try:
+            result = future.result()
+        except Exception as e:
+            errors[name] = str(e)
+            continue
+        total += result['total']
+        items.extend(dict(row, cluster=name) for row in result['items'])
+    items.sort(key=lambda row: (-row['score'], row['namespace'], row['pod_name'], row['image'], row['cluster']))
+    return jsonify({'total': total, 'offset': offset, 'items': listing(items[offset:offset + limit]), 'errors': errors})
+
+@api.route('/image-inventory')
+@handle_kubernetes_errors
+@conditional('pods')
+def get_images_inventory():
+    """Get unique images with parsed references and usage counts by namespace and workload"""
+    return jsonify(get_image_inventory())
+
+def all_image_rows():
+    """Image rows for every pod in the current context"""
+    if use_raw_fast_path('pods'):
+        return build_all_image_rows_raw(get_raw_pods())
+    return build_all_image_rows(get_all_pods())
+
+def build_all_image_rows(pods):
+    """Build the cluster-wide image table rows"""
     image_data = []
     
     for pod in pods:
@@ -170,18 +478,47 @@ def list_all_images():
             image_data.append({
                 'namespace': pod.metadata.namespace,
                 'pod_name': pod.metadata.name,
-                'image': image.split('/')[-1].split(':')[1] if ':' in image.split('/')[-1] else image
+                'image': short_image(image)
             })
     
-    return jsonify(image_data)
+    return image_data
 
 @api.route('/namespaces')
 @handle_kubernetes_errors
+@conditional('namespaces')
 def list_namespaces():
     """Get list of all namespaces"""
+    if wants_ndjson():
+        if get_cluster_cache().has_synced('namespaces'):
+            pages = iter_cached('namespaces')
+            return ndjson_response(pages, lambda items: [ns.metadata.name for ns in items])
+        return ndjson_response(iter_pages(get_namespaces_page), lambda names: names)
     namespaces = get_namespaces()
     return jsonify(namespaces)
 
+@api.route('/namespaces/summary')
+@handle_kubernetes_errors
+@conditional('namespaces', 'pods')
+def namespaces_summary():
+    """Get pod health counts for every namespace in one pass over all pods"""
+    contexts = requested_contexts()
+    if contexts:
+        return fan_out(contexts, build_namespace_summary)
+    return jsonify(build_namespace_summary())
+
+def build_namespace_summary():
+    """Pod health counts per namespace in the current context"""
+    summary = {ns: {'healthy': 0, 'unhealthy': 0, 'unknown': 0} for ns in get_namespaces()}
+    
+    for pod in get_all_pods():
+        counts = summary.setdefault(pod.metadata.namespace, {'healthy': 0, 'unhealthy': 0, 'unknown': 0})
+        counts[get_pod_health(pod)] += 1
+    
+    return [
+        {'namespace': ns, **counts, 'total': sum(counts.values())}
+        for ns, counts in sorted(summary.items())
+    ]
+
 @api.route('/quotas/<namespace>')
 @handle_kubernetes_errors
 def get_quotas(namespace):
@@ -191,6 +528,7 @@ def get_quotas(namespace):
 
 @api.route('/configmaps/<namespace>')
 @handle_kubernetes_errors
+@conditional('configmaps', relative_times=True)
 def get_configmaps(namespace):
     """Get configmaps for a namespace"""
     configmaps = get_namespace_configmaps(namespace)
@@ -198,6 +536,7 @@ def get_configmaps(namespace):
 
 @api.route('/secrets/<namespace>')
 @handle_kubernetes_errors
+@conditional('secrets', relative_times=True)
 def get_secrets(namespace):
     """Get secrets for a namespace"""
     secrets = get_namespace_secrets(namespace)
@@ -205,18 +544,200 @@ def get_secrets(namespace):
 
 @api.route('/services/<namespace>')
 @handle_kubernetes_errors
+@conditional('services', 'pods', relative_times=True)
 def get_services(namespace):
     """Get services for a namespace"""
-    services = get_namespace_services(namespace)
+    services = get_services_with_pods(namespace)
     return jsonify(services)
 
+def get_services_with_pods(namespace):
+    """Service rows with the names of the pods each service selects"""
+    services = get_namespace_services(namespace)
+    service_pods = get_label_index(namespace).service_pods(namespace)
+    for service in services:
+        service['pods'] = service_pods.get(service['name'], [])
+    return services
+
+@api.route('/selectors/<namespace>')
+@handle_kubernetes_errors
+@conditional('pods')
+def select_pods(namespace):
+    """Get pods in a namespace matching a label selector"""
+    try:
+        requirements = parse_selector(request.args.get('selector', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    pods = get_label_index(namespace).select(namespace, requirements)
+    return jsonify([
+        {
+            'name': pod.metadata.name,
+            'status': pod.status.phase,
+            'labels': pod.metadata.labels or {}
+        }
+        for pod in pods
+    ])
+
 @api.route('/ingresses/<namespace>')
 @handle_kubernetes_errors
+@conditional('ingresses', relative_times=True)
 def get_ingresses(namespace):
     """Get ingresses for a namespace"""
     ingresses = get_namespace_ingresses(namespace)
     return jsonify(ingresses)
 
+def use_raw_fast_path(kind):
+    """Whether to decode upstream lists as plain JSON (only useful while the watch cache is cold)"""
+    return Config.RAW_JSON_FAST_PATH and not get_cluster_cache().has_synced(kind)
+
+def build_pod_rows_raw(pods):
+    """build_pod_rows for raw JSON pods"""
+    pod_data = []
+    
+    for pod in pods:
+        images = raw.pod_images(pod)
+        pod_data.append({
+            'name': raw.pod_name(pod),
+            'health': raw.pod_health(pod),
+            'image': images[0] if images else 'No image',
+            'resources': raw.pod_resources(pod),
+            'age': calculate_age(raw.pod_created(pod)),
+            'restarts': raw.pod_restart_count(pod)
+        })
+    
+    return pod_data
+
+def build_health_rows_raw(pods):
+    """build_health_rows for raw JSON pods"""
+    health_data = []
+    
+    for pod in pods:
+        resources = raw.pod_resources(pod)
+        cpu = resources['cpu']['request']
+        memory = resources['memory']['request']
+        
+        health_data.append({
+            'name': raw.pod_name(pod),
+            'status': raw.pod_phase(pod) or 'Unknown',
+            'health': raw.pod_health(pod),
+            'cpu': 'N/A' if cpu == '0' else cpu,
+            'memory': 'N/A' if memory == '0' else memory,
+            'restarts': raw.pod_restart_count(pod),
+            'age': calculate_age(raw.pod_created(pod))
+        })
+    
+    return health_data
+
+def build_image_rows_raw(pods):
+    """build_image_rows for raw JSON pods"""
+    return [
+        {'pod_name': raw.pod_name(pod), 'image': image}
+        for pod in pods
+        for image in raw.pod_images(pod)
+    ]
+
+def build_all_image_rows_raw(pods):
+    """build_all_image_rows for raw JSON pods"""
+    return [
+        {'namespace': raw.pod_namespace(pod), 'pod_name': raw.pod_name(pod), 'image': short_image(image)}
+        for pod in pods
+        for image in raw.pod_images(pod)
+    ]
+
+# Sections served by the namespace bundle: section -> (upstream kind, row builder)
+BUNDLE_SECTIONS = {
+    'health': ('pods', build_health_rows),
+    'images': ('pods', build_image_rows),
+    'configmaps': ('configmaps', None),
+    'secrets': ('secrets', None),
+    'services': ('services', None),
+    'ingresses': ('ingresses', None),
+    'events': ('events', format_events),
+}
+
+# Sections that come back as a first page; /api/health, /api/images and /api/events continue them
+PAGED_SECTIONS = ('health', 'images', 'events')
+
+RAW_BUNDLE_BUILDERS = {
+    'health': build_health_rows_raw,
+    'images': build_image_rows_raw,
+}
+
+BUNDLE_FETCHERS = {
+    'pods': get_pods_in_namespace,
+    'configmaps': get_namespace_configmaps,
+    'secrets': get_namespace_secrets,
+    'services': get_services_with_pods,
+    'ingresses': get_namespace_ingresses,
+    'events': get_namespace_events,
+}
+
+@api.route('/namespace/<namespace>/bundle')
+@handle_kubernetes_errors
+@conditional('pods', 'configmaps', 'secrets', 'services', 'ingresses', 'events', relative_times=True)
+def get_namespace_bundle(namespace):
+    """Get every namespace page section in one response, listing each kind once"""
+    requested = request.args.get('sections')
+    sections = [s.strip() for s in requested.split(',') if s.strip()] if requested else list(BUNDLE_SECTIONS)
+    unknown = [s for s in sections if s not in BUNDLE_SECTIONS]
+    if unknown:
+        return jsonify({'error': f'Unknown sections: {", ".join(unknown)}'}), 400
+    
+    fast_path = use_raw_fast_path('pods')
+    fetchers = dict(BUNDLE_FETCHERS, pods=get_raw_pods) if fast_path else dict(BUNDLE_FETCHERS)
+    
+    # With limit/continue, pods and events come back as their first page
+    page = page_args()
+    if page:
+        fetchers['pods'] = lambda ns: get_pods_page(ns, *page, raw_json=fast_path)
+        fetchers['events'] = lambda ns: get_namespace_events_page(ns, *page)
+    
+    # List each upstream kind once, concurrently, against this request's context
+    kinds = {BUNDLE_SECTIONS[section][0] for section in sections}
+    
+    # Cold, the label index would list the pods a second time; match services against the bundle's pods
+    match_services = 'services' in kinds and not label_index_synced()
+    if match_services:
+        kinds.add('pods')
+        fetchers['services'] = lambda ns: (get_namespace_services(ns), get_services_in_namespace(ns))
+    futures = {
+        kind: upstream_executor.submit(contextvars.copy_context().run, fetchers[kind], namespace)
+        for kind in kinds
+    }
+    results = {kind: future.result() for kind, future in futures.items()}
+    
+    tokens = {}
+    if page:
+        for kind in ('pods', 'events'):
+            if kind in results:
+                results[kind], tokens[kind] = results[kind]
+    
+    if match_services:
+        rows, services = results['services']
+        # A first page of a longer listing cannot say which pods a service selects, so the rows leave pods out
+        if not page or not tokens.get('pods'):
+            if fast_path:
+                pod_labels = [(raw.pod_name(pod), raw.pod_labels(pod)) for pod in results['pods']]
+            else:
+                pod_labels = [(pod.metadata.name, pod.metadata.labels or {}) for pod in results['pods']]
+            service_pods = match_service_pods(services, pod_labels)
+            for row in rows:
+                row['pods'] = service_pods.get(row['name'], [])
+        results['services'] = rows
+
+    bundle = {}
+    for section in sections:
+        kind, build = BUNDLE_SECTIONS[section]
+        if fast_path and section in RAW_BUNDLE_BUILDERS:
+            build = RAW_BUNDLE_BUILDERS[section]
+        bundle[section] = build(results[kind]) if build else results[kind]
+    
+    # Each paged section served gets the token its own endpoint continues from
+    if page:
+        bundle['continue'] = {section: tokens[BUNDLE_SECTIONS[section][0]] for section in sections if section in PAGED_SECTIONS}
+    
+    return jsonify(bundle)
+
 def calculate_age(timestamp):
     if not timestamp:
         return 'N/A'
@@ -237,6 +758,7 @@ def calculate_age(timestamp):
 
 @api.route('/pods/<namespace>/<pod_name>')
 @handle_kubernetes_errors
+@conditional('pods', relative_times=True)
 def get_pod_details(namespace, pod_name):
     """Get detailed information about a specific pod"""
     pods = get_pods_in_namespace(namespace)
@@ -325,201 +847,333 @@ def get_pod_details(namespace, pod_name):
 @handle_kubernetes_errors
 def debug_resource(resource_type, namespace, name):
     try:
-        # Get the main resource details
-        resource_details = {}
-        events = []
-        related_resources = {}
-        
-        if resource_type == 'configmap':
-            resource = v1.read_namespaced_config_map(name, namespace)
-            resource_details = {
-                'type': 'ConfigMap',
-                'name': resource.metadata.name,
-                'data_keys': list(resource.data.keys()) if resource.data else [],
-                'created': resource.metadata.creation_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify(aio.run(debug_report(resource_type, namespace, name)))
+    except ApiException:
+        # handle_kubernetes_errors keeps the apiserver's (or the synced cache's) status
+        raise
+    except Exception as e:
+        ERRORS.inc(request.url_rule.rule, type(e).__name__)
+        return jsonify({'error': str(e)}), 500
+
+# Kinds the label and reference index lookups of each debug resource type read
+DEBUG_INDEX_KINDS = {
+    'configmap': ('pods', 'ingresses'),
+    'secret': ('pods', 'ingresses'),
+    'service': ('pods', 'services', 'ingresses'),
+}
+
+async def debug_report(resource_type, namespace, name):
+    """Details, related resources and events of one object, with independent reads awaited together"""
+    resource, events_list, _ = await aio.gather(
+        aio.read_resource(resource_type, name, namespace),
+        aio.list_object_events(namespace, name),
+        aio.prefetch(namespace, *DEBUG_INDEX_KINDS.get(resource_type, ()))
+    )
+    resource_details = {}
+    events = []
+    related_resources = {}
+    
+    if resource_type == 'configmap':
+        resource_details = {
+            'type': 'ConfigMap',
+            'name': resource.metadata.name,
+            'data_keys': list(resource.data.keys()) if resource.data else [],
+            'created': resource.metadata.creation_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        # Find pods using this configmap
+        index = get_reference_index(namespace)
+        related_resources['Pods'] = [
+            {
+                'name': pod.metadata.name,
+                'status': 'Healthy' if pod.status.phase == 'Running' else pod.status.phase,
+                'info': f'Using ConfigMap in {", ".join(usages)}'
             }
-            # Find pods using this configmap
-            pods = v1.list_namespaced_pod(namespace).items
-            related_resources['Pods'] = []
-            for pod in pods:
-                uses_configmap = False
-                for volume in pod.spec.volumes or []:
-                    if volume.config_map and volume.config_map.name == name:
-                        uses_configmap = True
-                        break
-                for container in pod.spec.containers:
-                    for env in container.env or []:
-                        if env.value_from and env.value_from.config_map_key_ref and env.value_from.config_map_key_ref.name == name:
-                            uses_configmap = True
-                            break
-                if uses_configmap:
-                    related_resources['Pods'].append({
-                        'name': pod.metadata.name,
-                        'status': 'Healthy' if pod.status.phase == 'Running' else pod.status.phase,
-                        'info': f'Using ConfigMap in {"volume" if volume else "environment"}'
-                    })
-                    
-        elif resource_type == 'secret':
-            resource = v1.read_namespaced_secret(name, namespace)
-            resource_details = {
-                'type': 'Secret',
-                'name': resource.metadata.name,
-                'secret_type': resource.type,
-                'data_keys': list(resource.data.keys()) if resource.data else [],
-                'created': resource.metadata.creation_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+            for pod, usages in index.referrers(namespace, 'configmap', name, 'Pod')
+        ]
+                
+    elif resource_type == 'secret':
+        resource_details = {
+            'type': 'Secret',
+            'name': resource.metadata.name,
+            'secret_type': resource.type,
+            'data_keys': list(resource.data.keys()) if resource.data else [],
+            'created': resource.metadata.creation_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        # Find pods and ingresses using this secret
+        index = get_reference_index(namespace)
+        related_resources['Pods'] = [
+            {
+                'name': pod.metadata.name,
+                'status': 'Healthy' if pod.status.phase == 'Running' else pod.status.phase,
+                'info': f'Using Secret in {", ".join(usages)}'
             }
-            # Find pods and ingresses using this secret
-            pods = v1.list_namespaced_pod(namespace).items
-            related_resources['Pods'] = []
-            for pod in pods:
-                uses_secret = False
-                for volume in pod.spec.volumes or []:
-                    if volume.secret and volume.secret.secret_name == name:
-                        uses_secret = True
-                        break
-                for container in pod.spec.containers:
-                    for env in container.env or []:
-                        if env.value_from and env.value_from.secret_key_ref and env.value_from.secret_key_ref.name == name:
-                            uses_secret = True
-                            break
-                if uses_secret:
-                    related_resources['Pods'].append({
-                        'name': pod.metadata.name,
-                        'status': 'Healthy' if pod.status.phase == 'Running' else pod.status.phase,
-                        'info': f'Using Secret in {"volume" if volume else "environment"}'
-                    })
-            
-            ingresses = networking_v1.list_namespaced_ingress(namespace).items
-            related_resources['Ingresses'] = []
-            for ingress in ingresses:
-                if ingress.spec.tls:
-                    for tls in ingress.spec.tls:
-                        if tls.secret_name == name:
-                            related_resources['Ingresses'].append({
-                                'name': ingress.metadata.name,
-                                'status': 'Active',
-                                'info': 'Using Secret for TLS'
-                            })
-                            
-        elif resource_type == 'service':
-            resource = v1.read_namespaced_service(name, namespace)
-            resource_details = {
-                'name': resource.metadata.name,
-                'type': resource.spec.type,
-                'cluster_ip': resource.spec.cluster_ip,
-                'ports': [f"{port.port}:{port.target_port}/{port.protocol}" for port in resource.spec.ports],
-                'created': resource.metadata.creation_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+            for pod, usages in index.referrers(namespace, 'secret', name, 'Pod')
+        ]
+        related_resources['Ingresses'] = [
+            {
+                'name': ingress.metadata.name,
+                'status': 'Active',
+                'info': 'Using Secret for TLS'
             }
-            
-            # Find pods this service targets
-            pods = v1.list_namespaced_pod(namespace).items
-            related_resources['Pods'] = []
-            selector = resource.spec.selector
-            if selector:
-                for pod in pods:
-                    if all(pod.metadata.labels.get(k) == v for k, v in selector.items()):
-                        related_resources['Pods'].append({
-                            'name': pod.metadata.name,
-                            'status': 'Healthy' if pod.status.phase == 'Running' else pod.status.phase,
-                            'info': 'Targeted by Service'
-                        })
-            
-            # Find ingresses using this service
-            ingresses = networking_v1.list_namespaced_ingress(namespace).items
-            related_resources['Ingresses'] = []
-            for ingress in ingresses:
-                for rule in ingress.spec.rules or []:
-                    for path in rule.http.paths:
-                        if path.backend.service and path.backend.service.name == name:
-                            related_resources['Ingresses'].append({
-                                'name': ingress.metadata.name,
-                                'status': 'Active',
-                                'info': f'Routing to Service via {rule.host}{path.path}'
-                            })
-                            
-        elif resource_type == 'ingress':
-            resource = networking_v1.read_namespaced_ingress(name, namespace)
-            resource_details = {
-                'type': 'Ingress',
-                'name': resource.metadata.name,
-                'class': resource.spec.ingress_class_name,
-                'hosts': [rule.host for rule in resource.spec.rules],
-                'created': resource.metadata.creation_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+            for ingress, usages in index.referrers(namespace, 'secret', name, 'Ingress')
+        ]
+                        
+    elif resource_type == 'service':
+        resource_details = {
+            'name': resource.metadata.name,
+            'type': resource.spec.type,
+            'cluster_ip': resource.spec.cluster_ip,
+            'ports': [f"{port.port}:{port.target_port}/{port.protocol}" for port in resource.spec.ports],
+            'created': resource.metadata.creation_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        # Find pods this service targets
+        related_resources['Pods'] = []
+        selector = resource.spec.selector
+        if selector:
+            pods = get_label_index(namespace).select(namespace, selector_requirements(selector))
+            related_resources['Pods'] = [
+                {
+                    'name': pod.metadata.name,
+                    'status': 'Healthy' if pod.status.phase == 'Running' else pod.status.phase,
+                    'info': 'Targeted by Service'
+                }
+                for pod in pods
+            ]
+        
+        # Find ingresses using this service
+        index = get_reference_index(namespace)
+        related_resources['Ingresses'] = [
+            {
+                'name': ingress.metadata.name,
+                'status': 'Active',
+                'info': f'Routing to Service via {", ".join(usages)}'
             }
-            
-            # Find related services
-            related_resources['Services'] = []
-            for rule in resource.spec.rules or []:
-                for path in rule.http.paths:
-                    if path.backend.service:
-                        service_name = path.backend.service.name
-                        try:
-                            service = v1.read_namespaced_service(namespace, service_name)
-                            related_resources['Services'].append({
-                                'name': service.metadata.name,
-                                'status': 'Active',
-                                'info': f'Targeted via {rule.host}{path.path}'
-                            })
-                        except client.rest.ApiException as e:
-                            related_resources['Services'].append({
-                                'name': service_name,
-                                'status': 'Error',
-                                'info': f'Service not found: {str(e)}'
-                            })
-            
-            # Find TLS secrets
-            if resource.spec.tls:
-                related_resources['Secrets'] = []
-                for tls in resource.spec.tls:
-                    try:
-                        secret = v1.read_namespaced_secret(namespace, tls.secret_name)
-                        related_resources['Secrets'].append({
-                            'name': secret.metadata.name,
-                            'status': 'Active',
-                            'info': f'TLS Secret for {", ".join(tls.hosts)}'
-                        })
-                    except client.rest.ApiException as e:
-                        related_resources['Secrets'].append({
-                            'name': tls.secret_name,
-                            'status': 'Error',
-                            'info': f'Secret not found: {str(e)}'
-                        })
+            for ingress, usages in index.referrers(namespace, 'service', name, 'Ingress')
+        ]
+                        
+    elif resource_type == 'ingress':
+        resource_details = {
+            'type': 'Ingress',
+            'name': resource.metadata.name,
+            'class': resource.spec.ingress_class_name,
+            'hosts': [rule.host for rule in resource.spec.rules],
+            'created': resource.metadata.creation_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        # Find related services and TLS secrets, reading each distinct one once
+        backends = [
+            (rule, path)
+            for rule in resource.spec.rules or []
+            for path in rule.http.paths
+            if path.backend.service
+        ]
+        services, secrets = await aio.gather(
+            aio.read_many('service', [path.backend.service.name for rule, path in backends], namespace),
+            aio.read_many('secret', [tls.secret_name for tls in resource.spec.tls or []], namespace)
+        )
         
-        # Get events for the resource
-        field_selector = f"involvedObject.name={name},involvedObject.namespace={namespace}"
-        events_list = v1.list_namespaced_event(namespace, field_selector=field_selector).items
-        for event in events_list:
-            if event.involved_object.kind.lower() == resource_type:
-                events.append({
-                    'type': event.type,
-                    'reason': event.reason,
-                    'message': event.message,
-                    'count': event.count,
-                    'first_timestamp': event.first_timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                    'last_timestamp': event.last_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        related_resources['Services'] = []
+        for rule, path in backends:
+            service_name = path.backend.service.name
+            service = services[service_name]
+            if isinstance(service, ApiException):
+                related_resources['Services'].append({
+                    'name': service_name,
+                    'status': 'Error',
+                    'info': f'Service not found: {str(service)}'
+                })
+            else:
+                related_resources['Services'].append({
+                    'name': service.metadata.name,
+                    'status': 'Active',
+                    'info': f'Targeted via {rule.host}{path.path}'
                 })
         
-        return jsonify({
-            'type': resource_details.get('type', resource_type.title()),
-            'name': name,
-            'details': resource_details,
-            'events': events,
-            'related': related_resources
-        })
+        # Find TLS secrets
+        if resource.spec.tls:
+            related_resources['Secrets'] = []
+            for tls in resource.spec.tls:
+                secret = secrets[tls.secret_name]
+                if isinstance(secret, ApiException):
+                    related_resources['Secrets'].append({
+                        'name': tls.secret_name,
+                        'status': 'Error',
+                        'info': f'Secret not found: {str(secret)}'
+                    })
+                else:
+                    related_resources['Secrets'].append({
+                        'name': secret.metadata.name,
+                        'status': 'Active',
+                        'info': f'TLS Secret for {", ".join(tls.hosts)}'
+                    })
+    
+    # Get events for the resource
+    for event in events_list:
+        if event.involved_object.kind.lower() == resource_type:
+            events.append({
+                'type': event.type,
+                'reason': event.reason,
+                'message': event.message,
+                'count': event.count,
+                'first_timestamp': event.first_timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                'last_timestamp': event.last_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+            })
+    
+    return {
+        'type': resource_details.get('type', resource_type.title()),
+        'name': name,
+        'details': resource_details,
+        'events': events,
+        'related': related_resources
+    }
 
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+# Each open stream holds a request thread for as long as its page stays open
+stream_slots = threading.BoundedSemaphore(Config.STREAM_MAX_CLIENTS)
+
+@api.route('/stream')
+@api.route('/stream/<namespace>')
+def stream_changes(namespace=None):
+    """Push pod status, restart and event changes as Server-Sent Events"""
+    if not stream_slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many live update streams'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(Config.STREAM_RETRY_AFTER)
+        return response
+    
+    try:
+        stream_hub = get_stream_hub()
+        subscription = stream_hub.subscribe(namespace)
+    except Exception:
+        stream_slots.release()
+        raise
+    
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                if subscription.overflowed:
+                    yield sse_message('resync', {'reason': 'Client fell behind'})
+                    return
+                try:
+                    change = subscription.get(timeout=Config.STREAM_HEARTBEAT)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                message = format_change(*change)
+                if message:
+                    yield sse_message(*message)
+        finally:
+            stream_hub.unsubscribe(subscription)
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(stream_slots.release)
+    return response
+
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def format_change(kind, event_type, old, new):
+    """Turn a watch change into an (SSE event, payload) pair, or None if nothing visible changed"""
+    if kind == 'pods':
+        if event_type == 'DELETED':
+            return 'pod', {
+                'change': 'deleted',
+                'namespace': old.metadata.namespace,
+                'name': old.metadata.name,
+                'previous_health': get_pod_health(old)
+            }
+        row = build_health_rows([new])[0]
+        previous = build_health_rows([old])[0] if old is not None else None
+        if previous and all(previous[key] == row[key] for key in ('status', 'health', 'restarts')):
+            return None
+        return 'pod', dict(
+            row,
+            change='modified' if previous else 'added',
+            namespace=new.metadata.namespace,
+            previous_health=previous['health'] if previous else None
+        )
+    
+    if kind == 'events' and event_type != 'DELETED':
+        if old is not None and old.count == new.count:
+            return None
+        return 'k8s_event', dict(
+            format_events([get_event_data(new)])[0],
+            namespace=new.metadata.namespace
+        )
+    return None
+
+@api.route('/capacity')
+@handle_kubernetes_errors
+def get_capacity():
+    """Get cluster requests and limits against allocatable (CPU in millicores, memory in bytes)"""
+    return jsonify(get_capacity_snapshot().summary())
+
+@api.route('/capacity/nodes')
+@handle_kubernetes_errors
+def get_node_capacity():
+    """Get requests, limits and overcommit against allocatable for every node"""
+    return jsonify(get_capacity_snapshot().node_report())
+
+@api.route('/capacity/namespaces')
+@handle_kubernetes_errors
+def get_namespace_capacity():
+    """Get namespaces ranked by resource requests"""
+    sort = request.args.get('sort', 'cpu')
+    if sort not in RESOURCES:
+        return jsonify({'error': f'sort must be one of: {", ".join(RESOURCES)}'}), 400
+    top = request.args.get('top') or None
+    if top is not None:
+        if not top.isdigit() or int(top) < 1:
+            return jsonify({'error': 'top must be a positive integer'}), 400
+        top = int(top)
+    return jsonify(get_capacity_snapshot().namespace_report(sort, top))
+
+@api.route('/stats')
+@handle_kubernetes_errors
+def get_stats():
+    """Get cluster statistics and how stale they are"""
+    return jsonify(get_current_stats())
+
+@api.route('/stats/history')
+@handle_kubernetes_errors
+def get_stats_history_series():
+    """Get sampled cluster stats over a range (e.g. 1h, 24h, 7d), optionally averaged to step"""
+    try:
+        range_seconds = parse_duration(request.args.get('range', '1h'))
+        step = parse_duration(request.args['step']) if request.args.get('step') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(get_stats_history().series(range_seconds, step))
+
+@api.route('/cache/status')
+def get_cache_status():
+    """Get sync state of the watch-based cluster cache for the current context"""
+    return jsonify(dict(get_cluster_cache().status(), context=current_context()))
+
+@api.route('/cache/stats')
+def get_cache_stats():
+    """Get hit/miss/coalesced counters of the upstream response cache"""
+    return jsonify(response_cache.stats())
 
 @api.route('/get-contexts')
 def get_contexts():
     """Get list of available Kubernetes contexts"""
-    contexts, _ = config.list_kube_config_contexts()
-    return jsonify({'contexts': [context['name'] for context in contexts]})
+    return jsonify({'contexts': list_context_names(), 'current': current_context()})
 
 @api.route('/set-context/<context_name>', methods=['POST'])
 def set_context(context_name):
+    """Select the context for this browser; other clients keep their own"""
     try:
-        config.load_kube_config(context=context_name)
-        return jsonify({'success': True})
+        if context_name not in list_context_names():
+            return jsonify({'success': False, 'error': f'Unknown context: {context_name}'}), 400
+        client_pool.api_client(context_name)
     except config.ConfigException as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+    response = jsonify({'success': True})
+    response.set_cookie('kube_context', context_name, samesite='Lax')
+    return response
@@ -0,0 +1,49 @@
+from flask import Blueprint, Response
+from routes.api import body_cache
+from services.kubernetes import response_cache
+from services.shared import process_metrics
+from utils.encoding import compressed_cache
+from utils.images import parse_image
+from utils.metrics import add_collector, render
+from utils.quantity import parse_quantity
+
+metrics = Blueprint('metrics', __name__)
+
+# Caches whose counters are exported, by the name they are labelled with
+TTL_CACHES = {
+    'upstream_response': response_cache,
+    'etag_body': body_cache,
+    'compressed_body': compressed_cache,
+}
+LRU_CACHES = {
+    'image_reference': parse_image,
+    'quantity': parse_quantity,
+}
+
+@metrics.route('/metrics')
+def get_metrics():
+    """Prometheus metrics of this process, or of every worker and the cache server under a shared cache"""
+    return Response(render(*process_metrics()), mimetype='text/plain', headers={'Cache-Control': 'no-store'})
+
+def collect_caches():
+    """Hits, misses, hit ratio and size of the in-process caches"""
+    counts = {name: cache.stats() for name, cache in TTL_CACHES.items()}
+    for name, func in LRU_CACHES.items():
+        info = func.cache_info()
+        lookups = info.hits + info.misses
+        counts[name] = {
+            'hits': info.hits, 'coalesced': 0, 'misses': info.misses, 'entries': info.currsize,
+            'hit_ratio': round(info.hits / lookups, 3) if lookups else 0
+        }
+    return [
+        ('pyk_cache_hits_total', 'counter', 'Lookups answered from the cache, including waits on a load in progress',
+         ('cache',), [((name,), stats['hits'] + stats['coalesced']) for name, stats in counts.items()]),
+        ('pyk_cache_misses_total', 'counter', 'Lookups that had to load the value',
+         ('cache',), [((name,), stats['misses']) for name, stats in counts.items()]),
+        ('pyk_cache_hit_ratio', 'gauge', 'Hits over lookups since the process started',
+         ('cache',), [((name,), stats['hit_ratio']) for name, stats in counts.items()]),
+        ('pyk_cache_entries', 'gauge', 'Entries held',
+         ('cache',), [((name,), stats['entries']) for name, stats in counts.items()]),
+    ]
+
+add_collector(collect_caches)
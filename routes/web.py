@@ -1,4 +1,5 @@
-from flask import Blueprint, render_template, redirect, url_for
+from flask import Blueprint, abort, make_response, render_template, redirect, request, url_for
+from services.clients import known_context
 from services.kubernetes import (
     get_namespaces
 )
@@ -19,7 +20,14 @@ def images():
 @web.route('/namespace/<namespace>')
 def namespace_view(namespace):
     """Combined namespace view with health, images, and events"""
-    return render_template('namespace.html', namespace=namespace)
+    context_name = request.args.get('context')
+    if context_name and not known_context(context_name):
+        abort(400, description=f"Unknown context: {context_name}")
+    response = make_response(render_template('namespace.html', namespace=namespace))
+    # Links from the multi-cluster dashboard switch this browser to the namespace's cluster
+    if context_name:
+        response.set_cookie('kube_context', context_name, samesite='Lax')
+    return response
 
 # Redirect old routes to new namespace view
 @web.route('/images/<namespace>')
@@ -0,0 +1,109 @@
+"""asyncio access to the apiserver for endpoints that fan out to several independent calls
+
+The kubernetes client is synchronous, so each call runs on the process's
+pool of UPSTREAM_WORKERS upstream threads and is awaited from an event loop. Calls use the
+context's API client, and so its pooled connections (CLIENT_POOL_MAXSIZE),
+and run in the caller's kube context. Awaiting independent calls together
+makes an endpoint as slow as its slowest call instead of the sum of them.
+Reads of kinds the watch cache has synced are answered from it instead.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from kubernetes.client.exceptions import ApiException
+from services.clients import get_core_v1, get_networking_v1
+from services.kubernetes import (
+    get_cluster_cache, get_ingresses_in_namespace, get_pods_in_namespace, get_services_in_namespace
+)
+from utils.config import Config
+
+# The one pool for concurrent upstream calls, also used by the views that fan out with futures.
+# A task on it must not wait for another task on it.
+upstream_executor = ThreadPoolExecutor(max_workers=Config.UPSTREAM_WORKERS, thread_name_prefix='upstream')
+
+# Single-object reads by debug resource type: type -> (cached kind, api getter, read method)
+READERS = {
+    'configmap': ('configmaps', get_core_v1, 'read_namespaced_config_map'),
+    'secret': ('secrets', get_core_v1, 'read_namespaced_secret'),
+    'service': ('services', get_core_v1, 'read_namespaced_service'),
+    'ingress': ('ingresses', get_networking_v1, 'read_namespaced_ingress'),
+}
+
+# Cold-path namespace LISTs the label and reference indexes are built from
+LISTERS = {
+    'pods': get_pods_in_namespace,
+    'services': get_services_in_namespace,
+    'ingresses': get_ingresses_in_namespace,
+}
+
+
+def run(coroutine):
+    """Run a coroutine to completion from a synchronous view"""
+    return asyncio.run(coroutine)
+
+async def call(func, *args, **kwargs):
+    """Run a blocking client call on the shared pool in the caller's kube context"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(upstream_executor, partial(context.run, func, *args, **kwargs))
+
+async def gather(*awaitables, return_exceptions=False):
+    """asyncio.gather, or one awaitable after another when CONCURRENT_UPSTREAM is off"""
+    if Config.CONCURRENT_UPSTREAM:
+        return await asyncio.gather(*awaitables, return_exceptions=return_exceptions)
+    results = []
+    for awaitable in awaitables:
+        try:
+            results.append(await awaitable)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
+
+async def read_resource(resource_type, name, namespace):
+    """Read one configmap, secret, service or ingress; None for any other type"""
+    if resource_type not in READERS:
+        return None
+    kind, get_api, method = READERS[resource_type]
+    cache = get_cluster_cache()
+    if cache.has_synced(kind):
+        resource = cache.get(kind, namespace, name)
+        if resource is None:
+            # What the apiserver would answer for an object the synced cache does not hold
+            raise ApiException(status=404, reason='Not Found')
+        return resource
+    return await call(getattr(get_api(), method), name, namespace)
+
+async def read_many(resource_type, names, namespace):
+    """Read each distinct name once, together; name -> object, or the ApiException reading it raised"""
+    names = list(dict.fromkeys(names))
+    results = await gather(
+        *(read_resource(resource_type, name, namespace) for name in names),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, ApiException):
+            raise result
+    return dict(zip(names, results))
+
+async def list_object_events(namespace, name):
+    """Events whose involved object is the named one"""
+    cache = get_cluster_cache()
+    if cache.has_synced('events'):
+        return [event for event in cache.list('events', namespace) if event.involved_object.name == name]
+    field_selector = f"involvedObject.name={name},involvedObject.namespace={namespace}"
+    result = await call(get_core_v1().list_namespaced_event, namespace, field_selector=field_selector)
+    return result.items
+
+async def prefetch(namespace, *kinds):
+    """LIST the given kinds of a namespace together while the watch cache is cold
+
+    The label and reference indexes are then built from the cold-path
+    response cache instead of making those LISTs one after the other.
+    """
+    cache = get_cluster_cache()
+    kinds = [kind for kind in kinds if not cache.has_synced(kind)]
+    await gather(*(call(LISTERS[kind], namespace) for kind in kinds))
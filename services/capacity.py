@@ -0,0 +1,205 @@
+"""Columnar snapshot of container resource requests and limits for capacity reports"""
+
+import numpy as np
+from services.clients import current_context
+from services.kubernetes import get_all_pods, get_nodes, response_cache
+from utils.config import Config
+from utils.quantity import parse_cpu_batch, parse_memory_batch
+
+# Pods in these phases hold resources on their node
+ACTIVE_PHASES = ('Pending', 'Running', 'Unknown')
+
+RESOURCES = ('cpu', 'memory')
+
+
+class Categories:
+    """Interns the values of a categorical column as consecutive integer codes"""
+
+    def __init__(self, values=()):
+        self.values = []
+        self._codes = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def codes(self, values):
+        return [self.code(value) for value in values]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class CapacitySnapshot:
+    """Container requests and limits as NumPy columns, one row per app container.
+
+    Namespace, node, pod, phase and QoS class are stored as integer codes
+    into Categories; CPU is in millicores and memory in bytes. Every
+    group-by is a single np.bincount over a code column, so a report over
+    100k containers costs a few vectorized passes instead of nested loops.
+    Init containers and pod overhead are not counted.
+    """
+
+    def __init__(self, pods, nodes):
+        self.namespaces = Categories()
+        self.phases = Categories()
+        self.qos_classes = Categories()
+        # Known nodes first, so their codes index the allocatable arrays; None marks unscheduled pods
+        self.nodes = Categories(node.metadata.name for node in nodes)
+        self.node_count = len(nodes)
+
+        allocatable = [(node.status.allocatable if node.status else None) or {} for node in nodes]
+        self.allocatable = {
+            'cpu': np.array(parse_cpu_batch([a.get('cpu', '0') for a in allocatable]), dtype=np.int64),
+            'memory': np.array(parse_memory_batch([a.get('memory', '0') for a in allocatable]), dtype=np.int64),
+        }
+
+        namespace, node, pod_index, phase, qos, first = [], [], [], [], [], []
+        quantities = {'cpu': ([], []), 'memory': ([], [])}
+        for index, pod in enumerate(pods):
+            status = pod.status
+            codes = (
+                self.namespaces.code(pod.metadata.namespace),
+                self.nodes.code(pod.spec.node_name),
+                self.phases.code(status.phase if status else None),
+                self.qos_classes.code(status.qos_class if status else None),
+            )
+            for position, container in enumerate(pod.spec.containers or []):
+                resources = container.resources
+                requests = (resources.requests if resources else None) or {}
+                limits = (resources.limits if resources else None) or {}
+                namespace.append(codes[0])
+                node.append(codes[1])
+                phase.append(codes[2])
+                qos.append(codes[3])
+                pod_index.append(index)
+                first.append(position == 0)
+                for resource in RESOURCES:
+                    quantities[resource][0].append(requests.get(resource, '0'))
+                    quantities[resource][1].append(limits.get(resource, '0'))
+
+        self.columns = {
+            'namespace': np.array(namespace, dtype=np.int32),
+            'node': np.array(node, dtype=np.int32),
+            'pod': np.array(pod_index, dtype=np.int32),
+            'phase': np.array(phase, dtype=np.int32),
+            'qos': np.array(qos, dtype=np.int32),
+        }
+        # Marks each pod's first container, for counting pods rather than containers
+        self.first_container = np.array(first, dtype=bool)
+        parsers = {'cpu': parse_cpu_batch, 'memory': parse_memory_batch}
+        self.requests = {r: np.array(parsers[r](quantities[r][0]), dtype=np.int64) for r in RESOURCES}
+        self.limits = {r: np.array(parsers[r](quantities[r][1]), dtype=np.int64) for r in RESOURCES}
+
+        active = [self.phases.code(p) for p in ACTIVE_PHASES]
+        self.active = np.isin(self.columns['phase'], active)
+
+    def group_by(self, column, mask=None):
+        """Per-code totals of a categorical column: requests, limits and pod counts"""
+        categories = {
+            'namespace': self.namespaces, 'node': self.nodes,
+            'phase': self.phases, 'qos': self.qos_classes,
+        }[column]
+        codes = self.columns[column]
+        if mask is None:
+            mask = np.ones(len(codes), dtype=bool)
+        codes = codes[mask]
+        size = len(categories)
+
+        # float64 weights are exact for integer sums below 2**53 (about 8 PiB)
+        def total(values):
+            return np.bincount(codes, weights=values[mask], minlength=size).astype(np.int64)
+
+        return {
+            'requests': {r: total(self.requests[r]) for r in RESOURCES},
+            'limits': {r: total(self.limits[r]) for r in RESOURCES},
+            'pods': np.bincount(codes[self.first_container[mask]], minlength=size),
+        }
+
+    def node_report(self):
+        """Requests and limits against allocatable for every node"""
+        totals = self.group_by('node', self.active)
+        size = len(self.nodes)
+        allocatable = {r: np.pad(self.allocatable[r], (0, size - self.node_count)) for r in RESOURCES}
+        ratios = {r: _ratios(totals['requests'][r], allocatable[r]) for r in RESOURCES}
+        overcommit = {r: _ratios(totals['limits'][r], allocatable[r]) for r in RESOURCES}
+        return [
+            {
+                'name': name,
+                'pods': int(totals['pods'][code]),
+                **{
+                    r: {
+                        'allocatable': int(allocatable[r][code]),
+                        'requests': int(totals['requests'][r][code]),
+                        'limits': int(totals['limits'][r][code]),
+                        'request_ratio': ratios[r][code],
+                        'limit_overcommit': overcommit[r][code],
+                    }
+                    for r in RESOURCES
+                },
+            }
+            for code, name in enumerate(self.nodes.values)
+            if name is not None
+        ]
+
+    def namespace_report(self, sort='cpu', top=None):
+        """Requests and limits per namespace, largest request first"""
+        totals = self.group_by('namespace', self.active)
+        order = np.argsort(-totals['requests'][sort], kind='stable')
+        if top:
+            order = order[:top]
+        return [
+            {
+                'namespace': self.namespaces.values[code],
+                'pods': int(totals['pods'][code]),
+                **{
+                    r: {'requests': int(totals['requests'][r][code]), 'limits': int(totals['limits'][r][code])}
+                    for r in RESOURCES
+                },
+            }
+            for code in order.tolist()
+        ]
+
+    def summary(self):
+        """Cluster-wide requests, limits and overcommit, plus pods by phase and QoS class"""
+        cluster = {}
+        for r in RESOURCES:
+            allocatable = int(self.allocatable[r].sum())
+            requests = int(self.requests[r][self.active].sum())
+            limits = int(self.limits[r][self.active].sum())
+            cluster[r] = {
+                'allocatable': allocatable,
+                'requests': requests,
+                'limits': limits,
+                'request_ratio': round(requests / allocatable, 3) if allocatable else None,
+                'limit_overcommit': round(limits / allocatable, 3) if allocatable else None,
+            }
+        phases = self.group_by('phase')['pods']
+        qos = self.group_by('qos', self.active)['pods']
+        return {
+            **cluster,
+            'nodes': self.node_count,
+            'containers': int(self.active.sum()),
+            'pods_by_phase': {str(p): int(phases[c]) for c, p in enumerate(self.phases.values) if phases[c]},
+            'pods_by_qos': {str(q): int(qos[c]) for c, q in enumerate(self.qos_classes.values) if qos[c]},
+        }
+
+
+def _ratios(numerator, denominator):
+    """Element-wise ratios rounded for display, None where the denominator is 0"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.round(numerator / denominator, 3)
+    return [float(ratio) if d else None for ratio, d in zip(ratios.tolist(), denominator.tolist())]
+
+def get_capacity_snapshot():
+    """Snapshot of the current context, rebuilt at most every CAPACITY_SNAPSHOT_TTL seconds"""
+    return response_cache.get_or_load(
+        (current_context(), 'capacity_snapshot', None),
+        Config.CAPACITY_SNAPSHOT_TTL,
+        lambda: CapacitySnapshot(get_all_pods(), get_nodes())
+    )
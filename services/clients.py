@@ -0,0 +1,185 @@
+"""Per-context Kubernetes API client pool"""
+
+import contextvars
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+from kubernetes import client, config
+from kubernetes.client.exceptions import ApiException
+from kubernetes.config import ConfigException
+from utils.config import Config
+from utils.metrics import DESERIALIZE_DURATION, UPSTREAM_DURATION, UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS
+from utils.profiling import active_profile
+
+# Context selected for the current request; None means the kubeconfig's current-context
+_request_context = contextvars.ContextVar('kube_context', default=None)
+
+
+def list_context_names():
+    """Names of every context in the kubeconfig"""
+    contexts, _ = config.list_kube_config_contexts()
+    return [context['name'] for context in contexts]
+
+def known_context(context_name):
+    """Whether the kubeconfig defines context_name; False without a kubeconfig"""
+    if context_name in client_pool.contexts():
+        return True
+    try:
+        return context_name in list_context_names()
+    except ConfigException:
+        return False
+
+def default_context():
+    """The kubeconfig's current-context, or None without a kubeconfig"""
+    try:
+        return config.list_kube_config_contexts()[1]['name']
+    except ConfigException:
+        return None
+
+def current_context():
+    """Context the calling request (or worker thread) talks to"""
+    return _request_context.get() or client_pool.default_context
+
+def use_context(context_name):
+    """Select the context for the rest of this request/thread; returns a reset token"""
+    return _request_context.set(context_name or None)
+
+def reset_context(token):
+    _request_context.reset(token)
+
+
+# Verbs of non-GET calls, as the apiserver's audit log names them
+METHOD_VERBS = {'POST': 'create', 'PUT': 'update', 'PATCH': 'patch', 'DELETE': 'delete'}
+
+def describe_call(method, url, query_params=None):
+    """(verb, resource) of an apiserver call, e.g. ('list', 'pods') or ('get', 'pods/log')"""
+    segments = urlsplit(url).path.strip('/').split('/')
+    # /api/v1/... or /apis/<group>/<version>/...
+    segments = segments[2:] if segments[:1] == ['api'] else segments[3:]
+    if len(segments) >= 3 and segments[0] == 'namespaces':
+        segments = segments[2:]
+    resource = '/'.join(segments[0:3:2]) if segments else ''
+    if method != 'GET':
+        return METHOD_VERBS.get(method, method.lower()), resource
+    if any(key == 'watch' and str(value).lower() == 'true' for key, value in query_params or ()):
+        return 'watch', resource
+    return ('get' if len(segments) > 1 else 'list'), resource
+
+
+class InstrumentedApiClient(client.ApiClient):
+    """ApiClient that records each call's status and latency, and each deserialization, in the metrics
+
+    Calls made for a profiled request are also added to its timeline.
+    """
+
+    def __init__(self, configuration, context_name):
+        super().__init__(configuration)
+        self.context_name = context_name
+
+    def request(self, method, url, query_params=None, *args, **kwargs):
+        verb, resource = describe_call(method, url, query_params)
+        status = 'error'
+        response = None
+        UPSTREAM_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, query_params, *args, **kwargs)
+            status = response.status
+            return response
+        except ApiException as e:
+            status = e.status or 'error'
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            UPSTREAM_DURATION.observe(elapsed, verb, resource)
+            UPSTREAM_IN_FLIGHT.dec()
+            UPSTREAM_REQUESTS.inc(self.context_name, verb, resource, status)
+            profile = active_profile()
+            if profile is not None:
+                # Unread (streamed or raw JSON) responses are measured where they are decoded
+                preloaded = kwargs.get('_preload_content', True)
+                profile.record(
+                    'upstream', start_ms=profile.offset_ms(start), duration_ms=round(elapsed * 1000, 3),
+                    context=self.context_name, verb=verb, resource=resource, status=status,
+                    url=urlsplit(url).path, bytes=len(response.data) if preloaded and response is not None else None
+                )
+
+    def deserialize(self, response, response_type):
+        start = time.perf_counter()
+        try:
+            return super().deserialize(response, response_type)
+        finally:
+            elapsed = time.perf_counter() - start
+            DESERIALIZE_DURATION.observe(elapsed, response_type)
+            profile = active_profile()
+            if profile is not None:
+                profile.record(
+                    'deserialize', start_ms=profile.offset_ms(start), duration_ms=round(elapsed * 1000, 3),
+                    type=response_type, bytes=len(response.data) if isinstance(response.data, (bytes, str)) else None
+                )
+
+
+class ClientPool:
+    """One ApiClient per kubeconfig context, each with its own connection pool.
+
+    Clients are built on first use from the kubeconfig without touching the
+    global default configuration, so concurrent requests for different
+    contexts never race.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._apis = {}
+        self.default_context = default_context()
+
+    def api_client(self, context_name=None):
+        context_name = context_name or self.default_context
+        with self._lock:
+            api_client = self._clients.get(context_name)
+            if api_client is None:
+                api_client = self._clients[context_name] = self._build(context_name)
+            return api_client
+
+    def _build(self, context_name):
+        configuration = client.Configuration()
+        if context_name is not None:
+            config.load_kube_config(context=context_name, client_configuration=configuration)
+        else:
+            # No kubeconfig: keep serving with the client defaults so API calls, not startup, report it
+            logging.error("No kubeconfig context available; using the default client configuration")
+        configuration.connection_pool_maxsize = Config.CLIENT_POOL_MAXSIZE
+        logging.info(f"Created API client for context {context_name}")
+        if Config.METRICS_ENABLED or Config.PROFILING_ENABLED:
+            return InstrumentedApiClient(configuration, context_name)
+        return client.ApiClient(configuration)
+
+    def api(self, api_class, context_name=None):
+        """A typed API (CoreV1Api, NetworkingV1Api, ...) bound to a context's client"""
+        context_name = context_name or self.default_context
+        key = (api_class, context_name)
+        with self._lock:
+            api = self._apis.get(key)
+        if api is None:
+            # Built outside the lock, which api_client() takes; the first one stored wins
+            api = api_class(self.api_client(context_name))
+            with self._lock:
+                api = self._apis.setdefault(key, api)
+        return api
+
+    def contexts(self):
+        """Contexts that already have a client"""
+        with self._lock:
+            return list(self._clients)
+
+
+client_pool = ClientPool()
+
+def get_core_v1(context_name=None):
+    """CoreV1Api for a context, defaulting to the one selected for this request"""
+    return client_pool.api(client.CoreV1Api, context_name or current_context())
+
+def get_networking_v1(context_name=None):
+    """NetworkingV1Api for a context, defaulting to the one selected for this request"""
+    return client_pool.api(client.NetworkingV1Api, context_name or current_context())
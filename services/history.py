@@ -0,0 +1,198 @@
+"""Fixed-memory time series of cluster stats with minute and hour rollups"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from utils.config import Config
+
+# Stats fields recorded with every sample
+FIELDS = ('pod_count', 'node_count', 'ready_nodes', 'cpu_usage', 'memory_usage', 'used_cpu', 'used_memory')
+
+_DURATION = re.compile(r'^(\d+)([smhd]?)$')
+_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(value):
+    """Seconds in a duration such as '90', '15m', '6h' or '7d'; ValueError otherwise"""
+    match = _DURATION.match((value or '').strip())
+    if not match:
+        raise ValueError(f"Invalid duration: {value}")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+def _average(points, start):
+    """One point averaging several; namespaces missing from a point count as 0 pods"""
+    count = len(points)
+    namespaces = {}
+    for point in points:
+        for namespace, pods in point['namespaces'].items():
+            namespaces[namespace] = namespaces.get(namespace, 0) + pods
+    return {
+        'time': start,
+        **{field: round(sum(point[field] for point in points) / count, 2) for field in FIELDS},
+        'namespaces': {namespace: round(total / count, 1) for namespace, total in namespaces.items()},
+    }
+
+
+class Rollup:
+    """Averages incoming points into fixed-width buckets kept in a bounded ring"""
+
+    def __init__(self, step, maxlen):
+        self.step = step
+        self.points = deque(maxlen=maxlen)
+        self._bucket = None
+        self._pending = []
+
+    @property
+    def retention(self):
+        return self.step * self.points.maxlen
+
+    def add(self, point):
+        """Add a point; returns the bucket it completed, if any"""
+        bucket = int(point['time'] // self.step * self.step)
+        completed = None
+        if self._pending and bucket != self._bucket:
+            completed = _average(self._pending, self._bucket)
+            self.points.append(completed)
+            self._pending = []
+        self._bucket = bucket
+        self._pending.append(point)
+        return completed
+
+    def state(self):
+        return list(self.points), self._bucket, list(self._pending)
+
+    def restore(self, state):
+        points, self._bucket, pending = state
+        self.points.extend(points)
+        self._pending = list(pending)
+
+    def series(self):
+        """Completed buckets plus the partial current one"""
+        points = list(self.points)
+        if self._pending:
+            points.append(_average(self._pending, self._bucket))
+        return points
+
+
+class StatsHistory:
+    """Raw stats samples for the last hour, minute rollups for a day, hour rollups for a month.
+
+    Every tier is a ring of fixed length, so memory stays bounded however
+    long the process runs. collect() is called every STATS_SAMPLE_INTERVAL
+    seconds from a daemon thread and returns (stats dict, {namespace: pods}),
+    or None to skip the sample. Sampling stops once start() has not been
+    called for as long as the raw tier reaches back, and resumes on the next
+    call.
+    """
+
+    def __init__(self, collect):
+        self._collect = collect
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_used = time.monotonic()
+        self.interval = Config.STATS_SAMPLE_INTERVAL
+        self.raw = deque(maxlen=Config.STATS_RAW_POINTS)
+        self.minutes = Rollup(60, Config.STATS_MINUTE_POINTS)
+        self.hours = Rollup(3600, Config.STATS_HOUR_POINTS)
+
+    def record(self, stats, namespaces, now=None):
+        point = {
+            'time': round(now if now is not None else time.time(), 1),
+            **{field: stats.get(field, 0) for field in FIELDS},
+            'namespaces': dict(namespaces),
+        }
+        with self._lock:
+            self.raw.append(point)
+            minute = self.minutes.add(point)
+            if minute is not None:
+                self.hours.add(minute)
+
+    def state(self):
+        """Everything needed to rebuild this history, for snapshots"""
+        with self._lock:
+            return {
+                'raw': list(self.raw),
+                'minutes': self.minutes.state(),
+                'hours': self.hours.state(),
+            }
+
+    def restore(self, state):
+        """Load a saved state(); points beyond this history's ring sizes are dropped"""
+        with self._lock:
+            self.raw.extend(state['raw'])
+            self.minutes.restore(state['minutes'])
+            self.hours.restore(state['hours'])
+
+    def start(self):
+        """Start sampling in the background, or keep it going; call on every use of the context"""
+        with self._lock:
+            self.last_used = time.monotonic()
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='stats-history', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            self._thread = None
+
+    def _run(self):
+        idle_limit = self.interval * self.raw.maxlen
+        while not self._stop.is_set():
+            with self._lock:
+                if time.monotonic() - self.last_used > idle_limit:
+                    # Nobody has looked at this context for a while; start() resumes sampling
+                    self._thread = None
+                    return
+            try:
+                sample = self._collect()
+                if sample is not None:
+                    self.record(*sample)
+            except Exception as e:
+                logging.error(f"Error sampling cluster stats: {e}")
+            self._stop.wait(self.interval)
+
+    def _tiers(self):
+        """(step, retention, points) for each tier, finest first; caller holds the lock"""
+        raw_retention = self.interval * self.raw.maxlen
+        return [
+            (self.interval, raw_retention, list(self.raw)),
+            (self.minutes.step, self.minutes.retention, self.minutes.series()),
+            (self.hours.step, self.hours.retention, self.hours.series()),
+        ]
+
+    def series(self, range_seconds, step=None, now=None):
+        """Points covering the last range_seconds, from the finest tier that reaches back that far"""
+        now = now if now is not None else time.time()
+        since = now - range_seconds
+        with self._lock:
+            tiers = self._tiers()
+        tier_step, _, points = next((tier for tier in tiers if tier[1] >= range_seconds), tiers[-1])
+        points = [point for point in points if point['time'] >= since]
+
+        # Coarser steps than the tier's are averaged on read
+        if step and step > tier_step:
+            buckets = {}
+            for point in points:
+                buckets.setdefault(int(point['time'] // step * step), []).append(point)
+            points = [_average(bucket, start) for start, bucket in sorted(buckets.items())]
+            tier_step = step
+        return {'range': range_seconds, 'step': tier_step, 'points': points}
+
+    def value_ago(self, seconds, field, now=None):
+        """A field's value about `seconds` ago, or None if history does not reach back that far"""
+        target = (now if now is not None else time.time()) - seconds
+        with self._lock:
+            tiers = self._tiers()
+        for _, _, points in tiers:
+            if points and points[0]['time'] <= target:
+                # Latest point at or before the target
+                for point in reversed(points):
+                    if point['time'] <= target:
+                        return point[field]
+        return None
@@ -0,0 +1,352 @@
+"""Watch-based in-memory cache of cluster state"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from kubernetes import watch
+from kubernetes.client.exceptions import ApiException
+from utils.config import Config
+from utils.metrics import ERRORS
+
+HTTP_GONE = 410
+
+# Resource kinds kept in the cache: kind -> (api attribute, cluster-wide list method)
+RESOURCE_KINDS = {
+    'pods': ('core', 'list_pod_for_all_namespaces'),
+    'nodes': ('core', 'list_node'),
+    'namespaces': ('core', 'list_namespace'),
+    'services': ('core', 'list_service_for_all_namespaces'),
+    'ingresses': ('networking', 'list_ingress_for_all_namespaces'),
+    'configmaps': ('core', 'list_config_map_for_all_namespaces'),
+    'secrets': ('core', 'list_secret_for_all_namespaces'),
+    'events': ('core', 'list_event_for_all_namespaces'),
+}
+
+
+class Informer:
+    """Keeps an in-memory copy of one resource kind using LIST + WATCH"""
+
+    # Name and help of the counter its relists are exported as
+    relists_metric = ('pyk_informer_relists_total', 'Full LISTs made by the watch cache')
+
+    def __init__(self, kind, list_func):
+        self.kind = kind
+        self._list_func = list_func
+        self._lock = threading.RLock()
+        self._by_namespace = {}
+        self._handlers = []
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._watch = None
+        self.resource_version = None
+        self.last_sync = None
+        self.last_event = None
+        self.relists = 0
+        self.initial_listed = False
+        self.restored_at = None
+        self.stale = False  # serving a restored snapshot no LIST or WATCH has confirmed yet
+        self.error = None
+
+    def add_handler(self, handler):
+        """Register a callback invoked as handler(event_type, old, new) on every change"""
+        with self._lock:
+            self._handlers.append(handler)
+
+    def remove_handler(self, handler):
+        with self._lock:
+            if handler in self._handlers:
+                self._handlers.remove(handler)
+
+    def start(self):
+        """Start the background LIST + WATCH loop (idempotent)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name=f"informer-{self.kind}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop watching and drop the synced flag"""
+        self._stop.set()
+        self._synced.clear()
+        self.resource_version = None
+        if self._watch:
+            self._watch.stop()
+
+    def restore(self, objects, resource_version, saved_at=None):
+        """Seed the store from a saved snapshot so reads are served while the first LIST or WATCH runs
+
+        The store counts as synced for reads but stays stale until the
+        apiserver has answered a LIST or WATCH for it.
+        """
+        with self._lock:
+            # A relist may have finished, and the store been replaced, just before this
+            if self._synced.is_set() or self.last_sync is not None:
+                return False
+            self._by_namespace = {}
+            for obj in objects:
+                self._by_namespace.setdefault(obj.metadata.namespace or '', {})[obj.metadata.name] = obj
+            # Watching from the saved version replays only what changed; a 410 falls back to a relist
+            self.resource_version = resource_version
+            self.restored_at = saved_at or datetime.now(timezone.utc)
+            self.stale = True
+
+        # Handler-fed indexes are complete before anyone gating on has_synced() reads them
+        for obj in objects:
+            self._notify('ADDED', None, obj)
+        self._synced.set()
+        self.initial_listed = True
+        return True
+
+    def has_synced(self):
+        return self._synced.is_set()
+
+    def is_current(self):
+        """Synced, and not from a snapshot the apiserver has yet to confirm"""
+        return self._synced.is_set() and not self.stale
+
+    def _confirm(self):
+        """The apiserver answered for the store's version, so a restored snapshot is current"""
+        if self.stale:
+            with self._lock:
+                self.stale = False
+                self.restored_at = None
+
+    def wait_for_sync(self, timeout=None):
+        return self._synced.wait(timeout)
+
+    def list(self, namespace=None):
+        """Return cached objects, sorted like the apiserver returns them"""
+        with self._lock:
+            if namespace is not None:
+                objects = self._by_namespace.get(namespace, {})
+                return [objects[name] for name in sorted(objects)]
+            return [
+                self._by_namespace[ns][name]
+                for ns in sorted(self._by_namespace)
+                for name in sorted(self._by_namespace[ns])
+            ]
+
+    def get(self, namespace, name):
+        with self._lock:
+            return self._by_namespace.get(namespace or '', {}).get(name)
+
+    def count(self):
+        with self._lock:
+            return sum(len(objects) for objects in self._by_namespace.values())
+
+    def status(self):
+        """Describe the sync state of this informer"""
+        return {
+            'synced': self.is_current(),
+            'stale': self.stale,
+            'items': self.count(),
+            'resource_version': self.resource_version,
+            'last_sync': self.last_sync.strftime("%Y-%m-%d %H:%M:%S") if self.last_sync else None,
+            'last_event': self.last_event.strftime("%Y-%m-%d %H:%M:%S") if self.last_event else None,
+            'relists': self.relists,
+            'restored_at': self.restored_at.strftime("%Y-%m-%d %H:%M:%S") if self.restored_at else None,
+            'error': self.error
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.resource_version is None:
+                    self._relist()
+                self._watch_from(self.resource_version)
+            except ApiException as e:
+                if e.status == HTTP_GONE:
+                    logging.info(f"Watch for {self.kind} expired, relisting")
+                    self.resource_version = None
+                    continue
+                self._fail(e)
+            except Exception as e:
+                self._fail(e)
+
+    def _fail(self, error):
+        ERRORS.inc(f"informer {self.kind}", type(error).__name__)
+        logging.error(f"Error watching {self.kind}: {error}")
+        self.error = str(error)
+        self.resource_version = None
+        self._stop.wait(Config.WATCH_RETRY_BACKOFF)
+
+    def _relist(self):
+        """Replace the store with a fresh chunked LIST and emit the differences"""
+        self._replace(*self._list_all())
+
+    def _list_all(self):
+        """Every object from a chunked LIST, by namespace and name, and the list's resourceVersion"""
+        fresh = {}
+        resource_version = None
+        _continue = None
+        while True:
+            kwargs = {'limit': Config.WATCH_LIST_PAGE_SIZE}
+            if _continue:
+                kwargs['_continue'] = _continue
+            result = self._list_func(**kwargs)
+            for obj in result.items:
+                fresh.setdefault(obj.metadata.namespace or '', {})[obj.metadata.name] = obj
+            resource_version = result.metadata.resource_version
+            _continue = result.metadata._continue
+            if not _continue:
+                break
+        return fresh, resource_version
+
+    def _replace(self, fresh, resource_version, restored_at=None):
+        """Swap in a complete listing and notify handlers of what changed
+
+        restored_at is set when the listing is itself an unconfirmed snapshot.
+        """
+        changes = []
+        with self._lock:
+            old = self._by_namespace
+            for ns, objects in fresh.items():
+                for name, obj in objects.items():
+                    previous = old.get(ns, {}).get(name)
+                    if previous is None:
+                        changes.append(('ADDED', None, obj))
+                    elif previous.metadata.resource_version != obj.metadata.resource_version:
+                        changes.append(('MODIFIED', previous, obj))
+            for ns, objects in old.items():
+                for name, obj in objects.items():
+                    if name not in fresh.get(ns, {}):
+                        changes.append(('DELETED', obj, None))
+            self._by_namespace = fresh
+            self.resource_version = resource_version
+            self.last_sync = datetime.now(timezone.utc)
+            self.relists += 1
+            self.restored_at = restored_at
+            self.stale = restored_at is not None
+            self.error = None
+
+        for change in changes:
+            self._notify(*change)
+        self._synced.set()
+        self.initial_listed = True
+
+    def _watch_from(self, resource_version):
+        self._watch = watch.Watch()
+        stream = self._watch.stream(
+            self._list_func,
+            resource_version=resource_version,
+            timeout_seconds=Config.WATCH_TIMEOUT_SECONDS,
+            allow_watch_bookmarks=True
+        )
+        for event in stream:
+            if self._stop.is_set():
+                break
+            self._confirm()
+            event_type = event['type']
+            if event_type == 'BOOKMARK':
+                self.resource_version = event['raw_object']['metadata']['resourceVersion']
+                continue
+            self._apply(event_type, event['object'])
+        # The watch from this version ran to its timeout without a 410, so the version was current
+        if not self._stop.is_set():
+            self._confirm()
+
+    def _apply(self, event_type, obj, resource_version=None):
+        """Apply one change; resource_version defaults to the object's"""
+        namespace = obj.metadata.namespace or ''
+        name = obj.metadata.name
+        with self._lock:
+            objects = self._by_namespace.setdefault(namespace, {})
+            old = objects.get(name)
+            if event_type == 'DELETED':
+                objects.pop(name, None)
+                if not objects:
+                    del self._by_namespace[namespace]
+            else:
+                objects[name] = obj
+            self.resource_version = resource_version or obj.metadata.resource_version
+            self.last_event = datetime.now(timezone.utc)
+
+        if event_type == 'DELETED':
+            self._notify('DELETED', old, None)
+        else:
+            self._notify('MODIFIED' if old is not None else 'ADDED', old, obj)
+
+    def _notify(self, event_type, old, new):
+        for handler in list(self._handlers):
+            try:
+                handler(event_type, old, new)
+            except Exception as e:
+                logging.error(f"Error in {self.kind} informer handler: {e}")
+
+
+class ClusterCache:
+    """Informers for every cached resource kind, sharing one pair of API clients"""
+
+    def __init__(self, core_api, networking_api, kinds=None, informer_factory=None):
+        if informer_factory is None:
+            apis = {'core': core_api, 'networking': networking_api}
+
+            def informer_factory(kind):
+                api, method = RESOURCE_KINDS[kind]
+                return Informer(kind, getattr(apis[api], method))
+
+        self.informers = {
+            kind: informer_factory(kind)
+            for kind in RESOURCE_KINDS
+            if kinds is None or kind in kinds
+        }
+        self.started_at = None
+
+    def start(self, kinds=None):
+        """Start all informers, or those of the given kinds (idempotent)"""
+        if not Config.WATCH_CACHE_ENABLED:
+            return
+        if self.started_at is None:
+            self.started_at = time.time()
+        for kind, informer in self.informers.items():
+            if kinds is None or kind in kinds:
+                informer.start()
+
+    def stop(self):
+        for informer in self.informers.values():
+            informer.stop()
+        self.started_at = None
+
+    def has_synced(self, kind=None):
+        """Whether the given kind (or every kind) is serving warm data"""
+        if kind is not None:
+            informer = self.informers.get(kind)
+            return informer is not None and informer.has_synced()
+        return all(informer.has_synced() for informer in self.informers.values())
+
+    def is_current(self, kind):
+        """Whether a kind is synced and not from an unconfirmed snapshot"""
+        informer = self.informers.get(kind)
+        return informer is not None and informer.is_current()
+
+    def wait_for_sync(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        for informer in self.informers.values():
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            if not informer.wait_for_sync(remaining):
+                return False
+        return True
+
+    def list(self, kind, namespace=None):
+        return self.informers[kind].list(namespace)
+
+    def get(self, kind, namespace, name):
+        return self.informers[kind].get(namespace, name)
+
+    def add_handler(self, kind, handler):
+        self.informers[kind].add_handler(handler)
+
+    def status(self):
+        """Sync state for every informer"""
+        return {
+            'enabled': Config.WATCH_CACHE_ENABLED,
+            'started': self.started_at is not None,
+            'synced': all(informer.is_current() for informer in self.informers.values()),
+            'informers': {kind: informer.status() for kind, informer in self.informers.items()}
+        }
@@ -0,0 +1,128 @@
+"""Deduplicated image inventory with usage counts by namespace and workload"""
+
+import threading
+from services.clients import current_context
+from services.kubernetes import (
+    get_all_pods, get_cluster_cache, on_cluster_cache_created, response_cache
+)
+from utils.config import Config
+from utils.images import parse_image
+
+
+def pod_workload(pod):
+    """(kind, name) of the workload that owns a pod, following ReplicaSets up to their Deployment"""
+    metadata = pod.metadata
+    owner = next((ref for ref in metadata.owner_references or [] if ref.controller), None)
+    if owner is None:
+        return 'Pod', metadata.name
+    template_hash = (metadata.labels or {}).get('pod-template-hash')
+    if owner.kind == 'ReplicaSet' and template_hash and owner.name.endswith(f"-{template_hash}"):
+        return 'Deployment', owner.name[:-len(template_hash) - 1]
+    return owner.kind, owner.name
+
+def pod_images_and_workload(pod):
+    """Everything about a pod the inventory shows besides its name and namespace"""
+    spec = pod.spec
+    if spec is None:
+        return (), None
+    containers = (spec.init_containers or []) + (spec.containers or [])
+    return tuple(container.image for container in containers), pod_workload(pod)
+
+def build_inventory(pods):
+    """Unique images across pods in one pass, most used first
+
+    Each row carries the parsed reference, the number of containers and
+    pods running it, container counts per namespace and the workloads
+    using it. Init containers are included.
+    """
+    images = {}
+    for pod in pods:
+        spec = pod.spec
+        if spec is None:
+            continue
+        namespace = pod.metadata.namespace
+        workload = None
+        for container in (spec.init_containers or []) + (spec.containers or []):
+            try:
+                reference = parse_image(container.image)
+            except ValueError:
+                continue
+            usage = images.get(reference)
+            if usage is None:
+                usage = images[reference] = {'containers': 0, 'pods': set(), 'namespaces': {}, 'workloads': {}}
+            if workload is None:
+                workload = (namespace, *pod_workload(pod))
+            usage['containers'] += 1
+            usage['pods'].add((namespace, pod.metadata.name))
+            usage['namespaces'][namespace] = usage['namespaces'].get(namespace, 0) + 1
+            usage['workloads'][workload] = usage['workloads'].get(workload, 0) + 1
+
+    rows = [
+        {
+            'image': reference.canonical,
+            'registry': reference.registry,
+            'repository': reference.repository,
+            'tag': reference.tag,
+            'digest': reference.digest,
+            'containers': usage['containers'],
+            'pods': len(usage['pods']),
+            'namespaces': dict(sorted(usage['namespaces'].items())),
+            'workloads': [
+                {'namespace': namespace, 'kind': kind, 'name': name, 'containers': count}
+                for (namespace, kind, name), count in sorted(usage['workloads'].items())
+            ],
+        }
+        for reference, usage in images.items()
+    ]
+    rows.sort(key=lambda row: (-row['containers'], row['image']))
+    return rows
+
+
+class InventoryCache:
+    """Inventory of one context, rebuilt on the first request after a pod change it shows"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._built = None  # (generation, rows)
+
+    def on_pod(self, event_type, old, new):
+        """Informer handler: pods coming or going, or changing images or owner, invalidate the inventory"""
+        # Status updates (readiness, restarts) are most pod events and change nothing here
+        if event_type == 'MODIFIED' and old is not None and pod_images_and_workload(old) == pod_images_and_workload(new):
+            return
+        with self._lock:
+            self._generation += 1
+
+    def get(self, pods):
+        with self._lock:
+            generation = self._generation
+            if self._built is not None and self._built[0] == generation:
+                return self._built[1]
+        rows = build_inventory(pods())
+        with self._lock:
+            # Keep it only if no pod changed while it was being built
+            if self._generation == generation:
+                self._built = (generation, rows)
+        return rows
+
+
+# One inventory per context, invalidated by that context's watch cache
+_inventories = {}
+
+def _attach_inventory(context_name, cache):
+    inventory = _inventories[context_name] = InventoryCache()
+    cache.add_handler('pods', inventory.on_pod)
+
+on_cluster_cache_created(_attach_inventory)
+
+def get_image_inventory():
+    """Inventory for the current context: cached until pod images change once the cache is warm, else for POD_CACHE_TTL"""
+    cache = get_cluster_cache()
+    if cache.has_synced('pods'):
+        return _inventories[current_context()].get(lambda: cache.list('pods'))
+    return response_cache.get_or_load(
+        (current_context(), 'image_inventory', None),
+        Config.POD_CACHE_TTL,
+        lambda: build_inventory(get_all_pods())
+    )
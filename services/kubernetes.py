@@ -2,23 +2,128 @@ from kubernetes import client, config
 from kubernetes.client.exceptions import ApiException
 from kubernetes.config import ConfigException
 import logging
+import threading
 from datetime import datetime, timezone
+from services import raw
+from services.clients import client_pool, current_context, get_core_v1, get_networking_v1
+from services.informer import ClusterCache
+from services.stream_hub import StreamHub
+from utils.cache import TTLCache
+from utils.config import Config
+from utils.metrics import add_collector
 
-# Initialize Kubernetes configuration
-try:
-    config.load_kube_config()
-except ConfigException as e:
-    logging.error(f"Error loading kubeconfig: {e}")
+# Kubernetes configuration is loaded per context by the client pool
+if client_pool.default_context is None:
+    logging.error("Error loading kubeconfig: no current context found")
     logging.error("Make sure you have a valid kubeconfig file and kubectl is properly configured")
 
-# Initialize the API client
-v1 = client.CoreV1Api()
-networking_v1 = client.NetworkingV1Api()
+# Watch-based caches (one per context) that answer the functions below once synced
+_cluster_caches = {}
+_stream_hubs = {}
+_cluster_cache_hooks = []
+_registry_lock = threading.Lock()
+
+# Short-lived cache for upstream LISTs made while the watch cache is cold
+response_cache = TTLCache(maxsize=Config.CACHE_MAX_ENTRIES)
+
+def _local_cluster_cache(context_name):
+    return ClusterCache(get_core_v1(context_name), get_networking_v1(context_name))
+
+# Builds the cache for a context; worker processes swap in one fed by the shared cache server
+_cluster_cache_factory = _local_cluster_cache
+
+def set_cluster_cache_factory(factory):
+    """Build cluster caches with factory(context) from now on"""
+    global _cluster_cache_factory
+    _cluster_cache_factory = factory
+
+def on_cluster_cache_created(hook):
+    """Call hook(context, cache) for every cluster cache, before it starts watching"""
+    with _registry_lock:
+        _cluster_cache_hooks.append(hook)
+        existing = list(_cluster_caches.items())
+    for context_name, cache in existing:
+        hook(context_name, cache)
+
+def get_cluster_cache(context_name=None):
+    """Watch cache for a context, defaulting to the one selected for this request"""
+    context_name = context_name or current_context()
+    with _registry_lock:
+        cache = _cluster_caches.get(context_name)
+        if cache is None:
+            cache = _cluster_cache_factory(context_name)
+            for hook in _cluster_cache_hooks:
+                hook(context_name, cache)
+            _cluster_caches[context_name] = cache
+        return cache
+
+def cluster_caches():
+    """Every cluster cache created so far, by context"""
+    with _registry_lock:
+        return dict(_cluster_caches)
+
+def collect_informers():
+    """Size and sync state of every context's watch cache"""
+    informers = [
+        (context_name, kind, informer)
+        for context_name, cache in cluster_caches().items()
+        for kind, informer in cache.informers.items()
+    ]
+    families = [
+        ('pyk_informer_objects', 'gauge', 'Objects held by the watch cache',
+         ('context', 'kind'), [((context_name, kind), informer.count()) for context_name, kind, informer in informers]),
+        ('pyk_informer_synced', 'gauge', 'Whether the watch cache is serving warm data (1) or not (0)',
+         ('context', 'kind'), [((context_name, kind), int(informer.has_synced())) for context_name, kind, informer in informers]),
+    ]
+    # Informers mirroring the cache server count store reloads, not LISTs, under their own name
+    relists = {}
+    for context_name, kind, informer in informers:
+        relists.setdefault(informer.relists_metric, []).append(((context_name, kind), informer.relists))
+    for (name, documentation), samples in relists.items():
+        families.append((name, 'counter', documentation, ('context', 'kind'), samples))
+    return families
+
+add_collector(collect_informers)
+
+def get_stream_hub(context_name=None):
+    """Live-update (SSE) fan-out hub for a context"""
+    context_name = context_name or current_context()
+    cache = get_cluster_cache(context_name)
+    with _registry_lock:
+        hub = _stream_hubs.get(context_name)
+        if hub is None:
+            hub = _stream_hubs[context_name] = StreamHub(cache, get_core_v1(context_name))
+        return hub
+
+def _fetch(ttl, list_func, namespace=None):
+    """Run an upstream LIST through the TTL cache, keyed by (context, function, namespace)"""
+    key = (current_context(), list_func.__name__, namespace)
+    if namespace is None:
+        return response_cache.get_or_load(key, ttl, lambda: list_func().items)
+    return response_cache.get_or_load(key, ttl, lambda: list_func(namespace=namespace).items)
+
+def _fetch_raw(ttl, list_func, namespace=None):
+    """Like _fetch, but decode the response as plain JSON instead of client models"""
+    key = (current_context(), f"{list_func.__name__}:raw", namespace)
+    if namespace is None:
+        return response_cache.get_or_load(key, ttl, lambda: raw.list_items(list_func))
+    return response_cache.get_or_load(key, ttl, lambda: raw.list_items(list_func, namespace=namespace))
+
+def _list_namespaced(kind, namespace, list_func, ttl=Config.RESOURCE_CACHE_TTL):
+    """List a resource kind in a namespace, from the watch cache when it is warm"""
+    cache = get_cluster_cache()
+    if cache.has_synced(kind):
+        return cache.list(kind, namespace)
+    return _fetch(ttl, list_func, namespace)
 
 def get_namespaces():
     """Get list of all namespaces"""
     try:
-        namespaces = v1.list_namespace().items
+        cache = get_cluster_cache()
+        if cache.has_synced('namespaces'):
+            namespaces = cache.list('namespaces')
+        else:
+            namespaces = _fetch(Config.NAMESPACE_CACHE_TTL, get_core_v1().list_namespace)
         return [ns.metadata.name for ns in namespaces]
     except ApiException as e:
         logging.error(f"Error getting namespaces: {e}")
@@ -27,7 +132,7 @@ def get_namespaces():
 def get_pods_in_namespace(namespace):
     """Get all pods in a specific namespace"""
     try:
-        return v1.list_namespaced_pod(namespace=namespace).items
+        return _list_namespaced('pods', namespace, get_core_v1().list_namespaced_pod, Config.POD_CACHE_TTL)
     except ApiException as e:
         logging.error(f"Error getting pods in namespace {namespace}: {e}")
         return []
@@ -35,11 +140,106 @@ def get_pods_in_namespace(namespace):
 def get_all_pods():
     """Get pods from all namespaces"""
     try:
-        return v1.list_pod_for_all_namespaces().items
+        cache = get_cluster_cache()
+        if cache.has_synced('pods'):
+            return cache.list('pods')
+        return _fetch(Config.POD_CACHE_TTL, get_core_v1().list_pod_for_all_namespaces)
     except ApiException as e:
         logging.error(f"Error getting pods from all namespaces: {e}")
         return []
 
+def get_nodes():
+    """Get all nodes"""
+    try:
+        cache = get_cluster_cache()
+        if cache.has_synced('nodes'):
+            return cache.list('nodes')
+        return _fetch(Config.RESOURCE_CACHE_TTL, get_core_v1().list_node)
+    except ApiException as e:
+        logging.error(f"Error getting nodes: {e}")
+        return []
+
+def get_raw_pods(namespace=None):
+    """Get pods as decoded JSON dicts, skipping client model deserialization"""
+    try:
+        if namespace is None:
+            return _fetch_raw(Config.POD_CACHE_TTL, get_core_v1().list_pod_for_all_namespaces)
+        return _fetch_raw(Config.POD_CACHE_TTL, get_core_v1().list_namespaced_pod, namespace)
+    except ApiException as e:
+        logging.error(f"Error getting raw pods for namespace {namespace}: {e}")
+        return []
+
+def _list_page(list_func, limit, _continue=None, raw_json=False, **kwargs):
+    """Fetch one chunk of a LIST from the apiserver, returning (items, continue token)"""
+    kwargs['limit'] = limit
+    if _continue:
+        kwargs['_continue'] = _continue
+    if raw_json:
+        return raw.list_page(list_func, **kwargs)
+    result = list_func(**kwargs)
+    return result.items, result.metadata._continue
+
+# Continue tokens of pages cut from a full listing rather than one apiserver chunk
+OFFSET_TOKEN_PREFIX = 'offset:'
+
+
+class PageTokenError(ValueError):
+    """A continue token that does not belong to the listing it was sent for"""
+
+
+def token_offset(token):
+    """Position a continue token from _slice_page resumes at, or None for apiserver tokens"""
+    if not token or not token.startswith(OFFSET_TOKEN_PREFIX):
+        return None
+    offset = token[len(OFFSET_TOKEN_PREFIX):]
+    if not offset.isdigit():
+        raise PageTokenError(f"Invalid continue token: {token}")
+    return int(offset)
+
+def _slice_page(items, limit, _continue=None):
+    """One page of a full listing, returning (items, continue token)"""
+    start = 0
+    if _continue:
+        start = token_offset(_continue)
+        if start is None:
+            raise PageTokenError("This listing is not paged by apiserver continue tokens")
+    end = start + limit
+    return items[start:end], f"{OFFSET_TOKEN_PREFIX}{end}" if end < len(items) else None
+
+def _pods_chunk(namespace, limit, _continue, raw_json):
+    if namespace is None:
+        return _list_page(get_core_v1().list_pod_for_all_namespaces, limit, _continue, raw_json)
+    return _list_page(get_core_v1().list_namespaced_pod, limit, _continue, raw_json, namespace=namespace)
+
+def get_pods_page(namespace=None, limit=Config.ITEMS_PER_PAGE, _continue=None, raw_json=False):
+    """Get one page of pods, from all namespaces when namespace is None
+
+    A first page is cut from the warm watch cache, or from a listing the TTL
+    cache still holds; only otherwise is it one apiserver chunk. Continue
+    tokens resume wherever the first page came from.
+    """
+    if _continue and token_offset(_continue) is None:
+        return _pods_chunk(namespace, limit, _continue, raw_json)
+    if get_cluster_cache().has_synced('pods'):
+        pods = get_all_pods() if namespace is None else get_pods_in_namespace(namespace)
+        return _slice_page(pods, limit, _continue)
+    list_name = 'list_pod_for_all_namespaces' if namespace is None else 'list_namespaced_pod'
+    pods = response_cache.peek((current_context(), f"{list_name}:raw" if raw_json else list_name, namespace))
+    if pods is None and _continue:
+        # The listing the first page was cut from has expired; list it again
+        if raw_json:
+            pods = get_raw_pods(namespace)
+        else:
+            pods = get_all_pods() if namespace is None else get_pods_in_namespace(namespace)
+    if pods is not None:
+        return _slice_page(pods, limit, _continue)
+    return _pods_chunk(namespace, limit, None, raw_json)
+
+def get_namespaces_page(limit=Config.ITEMS_PER_PAGE, _continue=None):
+    """Get one page of namespace names"""
+    namespaces, token = _list_page(get_core_v1().list_namespace, limit, _continue)
+    return [ns.metadata.name for ns in namespaces], token
+
 def get_pod_resources(pod):
     """Extract resource requests and limits from a pod"""
     resources = {'cpu': {'request': '0', 'limit': '0'}, 'memory': {'request': '0', 'limit': '0'}}
@@ -92,29 +292,37 @@ def get_pod_restart_count(pod):
 def get_namespace_events(namespace):
     """Get events for a specific namespace"""
     try:
-        events = v1.list_namespaced_event(namespace=namespace)
-        event_data = []
-        
-        for event in events.items:
-            event_data.append({
-                'type': event.type,
-                'reason': event.reason,
-                'message': event.message,
-                'count': event.count,
-                'first_timestamp': event.first_timestamp.strftime("%Y-%m-%d %H:%M:%S") if event.first_timestamp else None,
-                'last_timestamp': event.last_timestamp.strftime("%Y-%m-%d %H:%M:%S") if event.last_timestamp else None,
-                'involved_object': event.involved_object.name
-            })
-        
+        events = _list_namespaced('events', namespace, get_core_v1().list_namespaced_event, Config.EVENT_CACHE_TTL)
+        event_data = [get_event_data(event) for event in events]
         return sorted(event_data, key=lambda x: x['last_timestamp'] if x['last_timestamp'] else '', reverse=True)
     except ApiException as e:
         logging.error(f"Error getting events for namespace {namespace}: {e}")
         return []
 
+def get_namespace_events_page(namespace, limit=Config.ITEMS_PER_PAGE, _continue=None):
+    """Get one page of events for a namespace, newest first like get_namespace_events
+
+    The apiserver can only return events in name order, so pages are cut
+    from the watch- or TTL-cached listing rather than apiserver chunks.
+    """
+    return _slice_page(get_namespace_events(namespace), limit, _continue)
+
+def get_event_data(event):
+    """Flatten a V1Event into the dict returned by get_namespace_events"""
+    return {
+        'type': event.type,
+        'reason': event.reason,
+        'message': event.message,
+        'count': event.count,
+        'first_timestamp': event.first_timestamp.strftime("%Y-%m-%d %H:%M:%S") if event.first_timestamp else None,
+        'last_timestamp': event.last_timestamp.strftime("%Y-%m-%d %H:%M:%S") if event.last_timestamp else None,
+        'involved_object': event.involved_object.name
+    }
+
 def get_namespace_resource_quotas(namespace):
     """Get resource quotas for a specific namespace"""
     try:
-        quotas = v1.list_namespaced_resource_quota(namespace=namespace).items
+        quotas = _fetch(Config.RESOURCE_CACHE_TTL, get_core_v1().list_namespaced_resource_quota, namespace)
         quota_data = []
         
         for quota in quotas:
@@ -137,7 +345,7 @@ def get_namespace_resource_quotas(namespace):
 def get_namespace_configmaps(namespace):
     """Get configmaps for a specific namespace"""
     try:
-        configmaps = v1.list_namespaced_config_map(namespace=namespace).items
+        configmaps = _list_namespaced('configmaps', namespace, get_core_v1().list_namespaced_config_map)
         configmap_data = []
         
         for cm in configmaps:
@@ -156,7 +364,7 @@ def get_namespace_configmaps(namespace):
 def get_namespace_secrets(namespace):
     """Get secrets for a specific namespace"""
     try:
-        secrets = v1.list_namespaced_secret(namespace=namespace).items
+        secrets = _list_namespaced('secrets', namespace, get_core_v1().list_namespaced_secret)
         secret_data = []
         
         for secret in secrets:
@@ -172,10 +380,18 @@ def get_namespace_secrets(namespace):
         logging.error(f"Error getting secrets for namespace {namespace}: {e}")
         return []
 
+def get_services_in_namespace(namespace):
+    """Get all service objects in a specific namespace"""
+    try:
+        return _list_namespaced('services', namespace, get_core_v1().list_namespaced_service)
+    except ApiException as e:
+        logging.error(f"Error getting services in namespace {namespace}: {e}")
+        return []
+
 def get_namespace_services(namespace):
     """Get services for a specific namespace"""
     try:
-        services = v1.list_namespaced_service(namespace=namespace).items
+        services = _list_namespaced('services', namespace, get_core_v1().list_namespaced_service)
         service_data = []
         
         for svc in services:
@@ -208,10 +424,18 @@ def get_namespace_services(namespace):
         logging.error(f"Error getting services for namespace {namespace}: {e}")
         return []
 
+def get_ingresses_in_namespace(namespace):
+    """Get all ingress objects in a specific namespace"""
+    try:
+        return _list_namespaced('ingresses', namespace, get_networking_v1().list_namespaced_ingress)
+    except ApiException as e:
+        logging.error(f"Error getting ingresses in namespace {namespace}: {e}")
+        return []
+
 def get_namespace_ingresses(namespace):
     """Get ingresses for a specific namespace"""
     try:
-        ingresses = networking_v1.list_namespaced_ingress(namespace=namespace).items
+        ingresses = _list_namespaced('ingresses', namespace, get_networking_v1().list_namespaced_ingress)
         ingress_data = []
         
         for ing in ingresses:
@@ -0,0 +1,204 @@
+"""Inverted label index for selector queries and service-to-pod matching"""
+
+import re
+import threading
+from services.clients import current_context
+from services.kubernetes import (
+    get_cluster_cache, get_pods_in_namespace, get_services_in_namespace,
+    on_cluster_cache_created
+)
+
+_REQUIREMENT = re.compile(
+    r'^\s*(?:(?P<not>!)\s*(?P<absent>[\w./-]+)'
+    r'|(?P<key>[\w./-]+)\s*(?:(?P<op>==|=|!=)\s*(?P<value>[\w.-]*)'
+    r'|\s(?P<setop>in|notin)\s*\((?P<values>[^)]*)\))?)\s*$'
+)
+
+
+def parse_selector(selector):
+    """Parse a label selector string into [(key, operator, values)]
+
+    Supports the apiserver syntax: ``k=v``, ``k==v``, ``k!=v``,
+    ``k in (a,b)``, ``k notin (a,b)``, ``k`` and ``!k``. Raises ValueError
+    for anything else.
+    """
+    requirements = []
+    for term in re.split(r',(?![^(]*\))', selector or ''):
+        if not term.strip():
+            continue
+        match = _REQUIREMENT.match(term)
+        if not match:
+            raise ValueError(f"Invalid label selector term: {term.strip()}")
+        if match['not']:
+            requirements.append((match['absent'], '!', ()))
+        elif match['op']:
+            requirements.append((match['key'], '!=' if match['op'] == '!=' else '=', (match['value'],)))
+        elif match['setop']:
+            values = tuple(value.strip() for value in match['values'].split(',') if value.strip())
+            requirements.append((match['key'], match['setop'], values))
+        else:
+            requirements.append((match['key'], 'exists', ()))
+    return requirements
+
+def selector_requirements(selector):
+    """Requirements for an equality selector dict such as a Service's spec.selector"""
+    return [(key, '=', (value,)) for key, value in (selector or {}).items()]
+
+
+class LabelIndex:
+    """Pods per namespace indexed by label key=value, plus each Service's matching pods.
+
+    Selectors are answered by intersecting the posting sets of their terms,
+    smallest first. Service endpoints are kept up to date incrementally: a
+    pod change only re-checks the services whose selector mentions one of
+    the pod's old or new labels.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pods = {}           # (namespace, pod) -> (pod object, labels)
+        self._namespaces = {}     # namespace -> {pod, ...}
+        self._postings = {}       # (namespace, key, value) -> {pod, ...}
+        self._keys = {}           # (namespace, key) -> {pod, ...}
+        self._selectors = {}      # (namespace, service) -> selector dict
+        self._watchers = {}       # (namespace, key, value) -> {service, ...}
+        self._endpoints = {}      # (namespace, service) -> {pod, ...}
+
+    def on_pod(self, event_type, old, new):
+        """Informer handler for pod add/update/delete"""
+        obj = new if new is not None else old
+        namespace, name = obj.metadata.namespace, obj.metadata.name
+        labels = {} if event_type == 'DELETED' else dict(new.metadata.labels or {})
+
+        with self._lock:
+            _, previous = self._pods.pop((namespace, name), (None, {}))
+            for key, value in previous.items():
+                self._discard(self._postings, (namespace, key, value), name)
+                self._discard(self._keys, (namespace, key), name)
+            if event_type == 'DELETED':
+                self._discard(self._namespaces, namespace, name)
+            else:
+                self._pods[(namespace, name)] = (new, labels)
+                self._namespaces.setdefault(namespace, set()).add(name)
+                for key, value in labels.items():
+                    self._postings.setdefault((namespace, key, value), set()).add(name)
+                    self._keys.setdefault((namespace, key), set()).add(name)
+
+            affected = set()
+            for key, value in list(previous.items()) + list(labels.items()):
+                affected |= self._watchers.get((namespace, key, value), set())
+            for service in affected:
+                selector = self._selectors[(namespace, service)]
+                if event_type != 'DELETED' and all(labels.get(k) == v for k, v in selector.items()):
+                    self._endpoints.setdefault((namespace, service), set()).add(name)
+                else:
+                    self._discard(self._endpoints, (namespace, service), name)
+
+    def on_service(self, event_type, old, new):
+        """Informer handler for service add/update/delete"""
+        obj = new if new is not None else old
+        namespace, name = obj.metadata.namespace, obj.metadata.name
+        selector = {} if event_type == 'DELETED' else dict((new.spec.selector if new.spec else None) or {})
+
+        with self._lock:
+            for key, value in self._selectors.pop((namespace, name), {}).items():
+                self._discard(self._watchers, (namespace, key, value), name)
+            self._endpoints.pop((namespace, name), None)
+            # Services without a selector do not select pods
+            if not selector:
+                return
+            self._selectors[(namespace, name)] = selector
+            for key, value in selector.items():
+                self._watchers.setdefault((namespace, key, value), set()).add(name)
+            self._endpoints[(namespace, name)] = self._match(namespace, selector_requirements(selector))
+
+    @staticmethod
+    def _discard(index, key, member):
+        members = index.get(key)
+        if members is not None:
+            members.discard(member)
+            if not members:
+                del index[key]
+
+    def _match(self, namespace, requirements):
+        """Names of pods matching every requirement; caller holds the lock"""
+        include = []
+        exclude = set()
+        for key, operator, values in requirements:
+            if operator == '=':
+                include.append(self._postings.get((namespace, key, values[0]), set()))
+            elif operator == 'in':
+                include.append(set().union(*(self._postings.get((namespace, key, value), set()) for value in values)))
+            elif operator == 'exists':
+                include.append(self._keys.get((namespace, key), set()))
+            elif operator == '!=' or operator == 'notin':
+                for value in values:
+                    exclude |= self._postings.get((namespace, key, value), set())
+            elif operator == '!':
+                exclude |= self._keys.get((namespace, key), set())
+
+        if include:
+            include.sort(key=len)
+            matched = include[0].intersection(*include[1:])
+        else:
+            matched = set(self._namespaces.get(namespace, ()))
+        return matched - exclude
+
+    def select(self, namespace, requirements):
+        """Pods in a namespace matching parsed selector requirements, sorted by name"""
+        with self._lock:
+            names = self._match(namespace, requirements)
+            return [self._pods[(namespace, name)][0] for name in sorted(names)]
+
+    def service_pods(self, namespace):
+        """Map every selector-based service in a namespace to its sorted pod names"""
+        with self._lock:
+            return {
+                service: sorted(self._endpoints.get((ns, service), ()))
+                for ns, service in self._selectors
+                if ns == namespace
+            }
+
+
+# One index per context, kept current by that context's watch cache
+_label_indexes = {}
+
+def _attach_index(context_name, cache):
+    index = _label_indexes[context_name] = LabelIndex()
+    cache.add_handler('pods', index.on_pod)
+    cache.add_handler('services', index.on_service)
+
+on_cluster_cache_created(_attach_index)
+
+def label_index_synced():
+    """Whether the current context's maintained index is warm"""
+    cache = get_cluster_cache()
+    return cache.has_synced('pods') and cache.has_synced('services')
+
+def get_label_index(namespace):
+    """Index answering for a namespace: the maintained one once the cache is warm, else built from one LIST"""
+    if label_index_synced():
+        return _label_indexes[current_context()]
+
+    index = LabelIndex()
+    for pod in get_pods_in_namespace(namespace):
+        index.on_pod('ADDED', None, pod)
+    for service in get_services_in_namespace(namespace):
+        index.on_service('ADDED', None, service)
+    return index
+
+def match_service_pods(services, pod_labels):
+    """Map every selector-based service to its sorted pod names, matching pods the caller already listed
+
+    pod_labels is [(pod name, labels)]. This scans instead of indexing, for
+    one namespace's worth of pods on the cold path.
+    """
+    service_pods = {}
+    for service in services:
+        selector = (service.spec.selector if service.spec else None) or {}
+        if selector:
+            service_pods[service.metadata.name] = sorted(
+                name for name, labels in pod_labels
+                if all(labels.get(key) == value for key, value in selector.items())
+            )
+    return service_pods
@@ -0,0 +1,94 @@
+"""Raw-JSON fast path that skips kubernetes client model deserialization
+
+List calls made with ``_preload_content=False`` return the undecoded
+response. Decoding that with a fast JSON parser and reading the handful of
+fields the routes need avoids building V1Pod/V1Container object graphs and
+parsing every timestamp in them.
+"""
+
+import json
+import time
+from datetime import datetime
+from utils.metrics import DESERIALIZE_DURATION
+from utils.profiling import active_profile
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+
+def list_items(list_func, **kwargs):
+    """Call a client list function and return the decoded 'items' list"""
+    return list_page(list_func, **kwargs)[0]
+
+def list_page(list_func, **kwargs):
+    """Call a client list function and return (items, continue token)"""
+    response = list_func(_preload_content=False, **kwargs)
+    try:
+        start = time.perf_counter()
+        data = response.data
+        result = loads(data)
+        elapsed = time.perf_counter() - start
+        DESERIALIZE_DURATION.observe(elapsed, 'raw json')
+        profile = active_profile()
+        if profile is not None:
+            # The read is included: the body streams in after the call returned its headers
+            profile.record('deserialize', start_ms=profile.offset_ms(start), duration_ms=round(elapsed * 1000, 3),
+                           type='raw json', bytes=len(data))
+    finally:
+        response.release_conn()
+    return result.get('items') or [], (result.get('metadata') or {}).get('continue')
+
+def parse_timestamp(value):
+    """Parse an RFC 3339 timestamp as sent by the apiserver"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def pod_name(pod):
+    return pod['metadata']['name']
+
+def pod_namespace(pod):
+    return pod['metadata'].get('namespace')
+
+def pod_labels(pod):
+    return pod['metadata'].get('labels') or {}
+
+def pod_phase(pod):
+    return (pod.get('status') or {}).get('phase')
+
+def pod_created(pod):
+    return parse_timestamp(pod['metadata'].get('creationTimestamp'))
+
+def pod_health(pod):
+    """Same result as services.kubernetes.get_pod_health for a raw pod"""
+    statuses = (pod.get('status') or {}).get('containerStatuses')
+    if not statuses:
+        return 'unknown'
+    all_ready = all(container.get('ready') for container in statuses)
+    all_running = all((container.get('state') or {}).get('running') for container in statuses)
+    return 'healthy' if all_ready and all_running else 'unhealthy'
+
+def pod_resources(pod):
+    """Same result as services.kubernetes.get_pod_resources for a raw pod"""
+    resources = {'cpu': {'request': '0', 'limit': '0'}, 'memory': {'request': '0', 'limit': '0'}}
+    for container in (pod.get('spec') or {}).get('containers') or []:
+        container_resources = container.get('resources') or {}
+        requests = container_resources.get('requests')
+        if requests:
+            resources['cpu']['request'] = requests.get('cpu', '0')
+            resources['memory']['request'] = requests.get('memory', '0')
+        limits = container_resources.get('limits')
+        if limits:
+            resources['cpu']['limit'] = limits.get('cpu', '0')
+            resources['memory']['limit'] = limits.get('memory', '0')
+    return resources
+
+def pod_images(pod):
+    return [container.get('image') for container in (pod.get('spec') or {}).get('containers') or []]
+
+def pod_restart_count(pod):
+    statuses = (pod.get('status') or {}).get('containerStatuses') or []
+    return sum(container.get('restartCount') or 0 for container in statuses)
@@ -0,0 +1,144 @@
+"""Reverse index from ConfigMaps, Secrets and Services to the pods and ingresses using them"""
+
+import threading
+from services.clients import current_context
+from services.kubernetes import (
+    get_cluster_cache, get_ingresses_in_namespace, get_pods_in_namespace,
+    on_cluster_cache_created
+)
+
+
+def pod_references(pod):
+    """Yield (kind, name, usage) for every ConfigMap and Secret a pod uses"""
+    spec = pod.spec
+    if spec is None:
+        return
+    for volume in spec.volumes or []:
+        if volume.config_map and volume.config_map.name:
+            yield 'configmap', volume.config_map.name, 'volume'
+        if volume.secret and volume.secret.secret_name:
+            yield 'secret', volume.secret.secret_name, 'volume'
+        if volume.projected:
+            for source in volume.projected.sources or []:
+                if source.config_map and source.config_map.name:
+                    yield 'configmap', source.config_map.name, 'projected volume'
+                if source.secret and source.secret.name:
+                    yield 'secret', source.secret.name, 'projected volume'
+
+    for container in (spec.init_containers or []) + (spec.containers or []):
+        for env in container.env or []:
+            value_from = env.value_from
+            if value_from and value_from.config_map_key_ref:
+                yield 'configmap', value_from.config_map_key_ref.name, 'environment'
+            if value_from and value_from.secret_key_ref:
+                yield 'secret', value_from.secret_key_ref.name, 'environment'
+        for env_from in container.env_from or []:
+            if env_from.config_map_ref:
+                yield 'configmap', env_from.config_map_ref.name, 'envFrom'
+            if env_from.secret_ref:
+                yield 'secret', env_from.secret_ref.name, 'envFrom'
+
+    for pull_secret in spec.image_pull_secrets or []:
+        if pull_secret.name:
+            yield 'secret', pull_secret.name, 'imagePullSecrets'
+
+def ingress_references(ingress):
+    """Yield (kind, name, usage) for every Service and TLS Secret an ingress uses"""
+    spec = ingress.spec
+    if spec is None:
+        return
+    if spec.default_backend and spec.default_backend.service:
+        yield 'service', spec.default_backend.service.name, 'default backend'
+    for rule in spec.rules or []:
+        for path in (rule.http.paths or []) if rule.http else []:
+            if path.backend and path.backend.service:
+                yield 'service', path.backend.service.name, f'{rule.host or "*"}{path.path or ""}'
+    for tls in spec.tls or []:
+        if tls.secret_name:
+            yield 'secret', tls.secret_name, 'TLS'
+
+REFERENCE_EXTRACTORS = {
+    'Pod': pod_references,
+    'Ingress': ingress_references,
+}
+
+
+class ReferenceIndex:
+    """Which pods and ingresses reference each ConfigMap, Secret and Service.
+
+    Every referrer's outgoing references are remembered, so an update only
+    removes what the old version referenced and adds what the new one does;
+    lookups are a dictionary hit instead of a scan over pods and containers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (namespace, kind, name) -> {(referrer kind, referrer name): {usage, ...}}
+        self._referrers = {}
+        # (namespace, referrer kind, referrer name) -> (object, {(kind, name, usage), ...})
+        self._references = {}
+
+    def on_pod(self, event_type, old, new):
+        """Informer handler for pod add/update/delete"""
+        self._update('Pod', event_type, old, new)
+
+    def on_ingress(self, event_type, old, new):
+        """Informer handler for ingress add/update/delete"""
+        self._update('Ingress', event_type, old, new)
+
+    def _update(self, referrer_kind, event_type, old, new):
+        obj = new if new is not None else old
+        namespace = obj.metadata.namespace
+        referrer = (referrer_kind, obj.metadata.name)
+        key = (namespace,) + referrer
+        references = set() if event_type == 'DELETED' else set(REFERENCE_EXTRACTORS[referrer_kind](new))
+
+        with self._lock:
+            _, previous = self._references.pop(key, (None, set()))
+            for kind, name, usage in previous - references:
+                target = (namespace, kind, name)
+                usages = self._referrers[target][referrer]
+                usages.discard(usage)
+                if not usages:
+                    del self._referrers[target][referrer]
+                    if not self._referrers[target]:
+                        del self._referrers[target]
+            for kind, name, usage in references - previous:
+                target = self._referrers.setdefault((namespace, kind, name), {})
+                target.setdefault(referrer, set()).add(usage)
+            if references:
+                self._references[key] = (new, references)
+
+    def referrers(self, namespace, kind, name, referrer_kind):
+        """Return [(object, [usage, ...])] of referrer_kind objects that use kind/name"""
+        with self._lock:
+            found = [
+                (self._references[(namespace,) + referrer][0], sorted(usages))
+                for referrer, usages in self._referrers.get((namespace, kind, name), {}).items()
+                if referrer[0] == referrer_kind
+            ]
+        return sorted(found, key=lambda item: item[0].metadata.name)
+
+
+# One index per context, kept current by that context's watch cache
+_reference_indexes = {}
+
+def _attach_index(context_name, cache):
+    index = _reference_indexes[context_name] = ReferenceIndex()
+    cache.add_handler('pods', index.on_pod)
+    cache.add_handler('ingresses', index.on_ingress)
+
+on_cluster_cache_created(_attach_index)
+
+def get_reference_index(namespace):
+    """Index answering for a namespace: the maintained one once the cache is warm, else built from one LIST"""
+    cache = get_cluster_cache()
+    if cache.has_synced('pods') and cache.has_synced('ingresses'):
+        return _reference_indexes[current_context()]
+
+    index = ReferenceIndex()
+    for pod in get_pods_in_namespace(namespace):
+        index.on_pod('ADDED', None, pod)
+    for ingress in get_ingresses_in_namespace(namespace):
+        index.on_ingress('ADDED', None, ingress)
+    return index
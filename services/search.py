@@ -0,0 +1,147 @@
+"""Trigram index over container images for ranked, paginated image search"""
+
+import threading
+from services.clients import current_context
+from services.kubernetes import (
+    get_all_pods, get_cluster_cache, get_pod_images, on_cluster_cache_created,
+    response_cache
+)
+from utils.config import Config
+
+# Fields searched, in the order they are weighted for ties
+FIELDS = ('image', 'pod_name', 'namespace')
+
+# Characters that start a new word inside a name or image reference
+_SEPARATORS = '/:@.-_'
+
+
+def trigrams(text):
+    """Set of 3-character substrings of lowercased text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _match_score(term, value):
+    """How well one query term matches one field value: 0 for no match"""
+    position = value.find(term)
+    if position < 0:
+        return 0
+    if len(term) == len(value):
+        return 8
+    if position == 0:
+        return 4
+    if value[position - 1] in _SEPARATORS:
+        return 2
+    return 1
+
+
+class ImageSearchIndex:
+    """Container image rows indexed by the trigrams of their namespace, pod name and image.
+
+    A query is split into terms; candidates are the rows holding every
+    trigram of every term of three or more characters, smallest posting
+    set first, then each candidate is checked for the full substrings.
+    Queries made only of shorter terms scan the rows. Pod add/update/delete
+    events replace just that pod's rows and postings.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}       # row id -> (row dict, {field: lowercased value})
+        self._pod_rows = {}   # (namespace, pod) -> [row id, ...]
+        self._postings = {}   # trigram -> {row id, ...}
+        self._next_id = 0
+
+    def on_pod(self, event_type, old, new):
+        """Informer handler for pod add/update/delete"""
+        obj = new if new is not None else old
+        namespace, name = obj.metadata.namespace, obj.metadata.name
+        images = [] if event_type == 'DELETED' else get_pod_images(new)
+
+        with self._lock:
+            for row_id in self._pod_rows.pop((namespace, name), ()):
+                _, values = self._rows.pop(row_id)
+                for gram in trigrams(' '.join(values.values())):
+                    postings = self._postings.get(gram)
+                    if postings is not None:
+                        postings.discard(row_id)
+                        if not postings:
+                            del self._postings[gram]
+
+            row_ids = []
+            for image in images:
+                row = {'namespace': namespace, 'pod_name': name, 'image': image}
+                values = {field: row[field].lower() for field in FIELDS}
+                row_id = self._next_id
+                self._next_id += 1
+                self._rows[row_id] = (row, values)
+                # Trigrams spanning two fields never match a term, so the join only saves calls
+                for gram in trigrams(' '.join(values.values())):
+                    self._postings.setdefault(gram, set()).add(row_id)
+                row_ids.append(row_id)
+            if row_ids:
+                self._pod_rows[(namespace, name)] = row_ids
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _candidates(self, terms):
+        """Row ids that may match every term; caller holds the lock"""
+        grams = set()
+        for term in terms:
+            grams |= trigrams(term)
+        if not grams:
+            return self._rows.keys()
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def search(self, query, offset=0, limit=Config.ITEMS_PER_PAGE):
+        """Rows matching every term of query, best match first: {'total', 'items'}
+
+        A term scores highest when it equals a field, then when it starts
+        the field or one of its words; image matches outrank pod name
+        matches, which outrank namespace matches. An empty query pages
+        through every row by namespace and pod.
+        """
+        terms = query.lower().split()
+        matches = []
+        with self._lock:
+            for row_id in self._candidates(terms):
+                row, values = self._rows[row_id]
+                score = 0
+                for term in terms:
+                    best = max(
+                        _match_score(term, values[field]) * (len(FIELDS) - rank)
+                        for rank, field in enumerate(FIELDS)
+                    )
+                    if not best:
+                        break
+                    score += best
+                else:
+                    matches.append((-score, row['namespace'], row['pod_name'], row['image'], row))
+
+        matches.sort(key=lambda match: match[:4])
+        return {
+            'total': len(matches),
+            'items': [dict(match[4], score=-match[0]) for match in matches[offset:offset + limit]],
+        }
+
+
+# One index per context, kept current by that context's watch cache
+_search_indexes = {}
+
+def _attach_index(context_name, cache):
+    index = _search_indexes[context_name] = ImageSearchIndex()
+    cache.add_handler('pods', index.on_pod)
+
+on_cluster_cache_created(_attach_index)
+
+def _build_index():
+    index = ImageSearchIndex()
+    for pod in get_all_pods():
+        index.on_pod('ADDED', None, pod)
+    return index
+
+def get_image_search_index():
+    """The maintained index once the pod cache is warm, else one built from a LIST and reused for POD_CACHE_TTL"""
+    if get_cluster_cache().has_synced('pods'):
+        return _search_indexes[current_context()]
+    return response_cache.get_or_load((current_context(), 'image_search_index', None), Config.POD_CACHE_TTL, _build_index)
@@ -0,0 +1,351 @@
+"""Cluster caches shared by every server worker through one cache process on a unix socket
+
+Under gunicorn the master starts a cache server before forking workers.
+Only that process LISTs and WATCHes the apiserver, restores and writes
+snapshots and samples stats history. A worker's informers load the
+server's store once and then long-poll its numbered event log instead of
+the apiserver, so upstream load is that of one process however many
+workers run. Each worker still keeps the objects it mirrors, since its
+indexes and live-update streams are built from them in process.
+
+Workers also push their metrics to the server every METRICS_PUSH_INTERVAL
+seconds, so whichever worker a scrape reaches can report every process.
+"""
+
+import logging
+import multiprocessing
+import os
+import secrets
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from functools import partial
+from itertools import islice
+from multiprocessing.managers import BaseManager
+from services.clients import use_context
+from services.informer import ClusterCache, Informer
+from services.kubernetes import get_cluster_cache, set_cluster_cache_factory
+from services.snapshots import dumps, loads, restore_snapshot
+from services.statistics import get_stats_history, set_stats_history_factory
+from utils.config import Config
+from utils.metrics import collect
+
+# Workers inherit the server's authentication key from the master's environment
+AUTHKEY_ENV = 'PYK_CACHE_AUTHKEY'
+
+_uses_cache_server = False
+_metrics_reporter = None
+
+
+class EventLog:
+    """The last SHARED_CACHE_EVENTS changes of one informer, numbered for workers to catch up from"""
+
+    def __init__(self, informer):
+        self.informer = informer
+        self._events = deque(maxlen=Config.SHARED_CACHE_EVENTS)
+        self._condition = threading.Condition()
+        self.seq = 0
+
+    def on_change(self, event_type, old, new):
+        with self._condition:
+            self.seq += 1
+            self._events.append((self.seq, event_type, new if new is not None else old, self.informer.resource_version))
+            self._condition.notify_all()
+
+    def snapshot(self):
+        """(objects, resourceVersion, seq, restored_at): the store, the event it is current up to,
+        and when its snapshot was saved while the apiserver has not confirmed it
+
+        A change can reach the store just before its event is logged, so a
+        worker may be sent a change its snapshot already holds; applying
+        it again is harmless.
+        """
+        with self._condition:
+            informer = self.informer
+            return informer.list(), informer.resource_version, self.seq, informer.restored_at if informer.stale else None
+
+    def since(self, seq, timeout):
+        """Events after seq, waiting up to timeout for the first; None if seq can no longer be caught up from"""
+        with self._condition:
+            # A seq from the future means the server restarted since the worker's snapshot
+            if seq > self.seq:
+                return None
+            self._condition.wait_for(lambda: self.seq > seq, timeout)
+            first = self._events[0][0] if self._events else self.seq + 1
+            if seq + 1 < first:
+                return None
+            return list(islice(self._events, seq + 1 - first, None))
+
+
+class CacheRelay:
+    """Served by the cache server: per-context stores, event logs and stats history"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logs = {}  # (context, kind) -> EventLog
+        self._worker_metrics = {}  # pid -> (time pushed, metric families)
+
+    def _log(self, context_name, kind):
+        """Event log of a kind, starting the context's cache and sampler on first use"""
+        with self._lock:
+            if (context_name, kind) not in self._logs:
+                use_context(context_name)
+                cache = get_cluster_cache(context_name)
+                for informer_kind, informer in cache.informers.items():
+                    log = self._logs[(context_name, informer_kind)] = EventLog(informer)
+                    informer.add_handler(log.on_change)
+                # A snapshot being loaded starts the informers itself, so they resume from it
+                if not restore_snapshot(context_name):
+                    cache.start()
+                get_stats_history(context_name).start()
+            return self._logs[(context_name, kind)]
+
+    def snapshot(self, context_name, kind):
+        """Pickled (objects, resourceVersion, seq), or None while the kind has not synced"""
+        log = self._log(context_name, kind)
+        if not log.informer.wait_for_sync(Config.SHARED_CACHE_POLL):
+            return None
+        return dumps(log.snapshot())
+
+    def events(self, context_name, kind, seq):
+        """Pickled ([(seq, event type, object, resourceVersion)] after seq, stale), or None to reload the snapshot"""
+        log = self._log(context_name, kind)
+        events = log.since(seq, Config.SHARED_CACHE_POLL)
+        return None if events is None else dumps((events, log.informer.stale))
+
+    def _history(self, context_name):
+        """A context's stats history, kept sampling while workers' requests read it"""
+        self._log(context_name, 'pods')
+        history = get_stats_history(context_name)
+        history.start()
+        return history
+
+    def history_series(self, context_name, range_seconds, step=None):
+        return self._history(context_name).series(range_seconds, step)
+
+    def history_value_ago(self, context_name, seconds, field):
+        return self._history(context_name).value_ago(seconds, field)
+
+    def metrics(self, pid, families):
+        """Keep a worker's metric families; returns the server's and those of every worker still pushing"""
+        now = time.time()
+        with self._lock:
+            self._worker_metrics[pid] = (now, families)
+            # A worker that stopped pushing has exited; gunicorn replaced it under a new pid
+            for worker, (pushed, _) in list(self._worker_metrics.items()):
+                if now - pushed > 3 * Config.METRICS_PUSH_INTERVAL:
+                    del self._worker_metrics[worker]
+            workers = [self._worker_metrics[worker][1] for worker in sorted(self._worker_metrics)]
+        return [collect('cache')] + workers
+
+
+class _ServerManager(BaseManager):
+    pass
+
+class _ClientManager(BaseManager):
+    pass
+
+_ClientManager.register('relay')
+
+def serve(address, authkey):
+    """Run the cache server until terminated (the cache process's entry point)"""
+    relay = CacheRelay()
+    _ServerManager.register('relay', callable=lambda: relay)
+    directory = os.path.dirname(address)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.exists(address):
+        os.unlink(address)
+    server = _ServerManager(address=address, authkey=authkey).get_server()
+    # Exit through SystemExit so the snapshotter's atexit save runs
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logging.info(f"Cache server listening on {address}")
+    server.serve_forever()
+
+def start_cache_server():
+    """Start the cache server process and wait for its socket; returns the process"""
+    address = Config.SHARED_CACHE_SOCKET
+    authkey = secrets.token_bytes(16)
+    os.environ[AUTHKEY_ENV] = authkey.hex()
+    if os.path.exists(address):
+        os.unlink(address)
+    process = multiprocessing.get_context('spawn').Process(
+        target=serve, args=(address, authkey), name='pyk-cache', daemon=True
+    )
+    process.start()
+    deadline = time.time() + Config.SHARED_CACHE_START_TIMEOUT
+    while not os.path.exists(address) and process.is_alive() and time.time() < deadline:
+        time.sleep(0.1)
+    if not os.path.exists(address):
+        logging.error(f"Cache server did not start listening on {address}")
+    return process
+
+def _connect(address, authkey):
+    manager = _ClientManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.relay()
+
+
+class RelayInformer(Informer):
+    """Informer that mirrors the cache server's store instead of watching the apiserver"""
+
+    relists_metric = (
+        'pyk_informer_relay_reloads_total',
+        "Loads of the cache server's store, on connecting and after falling behind its event log"
+    )
+
+    def __init__(self, kind, context_name, connect):
+        super().__init__(kind, None)
+        self._context_name = context_name
+        self._connect = connect
+        self._relay = None
+        self._seq = None
+
+    def _server(self):
+        if self._relay is None:
+            self._relay = self._connect()
+        return self._relay
+
+    def _fail(self, error):
+        # Reconnect on the next attempt; the server may have restarted
+        self._relay = None
+        super()._fail(error if str(error) else ConnectionError('lost connection to the cache server'))
+
+    def _relist(self):
+        data = self._server().snapshot(self._context_name, self.kind)
+        if data is None:
+            raise RuntimeError(f"Cache server has not synced {self.kind} yet")
+        objects, resource_version, self._seq, restored_at = loads(data)
+        fresh = {}
+        for obj in objects:
+            fresh.setdefault(obj.metadata.namespace or '', {})[obj.metadata.name] = obj
+        self._replace(fresh, resource_version, restored_at)
+
+    def _watch_from(self, resource_version):
+        while not self._stop.is_set():
+            data = self._server().events(self._context_name, self.kind, self._seq)
+            if data is None:
+                # Fell behind the server's event log: reload its store
+                self.resource_version = None
+                return
+            events, stale = loads(data)
+            for seq, event_type, obj, version in events:
+                self._apply(event_type, obj, version)
+                self._seq = seq
+            if not stale:
+                self._confirm()
+
+    def _apply(self, event_type, obj, resource_version=None):
+        # A deletion the snapshot already reflected
+        if event_type == 'DELETED' and self.get(obj.metadata.namespace, obj.metadata.name) is None:
+            return
+        super()._apply(event_type, obj, resource_version)
+
+
+class RemoteStatsHistory:
+    """A context's stats history as sampled by the cache server"""
+
+    def __init__(self, context_name, connect):
+        self._context_name = context_name
+        self._connect = connect
+        self._relay = None
+
+    def _call(self, method, *args):
+        for attempt in range(2):
+            try:
+                if self._relay is None:
+                    self._relay = self._connect()
+                return getattr(self._relay, method)(self._context_name, *args)
+            except (EOFError, OSError):
+                # Reconnect once in case the server restarted
+                self._relay = None
+                if attempt:
+                    raise
+
+    def start(self):
+        """The cache server samples; nothing to start in a worker"""
+
+    def stop(self):
+        pass
+
+    def series(self, range_seconds, step=None):
+        return self._call('history_series', range_seconds, step)
+
+    def value_ago(self, seconds, field):
+        """Like StatsHistory.value_ago; None while the server is unreachable, as growth is optional"""
+        try:
+            return self._call('history_value_ago', seconds, field)
+        except (EOFError, OSError) as e:
+            logging.error(f"Error reading stats history from the cache server: {e}")
+            return None
+
+
+class MetricsReporter:
+    """Pushes this worker's metrics to the cache server, which keeps every process's for scrapes"""
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._relay = None
+        self._thread = None
+
+    def _push(self):
+        families = collect(os.getpid())
+        for attempt in range(2):
+            try:
+                if self._relay is None:
+                    self._relay = self._connect()
+                return self._relay.metrics(os.getpid(), families)
+            except (EOFError, OSError):
+                # Reconnect once in case the server restarted
+                self._relay = None
+                if attempt:
+                    raise
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='metrics-push', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(Config.METRICS_PUSH_INTERVAL)
+            try:
+                self._push()
+            except (EOFError, OSError) as e:
+                logging.error(f"Error pushing metrics to the cache server: {e}")
+
+    def gather(self):
+        """Metric families of the cache server and every worker, this one's current; only this one's if unreachable"""
+        try:
+            return self._push()
+        except (EOFError, OSError) as e:
+            logging.error(f"Error reading metrics from the cache server: {e}")
+            return [collect(os.getpid())]
+
+
+def use_cache_server():
+    """Make this worker mirror the cache server instead of talking to the apiserver for cached kinds"""
+    global _uses_cache_server, _metrics_reporter
+    connect = partial(_connect, Config.SHARED_CACHE_SOCKET, bytes.fromhex(os.environ[AUTHKEY_ENV]))
+
+    def relay_cache(context_name):
+        return ClusterCache(None, None, informer_factory=partial(RelayInformer, context_name=context_name, connect=connect))
+
+    set_cluster_cache_factory(relay_cache)
+    set_stats_history_factory(partial(RemoteStatsHistory, connect=connect))
+    if Config.METRICS_ENABLED:
+        _metrics_reporter = MetricsReporter(connect)
+        _metrics_reporter.start()
+    _uses_cache_server = True
+
+def uses_cache_server():
+    """Whether this process is a worker of a shared cache server"""
+    return _uses_cache_server
+
+def process_metrics():
+    """Metric families to report: this process's, or with a cache server those of every worker and the server"""
+    if _metrics_reporter is None:
+        return [collect()]
+    return _metrics_reporter.gather()
@@ -0,0 +1,247 @@
+"""SQLite-backed snapshots of the watch cache and stats history for warm restarts
+
+Each save appends a row holding one kind's objects as a single pickled
+blob; compaction deletes every row but the newest per (context, kind) and
+returns the freed pages to the filesystem. Reads go through SQLite's
+memory-mapped I/O, so loading a large blob does not copy it through the
+page cache a second time.
+
+Loading a snapshot unpickles it, which runs whatever the file says, so the
+file is created readable and writable by this user only and must not be
+writable by anyone the app does not trust.
+"""
+
+import atexit
+import copyreg
+import io
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from kubernetes import client
+from services.clients import current_context
+from services.kubernetes import cluster_caches, get_cluster_cache
+from services.statistics import get_stats_history
+from utils.config import Config
+
+HISTORY_KIND = 'stats_history'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    context TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    resource_version TEXT,
+    saved_at REAL NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_latest ON snapshots (context, kind, id);
+"""
+
+# Every unpickled model shares one Configuration instead of carrying its own copy
+_shared_configuration = client.Configuration()
+
+
+class _ModelPickler(pickle.Pickler):
+    """Pickles kubernetes client models without their per-object Configuration"""
+
+    def reducer_override(self, obj):
+        if hasattr(type(obj), 'openapi_types'):
+            state = dict(obj.__dict__)
+            state['local_vars_configuration'] = _shared_configuration
+            return copyreg.__newobj__, (type(obj),), state
+        return NotImplemented
+
+def dumps(value):
+    buffer = io.BytesIO()
+    _ModelPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+    return buffer.getvalue()
+
+def loads(data):
+    return pickle.loads(data)
+
+
+class SnapshotStore:
+    """Append-only table of snapshot blobs with compaction"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path):
+            # SQLite gives the -wal and -shm files the database file's permissions
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            # auto_vacuum only takes effect on a new database, before any table exists
+            connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(f'PRAGMA mmap_size={Config.SNAPSHOT_MMAP_SIZE}')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def save(self, context_name, kind, resource_version, body):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                'INSERT INTO snapshots (context, kind, resource_version, saved_at, body) VALUES (?, ?, ?, ?, ?)',
+                (context_name, kind, resource_version, time.time(), body)
+            )
+
+    def load(self, context_name, kind):
+        """Newest (resource_version, saved_at, body) for a context and kind, or None"""
+        return self._connection().execute(
+            'SELECT resource_version, saved_at, body FROM snapshots WHERE context = ? AND kind = ? '
+            'ORDER BY id DESC LIMIT 1',
+            (context_name, kind)
+        ).fetchone()
+
+    def compact(self):
+        """Drop superseded snapshots and give their pages back; returns the rows removed"""
+        connection = self._connection()
+        with connection:
+            removed = connection.execute(
+                'DELETE FROM snapshots WHERE id NOT IN (SELECT MAX(id) FROM snapshots GROUP BY context, kind)'
+            ).rowcount
+        if removed:
+            connection.execute('PRAGMA incremental_vacuum')
+            connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return removed
+
+
+class Snapshotter:
+    """Restores contexts from the store and periodically saves the kinds that changed"""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._restoring = {}  # context -> thread loading its snapshot
+        self._saved_versions = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def restore(self, context_name):
+        """Seed a context's cache and stats history from the last snapshot on a background thread, once per process
+
+        The thread starts each kind's informer once that kind is loaded, so
+        it resumes watching from the restored version. Returns whether the
+        thread is still running.
+        """
+        with self._lock:
+            thread = self._restoring.get(context_name)
+            if thread is None:
+                thread = self._restoring[context_name] = threading.Thread(
+                    target=self._restore, args=(context_name,), name=f"restore-{context_name}", daemon=True
+                )
+                thread.start()
+            return thread.is_alive()
+
+    def _restore(self, context_name):
+        cache = get_cluster_cache(context_name)
+        cache.start([kind for kind in cache.informers if kind not in Config.SNAPSHOT_KINDS])
+        try:
+            self._load(context_name, cache)
+        except Exception as e:
+            logging.error(f"Error restoring snapshot for {context_name}: {e}")
+        finally:
+            cache.start()
+
+    def _load(self, context_name, cache):
+        for kind in Config.SNAPSHOT_KINDS:
+            informer = cache.informers.get(kind)
+            row = self.store.load(context_name, kind) if informer else None
+            if row is None:
+                cache.start([kind])
+                continue
+            resource_version, saved_at, body = row
+            started = time.perf_counter()
+            try:
+                objects = loads(body)
+            except Exception as e:
+                logging.error(f"Error loading {kind} snapshot for {context_name}: {e}")
+                cache.start([kind])
+                continue
+            if informer.restore(objects, resource_version, datetime.fromtimestamp(saved_at, timezone.utc)):
+                self._saved_versions[(context_name, kind)] = resource_version
+                logging.info(f"Restored {len(objects)} {kind} for {context_name} "
+                             f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+            cache.start([kind])
+
+        row = self.store.load(context_name, HISTORY_KIND)
+        if row is not None:
+            try:
+                get_stats_history(context_name).restore(loads(row[2]))
+            except Exception as e:
+                logging.error(f"Error loading stats history snapshot for {context_name}: {e}")
+
+    def save(self):
+        """Write every synced kind whose resourceVersion moved, plus stats histories, then compact"""
+        for context_name, cache in cluster_caches().items():
+            for kind in Config.SNAPSHOT_KINDS:
+                informer = cache.informers.get(kind)
+                if informer is None or not informer.has_synced():
+                    continue
+                resource_version = informer.resource_version
+                if self._saved_versions.get((context_name, kind)) == resource_version:
+                    continue
+                self.store.save(context_name, kind, resource_version, dumps(informer.list()))
+                self._saved_versions[(context_name, kind)] = resource_version
+            self.store.save(context_name, HISTORY_KIND, None, dumps(get_stats_history(context_name).state()))
+        self.store.compact()
+
+    def start(self):
+        """Start the periodic writer (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='snapshots', daemon=True)
+            self._thread.start()
+            # A final write on shutdown lets the next start resume close to where this one stopped
+            atexit.register(self._save_quietly)
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(Config.SNAPSHOT_INTERVAL):
+            self._save_quietly()
+
+    def _save_quietly(self):
+        try:
+            self.save()
+        except Exception as e:
+            logging.error(f"Error writing snapshots: {e}")
+
+
+_snapshotter = None
+_snapshotter_lock = threading.Lock()
+
+def get_snapshotter():
+    """Process-wide snapshotter, opening the store on first use"""
+    global _snapshotter
+    with _snapshotter_lock:
+        if _snapshotter is None:
+            _snapshotter = Snapshotter(SnapshotStore(Config.SNAPSHOT_PATH))
+        return _snapshotter
+
+def restore_snapshot(context_name=None):
+    """Warm-start a context from disk and keep snapshots being written
+
+    Returns True while the snapshot is still loading, in which case the
+    loading thread starts the context's informers; False when disabled or
+    done, and the caller starts them.
+    """
+    if not Config.SNAPSHOT_ENABLED:
+        return False
+    snapshotter = get_snapshotter()
+    snapshotter.start()
+    return snapshotter.restore(context_name or current_context())
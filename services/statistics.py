@@ -1,66 +1,68 @@
-from kubernetes import client, config
+import threading
+import time
 import traceback
 import logging
 import json
+from collections import Counter
+from functools import partial
+from utils.metrics import ERRORS
+from utils.quantity import parse_cpu, parse_cpu_batch, parse_memory, parse_memory_batch
+from services.clients import current_context, use_context
+from services.history import StatsHistory
+from services.kubernetes import get_all_pods, get_cluster_cache, get_nodes, on_cluster_cache_created
+
+# Bytes per GB as shown in the stats (binary, matching the Gi suffix)
+GIB = 1024 ** 3
 
 def format_cpu(cpu_str):
     """Convert Kubernetes CPU string to cores"""
-    if not cpu_str:
-        return 0
-    
-    try:
-        # Handle millicores (e.g., '100m')
-        if isinstance(cpu_str, str) and cpu_str.endswith('m'):
-            return float(cpu_str[:-1]) / 1000
-        # Handle direct core values
-        return float(cpu_str)
-    except (ValueError, AttributeError):
-        return 0
+    return parse_cpu(cpu_str) / 1000
 
 def format_memory(memory_str):
     """Convert Kubernetes memory string to GB"""
-    if not memory_str:
-        return 0
+    return parse_memory(memory_str) / GIB
+
+def growth_percent(current, previous):
+    """Percentage change from previous to current, 0 when there is nothing to compare"""
+    return round((current - previous) / previous * 100, 1) if previous else 0
+
+def build_stats(node_count, ready_nodes, pod_count, cpu_capacity, cpu_used, memory_capacity, memory_used,
+                previous_pod_count=None):
+    """Turn raw cluster totals into the stats dict rendered by the templates"""
+    # Calculate percentages
+    node_usage = (ready_nodes / node_count * 100) if node_count > 0 else 0
+    cpu_usage = (cpu_used / cpu_capacity * 100) if cpu_capacity > 0 else 0
+    memory_usage = (memory_used / memory_capacity * 100) if memory_capacity > 0 else 0
     
-    try:
-        # Remove Ki, Mi, Gi suffix and convert to GB
-        if memory_str.endswith('Ki'):
-            return int(memory_str[:-2]) / (1024 * 1024)
-        elif memory_str.endswith('Mi'):
-            return int(memory_str[:-2]) / 1024
-        elif memory_str.endswith('Gi'):
-            return int(memory_str[:-2])
-        else:
-            return int(memory_str) / (1024 * 1024 * 1024)
-    except (ValueError, AttributeError):
-        return 0
+    return {
+        'node_count': node_count,
+        'node_usage': round(node_usage, 1),
+        'pod_count': pod_count,
+        'pod_growth': growth_percent(pod_count, previous_pod_count),
+        'ready_nodes': ready_nodes,
+        'cpu_usage': round(cpu_usage, 1),
+        'memory_usage': round(memory_usage, 1),
+        'total_cpu': round(cpu_capacity, 1),
+        'total_memory': round(memory_capacity, 1),
+        'used_cpu': round(cpu_used, 1),
+        'used_memory': round(memory_used, 1)
+    }
 
 def get_cluster_stats():
-    """Get cluster statistics including node and pod counts, CPU and memory usage"""
+    """Get cluster statistics including node and pod counts, CPU and memory usage
+
+    Nodes and pods come from the TTL-cached listings while the watch cache
+    is cold, so repeated renders share one LIST of each. stats_age is None,
+    since it is unknown when those listings last changed.
+    """
     try:
-        # Load kube config
-        config.load_kube_config()
-        v1 = client.CoreV1Api()
-        
-        # Get nodes
-        nodes_list = v1.list_node()
-        nodes = nodes_list.items
+        nodes = get_nodes()
         node_count = len(nodes)
         
-        # Get pods
-        pods_list = v1.list_pod_for_all_namespaces()
-        pods = pods_list.items
+        pods = get_all_pods()
         current_pod_count = len(pods)
         
-        # Calculate pod growth (simulated for now)
-        previous_pod_count = int(current_pod_count * 0.95)  # Simulating 5% increase
-        pod_growth = ((current_pod_count - previous_pod_count) / previous_pod_count * 100) if previous_pod_count > 0 else 0
-        
         # Calculate resource usage
-        total_cpu_capacity = 0
-        total_cpu_used = 0
-        total_memory_capacity = 0
-        total_memory_used = 0
         ready_nodes = 0
         
         for node in nodes:
@@ -71,43 +73,31 @@ def get_cluster_stats():
                         ready_nodes += 1
                     break
             
-            # Get node capacity
-            allocatable = node.status.allocatable
-            total_cpu_capacity += format_cpu(allocatable.get('cpu', '0'))
-            total_memory_capacity += format_memory(allocatable.get('memory', '0'))
+        # Get node capacity, in exact millicores and bytes
+        allocatable = [node.status.allocatable or {} for node in nodes]
+        total_cpu_capacity = sum(parse_cpu_batch([a.get('cpu', '0') for a in allocatable]))
+        total_memory_capacity = sum(parse_memory_batch([a.get('memory', '0') for a in allocatable]))
         
         # Calculate pod resource usage
-        for pod in pods:
-            if pod.status.phase == 'Running':
-                for container in pod.spec.containers:
-                    resources = container.resources
-                    if resources.requests:
-                        cpu_request = resources.requests.get('cpu', '0')
-                        memory_request = resources.requests.get('memory', '0')
-                        total_cpu_used += format_cpu(cpu_request)
-                        total_memory_used += format_memory(memory_request)
-        
-        # Calculate percentages
-        node_usage = (ready_nodes / node_count * 100) if node_count > 0 else 0
-        cpu_usage = (total_cpu_used / total_cpu_capacity * 100) if total_cpu_capacity > 0 else 0
-        memory_usage = (total_memory_used / total_memory_capacity * 100) if total_memory_capacity > 0 else 0
-        
-        stats = {
-            'node_count': node_count,
-            'node_usage': round(node_usage, 1),
-            'pod_count': current_pod_count,
-            'pod_growth': round(pod_growth, 1),
-            'cpu_usage': round(cpu_usage, 1),
-            'memory_usage': round(memory_usage, 1),
-            'total_cpu': round(total_cpu_capacity, 1),
-            'total_memory': round(total_memory_capacity, 1),
-            'used_cpu': round(total_cpu_used, 1),
-            'used_memory': round(total_memory_used, 1)
-        }
+        requests = [
+            container.resources.requests
+            for pod in pods if pod.status.phase == 'Running'
+            for container in pod.spec.containers
+            if container.resources and container.resources.requests
+        ]
+        total_cpu_used = sum(parse_cpu_batch([r.get('cpu', '0') for r in requests]))
+        total_memory_used = sum(parse_memory_batch([r.get('memory', '0') for r in requests]))
         
+        stats = build_stats(
+            node_count, ready_nodes, current_pod_count,
+            total_cpu_capacity / 1000, total_cpu_used / 1000,
+            total_memory_capacity / GIB, total_memory_used / GIB
+        )
+        stats['stats_age'] = None
         return stats
         
     except Exception as e:
+        ERRORS.inc('cluster_stats', type(e).__name__)
         logging.error(f"Error getting cluster stats: {str(e)}")
         logging.error(traceback.format_exc())
         return {
@@ -115,10 +105,168 @@ def get_cluster_stats():
             'node_usage': 0,
             'pod_count': 0,
             'pod_growth': 0,
+            'ready_nodes': 0,
             'cpu_usage': 0,
             'memory_usage': 0,
             'total_cpu': 0,
             'total_memory': 0,
             'used_cpu': 0,
-            'used_memory': 0
+            'used_memory': 0,
+            'stats_age': None
         }
+
+
+def _node_contribution(node):
+    """Return (ready, millicores, bytes) that a node adds to the cluster totals"""
+    ready = False
+    for condition in (node.status.conditions or []) if node.status else []:
+        if condition.type == 'Ready':
+            ready = condition.status == 'True'
+            break
+    allocatable = (node.status.allocatable if node.status else None) or {}
+    return ready, parse_cpu(allocatable.get('cpu', '0')), parse_memory(allocatable.get('memory', '0'))
+
+def _pod_contribution(pod):
+    """Return (millicores, bytes) requested by a running pod"""
+    cpu = 0
+    memory = 0
+    if pod.status and pod.status.phase == 'Running':
+        for container in pod.spec.containers:
+            resources = container.resources
+            if resources and resources.requests:
+                cpu += parse_cpu(resources.requests.get('cpu', '0'))
+                memory += parse_memory(resources.requests.get('memory', '0'))
+    return cpu, memory
+
+
+class StatsAggregator:
+    """Cluster totals kept as running sums, updated from pod and node deltas.
+
+    Each object's contribution is remembered so an update subtracts the old
+    value and adds the new one; reads return a snapshot rebuilt only when
+    something changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes = {}
+        self._pods = {}
+        self._ready_nodes = 0
+        self._cpu_capacity = 0
+        self._memory_capacity = 0
+        self._cpu_used = 0
+        self._memory_used = 0
+        self._snapshot = build_stats(0, 0, 0, 0, 0, 0, 0)
+        self.updated_at = None
+
+    def on_node(self, event_type, old, new):
+        """Informer handler for node add/update/delete"""
+        with self._lock:
+            obj = new if new is not None else old
+            previous = self._nodes.pop(obj.metadata.name, None)
+            if previous:
+                self._ready_nodes -= previous[0]
+                self._cpu_capacity -= previous[1]
+                self._memory_capacity -= previous[2]
+            if event_type != 'DELETED':
+                current = _node_contribution(new)
+                self._nodes[obj.metadata.name] = current
+                self._ready_nodes += current[0]
+                self._cpu_capacity += current[1]
+                self._memory_capacity += current[2]
+            self._refresh()
+
+    def on_pod(self, event_type, old, new):
+        """Informer handler for pod add/update/delete"""
+        with self._lock:
+            obj = new if new is not None else old
+            key = (obj.metadata.namespace, obj.metadata.name)
+            previous = self._pods.pop(key, None)
+            if previous:
+                self._cpu_used -= previous[0]
+                self._memory_used -= previous[1]
+            if event_type != 'DELETED':
+                current = _pod_contribution(new)
+                self._pods[key] = current
+                self._cpu_used += current[0]
+                self._memory_used += current[1]
+            self._refresh()
+
+    def _refresh(self):
+        self._snapshot = build_stats(
+            len(self._nodes), self._ready_nodes, len(self._pods),
+            self._cpu_capacity / 1000, self._cpu_used / 1000,
+            self._memory_capacity / GIB, self._memory_used / GIB
+        )
+        self.updated_at = time.time()
+
+    def snapshot(self):
+        """Current stats plus how many seconds ago they last changed"""
+        stats = dict(self._snapshot)
+        stats['stats_age'] = round(time.time() - self.updated_at, 1) if self.updated_at else None
+        return stats
+
+
+# One aggregator per context, kept current by that context's watch cache
+_stats_aggregators = {}
+
+def _attach_aggregator(context_name, cache):
+    aggregator = _stats_aggregators[context_name] = StatsAggregator()
+    cache.add_handler('pods', aggregator.on_pod)
+    cache.add_handler('nodes', aggregator.on_node)
+
+on_cluster_cache_created(_attach_aggregator)
+
+def get_stats_aggregator(context_name=None):
+    """Aggregator for a context, defaulting to the one selected for this request"""
+    context_name = context_name or current_context()
+    get_cluster_cache(context_name)
+    return _stats_aggregators[context_name]
+
+def _live_stats():
+    """Cluster stats from the incremental aggregator once the cache is warm, else computed in full"""
+    cache = get_cluster_cache()
+    if cache.has_synced('pods') and cache.has_synced('nodes'):
+        return get_stats_aggregator().snapshot()
+    return get_cluster_stats()
+
+def get_current_stats():
+    """Cluster stats, with pod_growth measured against the sample from an hour ago"""
+    stats = _live_stats()
+    previous = get_stats_history().value_ago(3600, 'pod_count')
+    stats['pod_growth'] = growth_percent(stats['pod_count'], previous)
+    return stats
+
+# One sampled history per context
+_stats_histories = {}
+_histories_lock = threading.Lock()
+
+def _collect_sample(context_name):
+    """Stats and per-namespace pod counts for the history sampler thread, or None while the cache is cold"""
+    use_context(context_name)
+    cache = get_cluster_cache()
+    if not (cache.has_synced('pods') and cache.has_synced('nodes')):
+        # Sampling without the watch cache would cost full node and pod LISTs every interval
+        return None
+    counts = Counter(pod.metadata.namespace for pod in get_all_pods())
+    return _live_stats(), counts
+
+def _local_stats_history(context_name):
+    return StatsHistory(partial(_collect_sample, context_name))
+
+# Builds the history for a context; worker processes swap in the shared cache server's
+_stats_history_factory = _local_stats_history
+
+def set_stats_history_factory(factory):
+    """Build stats histories with factory(context) from now on"""
+    global _stats_history_factory
+    _stats_history_factory = factory
+
+def get_stats_history(context_name=None):
+    """History for a context, defaulting to the one selected for this request"""
+    context_name = context_name or current_context()
+    with _histories_lock:
+        history = _stats_histories.get(context_name)
+        if history is None:
+            history = _stats_histories[context_name] = _stats_history_factory(context_name)
+        return history
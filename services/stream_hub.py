@@ -0,0 +1,129 @@
+"""Fan-out of pod and event changes to many live-update subscribers"""
+
+import logging
+import queue
+import threading
+from functools import wraps
+from services.informer import Informer
+from utils.config import Config
+
+# Kinds pushed to subscribers: kind -> namespaced list method on CoreV1Api
+STREAM_KINDS = {
+    'pods': 'list_namespaced_pod',
+    'events': 'list_namespaced_event',
+}
+
+CLUSTER_LIST_METHODS = {
+    'pods': 'list_pod_for_all_namespaces',
+    'events': 'list_event_for_all_namespaces',
+}
+
+
+def _in_namespace(list_func, namespace):
+    """Bind a namespaced list method, keeping its docstring for watch return-type lookup"""
+    @wraps(list_func)
+    def list_in_namespace(**kwargs):
+        return list_func(namespace, **kwargs)
+    return list_in_namespace
+
+
+class Subscription:
+    """A bounded queue of (kind, event_type, old, new) changes for one client"""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=Config.STREAM_QUEUE_SIZE)
+
+    def put(self, change):
+        try:
+            self._queue.put_nowait(change)
+        except queue.Full:
+            # A client this far behind has to reload instead of replaying
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+
+class StreamHub:
+    """Shares one upstream watch per scope among all subscribers.
+
+    With the watch cache enabled, changes come from its cluster-wide
+    informers, so subscribers add no upstream load at all. Otherwise the
+    hub runs namespace-scoped informers (or cluster-wide ones for the
+    all-namespaces scope) that live as long as someone is subscribed.
+    """
+
+    def __init__(self, cluster_cache, core_api):
+        self._cluster_cache = cluster_cache
+        self._core_api = core_api
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._informers = {}
+        self._attached = False
+
+    def subscribe(self, namespace=None):
+        """Subscribe to changes in one namespace, or every namespace when None"""
+        subscription = Subscription(namespace)
+        with self._lock:
+            if Config.WATCH_CACHE_ENABLED:
+                self._attach_cluster_cache()
+            elif namespace not in self._informers:
+                self._start_informers(namespace)
+            self._subscribers.setdefault(namespace, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.namespace, set())
+            subscribers.discard(subscription)
+            if subscribers:
+                return
+            self._subscribers.pop(subscription.namespace, None)
+            for informer in self._informers.pop(subscription.namespace, []):
+                informer.stop()
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _attach_cluster_cache(self):
+        if self._attached:
+            return
+        for kind in STREAM_KINDS:
+            informer = self._cluster_cache.informers[kind]
+            informer.add_handler(self._dispatcher(kind, informer, scoped=False))
+        self._cluster_cache.start()
+        self._attached = True
+
+    def _start_informers(self, namespace):
+        informers = []
+        for kind, method in STREAM_KINDS.items():
+            if namespace is None:
+                list_func = getattr(self._core_api, CLUSTER_LIST_METHODS[kind])
+            else:
+                list_func = _in_namespace(getattr(self._core_api, method), namespace)
+            informer = Informer(kind, list_func)
+            informer.add_handler(self._dispatcher(kind, informer, scoped=True, scope=namespace))
+            informer.start()
+            informers.append(informer)
+        self._informers[namespace] = informers
+        logging.info(f"Started stream watches for namespace {namespace or '*'}")
+
+    def _dispatcher(self, kind, informer, scoped, scope=None):
+        """Build an informer handler that forwards changes to the right subscribers"""
+        def dispatch(event_type, old, new):
+            # The first LIST only describes existing state; clients already loaded it
+            if not informer.initial_listed:
+                return
+            obj = new if new is not None else old
+            with self._lock:
+                if scoped:
+                    targets = list(self._subscribers.get(scope, ()))
+                else:
+                    targets = list(self._subscribers.get(obj.metadata.namespace, set())
+                                   | self._subscribers.get(None, set()))
+            for subscription in targets:
+                subscription.put((kind, event_type, old, new))
+        return dispatch
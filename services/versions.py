@@ -0,0 +1,66 @@
+"""Latest resourceVersion seen per kind and namespace, for conditional GETs"""
+
+import threading
+from services.clients import current_context
+from services.informer import RESOURCE_KINDS
+from services.kubernetes import get_cluster_cache, on_cluster_cache_created
+
+
+class VersionTracker:
+    """Records the resourceVersion at the last change to each kind in each namespace.
+
+    The version recorded is the informer's, which the informer advances
+    before notifying: the event's version for a watch event, the LIST's for
+    changes found by a relist. It only grows, so a namespace whose version
+    is unchanged has not changed since. Cluster-scoped kinds are tracked
+    under namespace None.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}  # (kind, namespace) -> resourceVersion
+
+    def handler(self, kind, informer):
+        def on_change(event_type, old, new):
+            namespace = (new if new is not None else old).metadata.namespace
+            with self._lock:
+                self._versions[(kind, namespace)] = informer.resource_version
+        return on_change
+
+    def get(self, kind, namespace):
+        with self._lock:
+            return self._versions.get((kind, namespace))
+
+
+# One tracker per context, fed by that context's watch cache. Handlers run in the
+# order their hooks were registered, so this module is imported after the indexes
+# (labels, search, inventory) and a new version is only seen once they are current.
+_trackers = {}
+
+def _attach_tracker(context_name, cache):
+    tracker = _trackers[context_name] = VersionTracker()
+    for kind, informer in cache.informers.items():
+        informer.add_handler(tracker.handler(kind, informer))
+
+on_cluster_cache_created(_attach_tracker)
+
+def resource_versions(kinds, namespace=None):
+    """Versions identifying the current state of kinds (in one namespace, or cluster-wide)
+
+    Returns None unless every kind is served from a warm, connected watch
+    cache that is not an unconfirmed snapshot; then nothing cheaper than
+    building the response can tell whether it changed.
+    """
+    cache = get_cluster_cache()
+    if not all(kind in RESOURCE_KINDS and cache.is_current(kind) for kind in kinds):
+        return None
+    tracker = _trackers[current_context()]
+    versions = []
+    for kind in kinds:
+        if namespace is None:
+            versions.append(cache.informers[kind].resource_version)
+        else:
+            # An empty namespace has no version until something is created in it
+            versions.append(tracker.get(kind, namespace) or '0')
+    # A failed watch clears the informer's version until it has relisted
+    return None if None in versions else versions
@@ -18,56 +18,61 @@ $(document).ready(function() {
         events: $.get
     };
 
-    // Load health status
-    $.get(`/api/health/${namespace}`, function(data) {
+    // Build one pod status row
+    function healthRowHtml(pod) {
+        return `
+        <tr class="hover:bg-gray-50 dark:hover:bg-gray-700" data-pod="${sanitize(pod.name)}">
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.name)}</td>
+            <td class="px-4 py-2">
+                <span class="px-2 py-1 text-xs rounded-full ${
+                    pod.status === 'Running' ? 'bg-green-100 text-green-800 dark:bg-green-900 dark:text-green-100' :
+                    pod.status === 'Pending' ? 'bg-yellow-100 text-yellow-800 dark:bg-yellow-900 dark:text-yellow-100' :
+                    'bg-red-100 text-red-800 dark:bg-red-900 dark:text-red-100'
+                }">${sanitize(pod.status)}</span>
+            </td>
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.cpu || 'N/A')}</td>
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.memory || 'N/A')}</td>
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.restarts)}</td>
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.age)}</td>
+            <td class="px-4 py-2">
+                <div class="flex items-center gap-2">
+                    <button onclick="showPodDetails('${sanitize(pod.name)}')" 
+                            class="text-blue-600 hover:text-blue-800 dark:text-blue-400 dark:hover:text-blue-200">
+                        <i class="fas fa-info-circle"></i>
+                    </button>
+                    <button class="debug-btn text-purple-600 hover:text-purple-800 dark:text-purple-400 dark:hover:text-purple-200"
+                            data-resource-type="pod"
+                            data-resource-name="${sanitize(pod.name)}">
+                        <i class="fas fa-bug"></i>
+                    </button>
+                </div>
+            </td>
+        </tr>
+        `;
+    }
+
+    // Render health status
+    function renderHealth(data, append) {
         const table = $('#healthTable table');
         const loading = $('#healthTable .loading');
         const tbody = table.find('tbody');
-        tbody.empty();
+        if (!append) tbody.empty();
 
         data.forEach(pod => {
-            tbody.append(`
-                <tr class="hover:bg-gray-50 dark:hover:bg-gray-700">
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.name)}</td>
-                    <td class="px-4 py-2">
-                        <span class="px-2 py-1 text-xs rounded-full ${
-                            pod.status === 'Running' ? 'bg-green-100 text-green-800 dark:bg-green-900 dark:text-green-100' :
-                            pod.status === 'Pending' ? 'bg-yellow-100 text-yellow-800 dark:bg-yellow-900 dark:text-yellow-100' :
-                            'bg-red-100 text-red-800 dark:bg-red-900 dark:text-red-100'
-                        }">${sanitize(pod.status)}</span>
-                    </td>
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.cpu || 'N/A')}</td>
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.memory || 'N/A')}</td>
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.restarts)}</td>
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(pod.age)}</td>
-                    <td class="px-4 py-2">
-                        <div class="flex items-center gap-2">
-                            <button onclick="showPodDetails('${sanitize(pod.name)}')" 
-                                    class="text-blue-600 hover:text-blue-800 dark:text-blue-400 dark:hover:text-blue-200">
-                                <i class="fas fa-info-circle"></i>
-                            </button>
-                            <button class="debug-btn text-purple-600 hover:text-purple-800 dark:text-purple-400 dark:hover:text-purple-200"
-                                    data-resource-type="pod"
-                                    data-resource-name="${sanitize(pod.name)}">
-                                <i class="fas fa-bug"></i>
-                            </button>
-                        </div>
-                    </td>
-                </tr>
-            `);
+            tbody.append(healthRowHtml(pod));
         });
 
         loading.addClass('hidden');
         table.removeClass('hidden');
         addDebugHandlers();
-    });
+    }
 
-    // Load images
-    $.get(`/api/images/${namespace}`, function(data) {
+    // Render images
+    function renderImages(data, append) {
         const table = $('#imagesTable table');
         const loading = $('#imagesTable .loading');
         const tbody = table.find('tbody');
-        tbody.empty();
+        if (!append) tbody.empty();
 
         data.forEach(item => {
             tbody.append(`
@@ -80,10 +85,10 @@ $(document).ready(function() {
 
         loading.addClass('hidden');
         table.removeClass('hidden');
-    });
+    }
 
-    // Load configmaps
-    $.get(`/api/configmaps/${namespace}`, function(data) {
+    // Render configmaps
+    function renderConfigMaps(data) {
         const table = $('#configMapsTable table');
         const loading = $('#configMapsTable .loading');
         const tbody = table.find('tbody');
@@ -130,19 +135,10 @@ $(document).ready(function() {
         loading.addClass('hidden');
         table.removeClass('hidden');
         addDebugHandlers();
-    }).fail(function() {
-        const table = $('#configMapsTable table');
-        const loading = $('#configMapsTable .loading');
-        loading.html(`
-            <div class="text-center text-red-500">
-                <i class="fas fa-exclamation-circle text-2xl mb-2"></i>
-                <p>Failed to load configmaps</p>
-            </div>
-        `);
-    });
+    }
 
-    // Load secrets
-    $.get(`/api/secrets/${namespace}`, function(data) {
+    // Render secrets
+    function renderSecrets(data) {
         const table = $('#secretsTable table');
         const loading = $('#secretsTable .loading');
         const tbody = table.find('tbody');
@@ -170,10 +166,10 @@ $(document).ready(function() {
         loading.addClass('hidden');
         table.removeClass('hidden');
         addDebugHandlers();
-    });
+    }
 
-    // Load services
-    $.get(`/api/services/${namespace}`, function(data) {
+    // Render services
+    function renderServices(data) {
         const table = $('#servicesTable table');
         const loading = $('#servicesTable .loading');
         const tbody = table.find('tbody');
@@ -239,6 +235,7 @@ $(document).ready(function() {
                             `).join('')}
                         </div>
                     </td>
+                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white" title="${sanitize((service.pods || []).join(', '))}">${service.pods ? service.pods.length : '-'}</td>
                     <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(service.age)}</td>
                 </tr>
             `);
@@ -247,17 +244,10 @@ $(document).ready(function() {
         loading.addClass('hidden');
         table.removeClass('hidden');
         addDebugHandlers();
-    }).fail(function() {
-        loading.html(`
-            <div class="text-center text-red-500">
-                <i class="fas fa-exclamation-circle text-2xl mb-2"></i>
-                <p>Failed to load services</p>
-            </div>
-        `);
-    });
+    }
 
-    // Load ingresses
-    $.get(`/api/ingresses/${namespace}`, function(data) {
+    // Render ingresses
+    function renderIngresses(data) {
         const container = $('#ingressesTable .grid');
         const loading = $('#ingressesTable .loading');
         container.empty();
@@ -308,34 +298,135 @@ $(document).ready(function() {
 
         loading.addClass('hidden');
         container.removeClass('hidden');
-    });
+    }
+
+    // Build one event row
+    function eventRowHtml(event) {
+        return `
+        <tr class="hover:bg-gray-50 dark:hover:bg-gray-700">
+            <td class="px-4 py-2">
+                <span class="px-2 py-1 text-xs rounded-full ${
+                    event.type === 'Normal' ? 'bg-green-100 text-green-800 dark:bg-green-900 dark:text-green-100' :
+                    'bg-yellow-100 text-yellow-800 dark:bg-yellow-900 dark:text-yellow-100'
+                }">${sanitize(event.type)}</span>
+            </td>
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.reason)}</td>
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.object)}</td>
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.message)}</td>
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.count)}</td>
+            <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.last_seen)}</td>
+        </tr>
+        `;
+    }
 
-    // Load events
-    $.get(`/api/events/${namespace}`, function(data) {
+    // Render events
+    function renderEvents(data, append) {
         const table = $('#eventsTable table');
         const loading = $('#eventsTable .loading');
         const tbody = table.find('tbody');
-        tbody.empty();
+        if (!append) tbody.empty();
 
         data.forEach(event => {
-            tbody.append(`
-                <tr class="hover:bg-gray-50 dark:hover:bg-gray-700">
-                    <td class="px-4 py-2">
-                        <span class="px-2 py-1 text-xs rounded-full ${
-                            event.type === 'Normal' ? 'bg-green-100 text-green-800 dark:bg-green-900 dark:text-green-100' :
-                            'bg-yellow-100 text-yellow-800 dark:bg-yellow-900 dark:text-yellow-100'
-                        }">${sanitize(event.type)}</span>
-                    </td>
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.reason)}</td>
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.object)}</td>
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.message)}</td>
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.count)}</td>
-                    <td class="px-4 py-2 text-sm text-gray-900 dark:text-white">${sanitize(event.last_seen)}</td>
-                </tr>
-            `);
+            tbody.append(eventRowHtml(event));
         });
 
         loading.addClass('hidden');
         table.removeClass('hidden');
+    }
+
+    // Show an error in place of a section's loading indicator
+    function renderLoadError(selector, label) {
+        $(`${selector} .loading`).html(`
+            <div class="text-center text-red-500">
+                <i class="fas fa-exclamation-circle text-2xl mb-2"></i>
+                <p>Failed to load ${label}</p>
+            </div>
+        `);
+    }
+
+    // Show a "Load more" button under a table while the server has more pages
+    function setupLoadMore(selector, url, token, render) {
+        const button = $(`${selector} .load-more`);
+        if (!token) {
+            button.addClass('hidden');
+            return;
+        }
+        button.removeClass('hidden').off('click').on('click', function() {
+            button.prop('disabled', true);
+            $.get(url, { limit: '', continue: token }, function(page) {
+                render(page.items, true);
+                setupLoadMore(selector, url, page.continue, render);
+            }).always(() => button.prop('disabled', false));
+        });
+    }
+
+    // Patch the pod and event tables in place from live changes
+    function startLiveUpdates(rejected) {
+        const source = new EventSource(`/api/stream/${namespace}`);
+
+        // A page the server turned away has missed changes by the time it gets in
+        source.addEventListener('open', function() {
+            if (rejected) {
+                source.close();
+                window.location.reload();
+            }
+        });
+
+        // Turned away at the server's stream limit, the browser stops retrying
+        source.addEventListener('error', function() {
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(() => startLiveUpdates(true), 30000);
+            }
+        });
+
+        source.addEventListener('pod', function(e) {
+            const pod = JSON.parse(e.data);
+            const tbody = $('#healthTable tbody');
+            const row = tbody.find('tr').filter(function() {
+                return $(this).attr('data-pod') === pod.name;
+            });
+
+            if (pod.change === 'deleted') {
+                row.remove();
+            } else if (row.length) {
+                row.replaceWith(healthRowHtml(pod));
+            } else {
+                tbody.prepend(healthRowHtml(pod));
+            }
+            addDebugHandlers();
+        });
+
+        source.addEventListener('k8s_event', function(e) {
+            $('#eventsTable tbody').prepend(eventRowHtml(JSON.parse(e.data)));
+        });
+
+        source.addEventListener('resync', function() {
+            source.close();
+            window.location.reload();
+        });
+    }
+
+    // Load every section of the namespace in a single request; pods and
+    // events arrive as their first page and the rest loads on demand
+    $.get(`/api/namespace/${namespace}/bundle`, { limit: '' }, function(bundle) {
+        renderHealth(bundle.health);
+        renderImages(bundle.images);
+        renderConfigMaps(bundle.configmaps);
+        renderSecrets(bundle.secrets);
+        renderServices(bundle.services);
+        renderIngresses(bundle.ingresses);
+        renderEvents(bundle.events);
+        setupLoadMore('#healthTable', `/api/health/${namespace}`, bundle.continue.health, renderHealth);
+        setupLoadMore('#imagesTable', `/api/images/${namespace}`, bundle.continue.images, renderImages);
+        setupLoadMore('#eventsTable', `/api/events/${namespace}`, bundle.continue.events, renderEvents);
+        startLiveUpdates();
+    }).fail(function() {
+        renderLoadError('#healthTable', 'pod health');
+        renderLoadError('#imagesTable', 'images');
+        renderLoadError('#configMapsTable', 'configmaps');
+        renderLoadError('#secretsTable', 'secrets');
+        renderLoadError('#servicesTable', 'services');
+        renderLoadError('#ingressesTable', 'ingresses');
+        renderLoadError('#eventsTable', 'events');
     });
 });
@@ -6,11 +6,80 @@ class Config:
     PORT = 8080
     DEBUG = True
     
+    # Production server settings (gunicorn -c gunicorn.conf.py)
+    SERVER_WORKERS = 2           # processes
+    SERVER_THREADS = 16          # request threads per process
+    SERVER_TIMEOUT = 60          # seconds before a silent worker is restarted
+    SHARED_CACHE_ENABLED = True  # one cache server process watches for every worker
+    SHARED_CACHE_SOCKET = '.pyk/cache.sock'
+    SHARED_CACHE_EVENTS = 10000  # changes per kind kept for workers to catch up from
+    SHARED_CACHE_POLL = 30       # seconds a worker's event long-poll waits
+    SHARED_CACHE_START_TIMEOUT = 30  # seconds the master waits for the cache server socket
+    
     # Kubernetes settings
     NAMESPACE_CACHE_TTL = 300  # 5 minutes
     POD_CACHE_TTL = 60        # 1 minute
     EVENT_CACHE_TTL = 30      # 30 seconds
+    RESOURCE_CACHE_TTL = 60   # configmaps, secrets, services, ingresses, quotas
+    CACHE_MAX_ENTRIES = 1024
+    UPSTREAM_WORKERS = 16     # threads for concurrent apiserver calls
+    CONCURRENT_UPSTREAM = True  # await independent apiserver calls together (False: one at a time)
+    CLIENT_POOL_MAXSIZE = 32  # pooled connections per kubeconfig context
+    CAPACITY_SNAPSHOT_TTL = 15  # seconds a columnar capacity snapshot is reused
+    QUANTITY_CACHE_SIZE = 4096  # distinct resource quantity strings kept parsed
+    IMAGE_CACHE_SIZE = 4096     # distinct image reference strings kept parsed
+    JSON_ENCODER = 'auto'     # 'auto' (orjson if installed), 'orjson' or 'json'
+    COMPRESS_MIN_SIZE = 1024  # bytes below which responses are sent uncompressed
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 4        # used when the brotli package is installed
+    ETAG_CACHE_ENTRIES = 256  # response bodies kept for conditional GETs
+    ETAG_CACHE_TTL = 300      # seconds a response body is kept per ETag
+    ETAG_AGE_BUCKET = 60      # seconds a body showing ages or "last seen" times stays valid
+    RAW_JSON_FAST_PATH = False  # decode pod lists as plain JSON instead of client models
+    
+    # Metrics settings (Prometheus text format at /metrics)
+    METRICS_ENABLED = True
+    METRICS_PUSH_INTERVAL = 15   # seconds between a worker's pushes of its metrics to the cache server
+    METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+    METRICS_DESERIALIZE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)  # seconds
+    
+    # Request profiling settings (?profile=sample|trace, see utils/profiling.py)
+    PROFILING_ENABLED = False
+    PROFILE_HEADER = 'X-Pyk-Profile'
+    PROFILE_PARAM = 'profile'
+    PROFILE_ALLOWED_ADDRESSES = ('127.0.0.1', '::1')  # clients that may ask for a profile
+    PROFILE_TOKEN = None         # when set, requests must also send it in PROFILE_TOKEN_HEADER
+    PROFILE_TOKEN_HEADER = 'X-Pyk-Profile-Token'
+    PROFILE_SAMPLE_INTERVAL = 0.001  # seconds between stack samples
+    PROFILE_DIR = '.pyk/profiles'
+    
+    # Watch cache settings
+    WATCH_CACHE_ENABLED = True
+    WATCH_TIMEOUT_SECONDS = 300  # restart each watch every 5 minutes
+    WATCH_RETRY_BACKOFF = 5      # seconds to wait after a failed list/watch
+    WATCH_LIST_PAGE_SIZE = 500   # chunk size for the initial LIST
+    
+    # Live update (SSE) settings
+    STREAM_QUEUE_SIZE = 1000     # pending changes per client before it must reload
+    STREAM_HEARTBEAT = 15        # seconds between keep-alive comments
+    STREAM_MAX_CLIENTS = 8       # open streams per process; each holds a request thread (keep below SERVER_THREADS)
+    STREAM_RETRY_AFTER = 30      # seconds a client turned away at STREAM_MAX_CLIENTS waits before retrying
+    
+    # Stats history settings
+    STATS_SAMPLE_INTERVAL = 15   # seconds between history samples
+    STATS_RAW_POINTS = 240       # one hour of raw samples
+    STATS_MINUTE_POINTS = 1440   # one day of minute rollups
+    STATS_HOUR_POINTS = 720      # 30 days of hour rollups
+    
+    # Snapshot (warm restart) settings
+    SNAPSHOT_ENABLED = True
+    SNAPSHOT_PATH = '.pyk/snapshots.db'
+    SNAPSHOT_INTERVAL = 300      # seconds between snapshot writes of changed kinds
+    SNAPSHOT_KINDS = ('pods', 'nodes', 'namespaces', 'services', 'ingresses', 'configmaps')  # never secrets
+    SNAPSHOT_MMAP_SIZE = 256 * 1024 * 1024  # bytes of the database file read through mmap
     
     # UI settings
     ITEMS_PER_PAGE = 50
+    MAX_PAGE_SIZE = 500
+    STREAM_PAGE_SIZE = 500    # apiserver chunk size behind NDJSON streams
     MAX_EVENTS = 100
@@ -0,0 +1,115 @@
+"""Response encoding: fast JSON serialization, compact table rows and compression
+
+The JSON encoder is chosen by Config.JSON_ENCODER: 'orjson' when that
+package is installed (the default, 'auto'), else the standard library.
+Compression is negotiated from Accept-Encoding for bodies of at least
+Config.COMPRESS_MIN_SIZE bytes: brotli when the brotli package is
+installed and the client accepts it, else gzip.
+"""
+
+import gzip
+import json
+from flask.json.provider import DefaultJSONProvider
+from utils.cache import TTLCache
+from utils.config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+
+def use_orjson():
+    return orjson is not None and Config.JSON_ENCODER in ('auto', 'orjson')
+
+def dumps(obj):
+    """Serialize obj as compact JSON bytes with the configured encoder"""
+    if use_orjson():
+        return orjson.dumps(
+            obj, default=FastJSONProvider.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+    return json.dumps(obj, default=FastJSONProvider.default, separators=(',', ':')).encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider whose responses are always compact and use the configured encoder
+
+    Values the encoder cannot handle natively (dates, Decimals, UUIDs,
+    dataclasses) are converted as Flask's default provider does. Keys keep
+    their insertion order instead of being sorted.
+    """
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def as_table(rows):
+    """Rows of dicts as {'columns': [...], 'rows': [[...], ...]}; keys missing from a row are null
+
+    Names each key once instead of once per row, which roughly halves
+    large listings before compression.
+    """
+    columns = list(rows[0]) if rows else []
+    known = set(columns)
+    for row in rows:
+        if len(row) != len(columns) or not known.issuperset(row):
+            for key in row:
+                if key not in known:
+                    known.add(key)
+                    columns.append(key)
+    return {'columns': columns, 'rows': [[row.get(column) for column in columns] for row in rows]}
+
+
+def choose_encoding(accept_encodings):
+    """Best content encoding we can produce for an Accept-Encoding header, or None"""
+    offered = (['br'] if brotli is not None else []) + ['gzip']
+    encoding = accept_encodings.best_match(offered)
+    return encoding if encoding and accept_encodings[encoding] > 0 else None
+
+def compress_bytes(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=Config.BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=Config.GZIP_LEVEL, mtime=0)
+
+# Compressed bodies of responses with a strong ETag, by (ETag, encoding)
+compressed_cache = TTLCache(maxsize=Config.ETAG_CACHE_ENTRIES)
+
+def compress_response(response, accept_encodings):
+    """Compress a response in place when it is large enough and the client accepts an encoding
+
+    A compressed body gets its own strong ETag (the original with the
+    encoding appended), and responses that have an ETag are compressed
+    once per encoding, not once per request.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < Config.COMPRESS_MIN_SIZE:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    if etag:
+        compressed = compressed_cache.get((etag, encoding))
+        if compressed is None:
+            compressed = compress_bytes(data, encoding)
+            compressed_cache.set((etag, encoding), Config.ETAG_CACHE_TTL, compressed)
+        response.set_etag(f"{etag}-{encoding}", weak)
+    else:
+        compressed = compress_bytes(data, encoding)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
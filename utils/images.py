@@ -0,0 +1,95 @@
+"""Container image reference parsing
+
+Follows the distribution reference grammar that the container runtimes
+use: ``[registry/]repository[:tag][@digest]``. The first path component is
+a registry only if it contains a '.' or ':' or is 'localhost', so
+``registry.local:5000/team/app:v1`` keeps its port and ``team/app:v1``
+lives on Docker Hub. Docker Hub names without a namespace gain
+``library/``, and a reference with neither tag nor digest means
+``latest``, so every spelling of an image parses to the same reference.
+"""
+
+import sys
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from utils.config import Config
+
+DEFAULT_REGISTRY = 'docker.io'
+DEFAULT_TAG = 'latest'
+
+
+class ImageReference(NamedTuple):
+    registry: str
+    repository: str
+    tag: Optional[str]
+    digest: Optional[str]
+
+    @property
+    def name(self):
+        """registry/repository without tag or digest"""
+        return f"{self.registry}/{self.repository}"
+
+    @property
+    def canonical(self):
+        """The fully qualified reference"""
+        reference = self.name
+        if self.tag:
+            reference += f":{self.tag}"
+        if self.digest:
+            reference += f"@{self.digest}"
+        return reference
+
+    @property
+    def short(self):
+        """Last repository component with its tag, or a shortened digest"""
+        base = self.repository.rsplit('/', 1)[-1]
+        if self.tag:
+            return f"{base}:{self.tag}"
+        algorithm, _, hex_digest = self.digest.partition(':')
+        return f"{base}@{algorithm}:{hex_digest[:12]}"
+
+
+@lru_cache(maxsize=Config.IMAGE_CACHE_SIZE)
+def parse_image(image):
+    """Parse an image reference; every spelling of one image returns an equal ImageReference.
+
+    Raises ValueError for an empty reference.
+    """
+    reference = (image or '').strip()
+    if not reference:
+        raise ValueError(f"Invalid image reference: {image!r}")
+
+    digest = None
+    if '@' in reference:
+        reference, digest = reference.split('@', 1)
+
+    # A ':' after the last '/' starts the tag; earlier ones belong to a registry port
+    tag = None
+    slash = reference.rfind('/')
+    colon = reference.rfind(':')
+    if colon > slash:
+        reference, tag = reference[:colon], reference[colon + 1:]
+
+    first, _, rest = reference.partition('/')
+    if rest and ('.' in first or ':' in first or first == 'localhost'):
+        registry, repository = first, rest
+    else:
+        registry, repository = DEFAULT_REGISTRY, reference
+    if registry == DEFAULT_REGISTRY and '/' not in repository:
+        repository = f"library/{repository}"
+    if tag is None and digest is None:
+        tag = DEFAULT_TAG
+
+    return ImageReference(
+        sys.intern(registry.lower()),
+        sys.intern(repository),
+        sys.intern(tag) if tag else None,
+        sys.intern(digest) if digest else None,
+    )
+
+def short_image(image):
+    """Image reference shortened for tables, e.g. 'registry.local:5000/team/app:v1' -> 'app:v1'"""
+    try:
+        return parse_image(image).short
+    except ValueError:
+        return image
@@ -0,0 +1,173 @@
+"""Prometheus metrics kept in process and rendered in the text exposition format
+
+Counters, gauges and histograms take their label values positionally and
+update under one lock per metric, cheap enough for every request and
+apiserver call. Values that already live elsewhere (cache counters,
+informer sizes) are read at scrape time by collectors registered with
+add_collector. Each process keeps its own metrics; collect() hands them to
+another process, labelled with where they came from, and render() merges
+several processes' metrics into one exposition.
+"""
+
+import bisect
+import threading
+from utils.config import Config
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, *extra):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(pair for pair in extra if pair)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _sort_key(item):
+    # Label values may mix types, such as numeric HTTP statuses and 'error'
+    return [str(value) for value in item[0]]
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        _metrics.append(self)
+
+    def samples(self, extra=''):
+        """Sample lines, each with the extra label pair when given"""
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labels, label_values, extra)} {_format_value(value)}"
+            for label_values, value in sorted(values, key=_sort_key)
+        ]
+
+
+class Counter(_Metric):
+    """A value that only goes up"""
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down"""
+    kind = 'gauge'
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=Config.METRICS_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                # Per-bucket counts (the last for values above every bucket), then the sum
+                series = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self, extra=''):
+        lines = []
+        with self._lock:
+            values = [(label_values, list(series)) for label_values, series in self._values.items()]
+        for label_values, series in sorted(values, key=_sort_key):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, extra, le)} {cumulative}")
+            labels = _format_labels(self.labels, label_values, extra)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def add_collector(collector):
+    """Register collector() -> [(name, type, help, label names, [(label values, value)])], called on every scrape"""
+    _collectors.append(collector)
+
+def collect(process=None):
+    """Every metric and collected value of this process as [(name, type, help, sample lines)]
+
+    With process, every sample is labelled process="<process>" so the
+    families can be merged with other processes' by render().
+    """
+    extra = f'process="{_escape(process)}"' if process is not None else ''
+    families = [(metric.name, metric.kind, metric.documentation, metric.samples(extra)) for metric in _metrics]
+    for collector in _collectors:
+        for name, kind, documentation, labels, samples in collector():
+            families.append((name, kind, documentation, [
+                f"{name}{_format_labels(labels, label_values, extra)} {_format_value(value)}"
+                for label_values, value in samples
+            ]))
+    return families
+
+def render(*processes):
+    """Families collected from each process (this one alone by default) in the Prometheus text format"""
+    merged = {}
+    for families in processes or (collect(),):
+        for name, kind, documentation, samples in families:
+            merged.setdefault(name, (kind, documentation, []))[2].extend(samples)
+    lines = []
+    for name, (kind, documentation, samples) in merged.items():
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_DURATION = Histogram(
+    'pyk_http_request_duration_seconds', 'Time to produce a response, by route',
+    ('method', 'route', 'status')
+)
+REQUESTS_IN_FLIGHT = Gauge('pyk_http_requests_in_flight', 'Requests being handled, by route', ('route',))
+ERRORS = Counter(
+    'pyk_errors_total', 'Exceptions turned into error responses or logged, by where they were caught and type',
+    ('source', 'type')
+)
+UPSTREAM_REQUESTS = Counter(
+    'pyk_upstream_requests_total', 'Apiserver calls, by context, verb, resource and HTTP status',
+    ('context', 'verb', 'resource', 'status')
+)
+UPSTREAM_DURATION = Histogram(
+    'pyk_upstream_request_duration_seconds', 'Apiserver call time until the response headers (watches) or body arrived',
+    ('verb', 'resource')
+)
+UPSTREAM_IN_FLIGHT = Gauge('pyk_upstream_requests_in_flight', 'Apiserver calls awaiting a response')
+DESERIALIZE_DURATION = Histogram(
+    'pyk_deserialize_duration_seconds', 'Time decoding apiserver responses, by client model type or raw JSON',
+    ('type',), buckets=Config.METRICS_DESERIALIZE_BUCKETS
+)
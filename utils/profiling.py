@@ -0,0 +1,178 @@
+"""Opt-in profiling of single requests
+
+A request asks for a profile with the PROFILE_HEADER header or PROFILE_PARAM
+query parameter set to 'sample' (a sampling profiler over the request
+thread, cheap) or 'trace' (every Python and C call on the request thread,
+exact but slow). Only with PROFILING_ENABLED, from PROFILE_ALLOWED_ADDRESSES,
+and with the PROFILE_TOKEN header when a token is configured.
+
+While a profile is active every apiserver call the request makes, on any
+thread it hands work to, is added to its timeline with its duration,
+status and response size, as is every response deserialization. The
+stacks are written to PROFILE_DIR in the folded format flamegraph.pl,
+speedscope and inferno read, next to a JSON file with the timeline; the
+response carries a Server-Timing summary and the profile's file name.
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from utils.config import Config
+
+PROFILE_MODES = ('sample', 'trace')
+
+# The profile of the request this code runs for, if it asked for one
+_active_profile = contextvars.ContextVar('profile', default=None)
+
+_frame_names = {}
+
+
+def _frame_name(code):
+    """'function (path:line)' for a code object, relative to the working directory when inside it"""
+    name = _frame_names.get(code)
+    if name is None:
+        filename = code.co_filename
+        if filename.startswith(os.getcwd()):
+            filename = os.path.relpath(filename)
+        name = _frame_names[code] = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+    return name
+
+def _stack(frame):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+class RequestProfile:
+    """Stacks and upstream call timeline of one request"""
+
+    def __init__(self, mode, description):
+        self.mode = mode
+        self.description = description
+        self.id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}"
+        self.stacks = Counter()  # folded stack -> samples ('sample') or microseconds ('trace')
+        self.timeline = []
+        self._lock = threading.Lock()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._calls = []  # 'trace' mode: [name, start, time spent in callees]
+        self._token = None
+        self.started = None
+        self.elapsed = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._token = _active_profile.set(self)
+        if self.mode == 'trace':
+            sys.setprofile(self._trace)
+        else:
+            self._sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        if self.mode == 'trace':
+            sys.setprofile(None)
+        else:
+            self._stop.set()
+            self._sampler.join()
+        self.elapsed = time.perf_counter() - self.started
+        _active_profile.reset(self._token)
+
+    def _sample(self):
+        while not self._stop.wait(Config.PROFILE_SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[_stack(frame)] += 1
+
+    def _trace(self, frame, event, arg):
+        if event == 'call' or event == 'c_call':
+            name = _frame_name(frame.f_code) if event == 'call' else f"{getattr(arg, '__qualname__', arg)} (builtin)"
+            self._calls.append([name, time.perf_counter(), 0.0])
+        elif self._calls:
+            # return, c_return or c_exception
+            name, start, in_callees = self._calls.pop()
+            total = time.perf_counter() - start
+            path = ';'.join(call[0] for call in self._calls) + (';' if self._calls else '') + name
+            self.stacks[path] += round((total - in_callees) * 1e6)
+            if self._calls:
+                self._calls[-1][2] += total
+
+    def record(self, kind, **fields):
+        """Add an event of the request's timeline, timed from the start of the request"""
+        entry = dict(kind=kind, thread=threading.current_thread().name, **fields)
+        with self._lock:
+            self.timeline.append(entry)
+
+    def offset_ms(self, moment):
+        return round((moment - self.started) * 1000, 3)
+
+    def summary(self):
+        """Total milliseconds per timeline kind, and the number of events of each"""
+        totals, counts = Counter(), Counter()
+        with self._lock:
+            for entry in self.timeline:
+                totals[entry['kind']] += entry['duration_ms']
+                counts[entry['kind']] += 1
+        return totals, counts
+
+    def server_timing(self):
+        """A Server-Timing header value: the whole request, then time per timeline kind
+
+        Calls made concurrently are summed, so a kind can exceed the total.
+        """
+        totals, counts = self.summary()
+        parts = [f'total;dur={self.elapsed * 1000:.1f};desc="{self.mode} profile"']
+        for kind in sorted(totals):
+            parts.append(f'{kind};dur={totals[kind]:.1f};desc="{counts[kind]} calls"')
+        return ', '.join(parts)
+
+    def write(self, directory):
+        """Write <id>.folded and <id>.json to directory; returns the folded file's path"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.id)
+        with open(f"{base}.folded", 'w') as f:
+            for stack, value in sorted(self.stacks.items()):
+                if value:
+                    f.write(f"{stack} {value}\n")
+        totals, counts = self.summary()
+        with open(f"{base}.json", 'w') as f:
+            json.dump({
+                'id': self.id,
+                'request': self.description,
+                'mode': self.mode,
+                'unit': 'samples' if self.mode == 'sample' else 'microseconds',
+                'sample_interval': Config.PROFILE_SAMPLE_INTERVAL if self.mode == 'sample' else None,
+                'elapsed_ms': round(self.elapsed * 1000, 3),
+                'totals_ms': {kind: round(total, 3) for kind, total in totals.items()},
+                'counts': dict(counts),
+                'timeline': sorted(self.timeline, key=lambda entry: entry['start_ms']),
+            }, f, indent=2)
+        return f"{base}.folded"
+
+
+def requested_mode(headers, args, remote_addr):
+    """The profile mode a request asked for and may have, or None"""
+    if not Config.PROFILING_ENABLED:
+        return None
+    mode = headers.get(Config.PROFILE_HEADER) or args.get(Config.PROFILE_PARAM)
+    if mode not in PROFILE_MODES:
+        return None
+    if remote_addr not in Config.PROFILE_ALLOWED_ADDRESSES:
+        return None
+    if Config.PROFILE_TOKEN and headers.get(Config.PROFILE_TOKEN_HEADER) != Config.PROFILE_TOKEN:
+        return None
+    return mode
+
+def active_profile():
+    """The profile of the current request, or None when it is not being profiled"""
+    return _active_profile.get()
@@ -0,0 +1,76 @@
+"""Kubernetes resource quantity parsing with exact integer results
+
+Implements the apiserver's quantity grammar: an optional sign, a decimal
+number, then either a binary SI suffix (Ki, Mi, Gi, Ti, Pi, Ei), a decimal
+SI suffix (n, u, m, k, M, G, T, P, E) or a decimal exponent (e3, E-2).
+Values are computed as fractions and rounded up like resource.Quantity's
+MilliValue()/Value(), so totals never drift the way float sums do.
+"""
+
+import math
+import re
+from fractions import Fraction
+from functools import lru_cache
+from utils.config import Config
+
+BINARY_SUFFIXES = {'Ki': 1024, 'Mi': 1024 ** 2, 'Gi': 1024 ** 3, 'Ti': 1024 ** 4, 'Pi': 1024 ** 5, 'Ei': 1024 ** 6}
+DECIMAL_SUFFIXES = {
+    'n': Fraction(1, 10 ** 9), 'u': Fraction(1, 10 ** 6), 'm': Fraction(1, 1000), '': 1,
+    'k': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9, 'T': 10 ** 12, 'P': 10 ** 15, 'E': 10 ** 18,
+}
+
+_QUANTITY = re.compile(
+    r'^([+-]?(?:\d+\.?\d*|\.\d+))'
+    r'(?:[eE]([+-]?\d+)|(Ki|Mi|Gi|Ti|Pi|Ei|n|u|m|k|M|G|T|P|E)?)$'
+)
+
+
+@lru_cache(maxsize=Config.QUANTITY_CACHE_SIZE)
+def parse_quantity(value):
+    """Exact value of a quantity string as a Fraction; ValueError if it is not one"""
+    match = _QUANTITY.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid quantity: {value!r}")
+    number, exponent, suffix = match.groups()
+    if exponent is not None:
+        return Fraction(number) * Fraction(10) ** int(exponent)
+    if suffix in BINARY_SUFFIXES:
+        return Fraction(number) * BINARY_SUFFIXES[suffix]
+    return Fraction(number) * DECIMAL_SUFFIXES[suffix or '']
+
+def _scaled(value, scale):
+    """Quantity times scale, rounded up; 0 for empty or invalid values"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, (int, float)):
+        return math.ceil(value * scale)
+    try:
+        return math.ceil(parse_quantity(value) * scale)
+    except ValueError:
+        return 0
+
+@lru_cache(maxsize=Config.QUANTITY_CACHE_SIZE)
+def _millicores(value):
+    return _scaled(value, 1000)
+
+@lru_cache(maxsize=Config.QUANTITY_CACHE_SIZE)
+def _bytes(value):
+    return _scaled(value, 1)
+
+def parse_cpu(value):
+    """CPU quantity in millicores, e.g. '250m' -> 250, '1.5' -> 1500"""
+    return _millicores(value) if isinstance(value, str) else _scaled(value, 1000)
+
+def parse_memory(value):
+    """Memory quantity in bytes, e.g. '1.5Gi' -> 1610612736, '500M' -> 500000000"""
+    return _bytes(value) if isinstance(value, str) else _scaled(value, 1)
+
+def parse_cpu_batch(values):
+    """parse_cpu over many values, parsing each distinct string once"""
+    parsed = {value: parse_cpu(value) for value in set(values)}
+    return [parsed[value] for value in values]
+
+def parse_memory_batch(values):
+    """parse_memory over many values, parsing each distinct string once"""
+    parsed = {value: parse_memory(value) for value in set(values)}
+    return [parsed[value] for value in values]